@@ -0,0 +1,86 @@
+# benchmarks/bulk_insert.py
+"""
+Membandingkan INSERT order_item per baris (loop cursor.execute, pola lama)
+dengan satu statement multi-row (unnest, dipakai create_order_transaction dan
+add_new_product_with_recipe) serta psycopg2.extras.execute_values.
+
+Memakai tabel TEMP di DB dari src/config.py, jadi tidak ada data yang tertinggal.
+Jalankan dari root repo:
+    python -m benchmarks.bulk_insert [jumlah_baris ...]
+"""
+import sys
+import time
+
+import psycopg2
+import psycopg2.extras
+
+from src.config import PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE
+
+REPEAT = 5
+
+def _setup(cur):
+    cur.execute("""
+        CREATE TEMP TABLE bench_orders (order_id SERIAL PRIMARY KEY, customer_id INT) ON COMMIT DROP;
+        CREATE TEMP TABLE bench_order_item (
+            order_item_id SERIAL PRIMARY KEY,
+            order_id INT REFERENCES bench_orders(order_id),
+            product_id INT,
+            quantity INT
+        ) ON COMMIT DROP;
+    """)
+
+def per_row(cur, items):
+    cur.execute("INSERT INTO bench_orders (customer_id) VALUES (%s) RETURNING order_id;", (1,))
+    order_id = cur.fetchone()[0]
+    for product_id, quantity in items:
+        cur.execute("INSERT INTO bench_order_item (order_id, product_id, quantity) VALUES (%s, %s, %s);",
+                    (order_id, product_id, quantity))
+    return 1 + len(items)
+
+def unnest_single_statement(cur, items):
+    cur.execute("""
+        WITH new_order AS (
+            INSERT INTO bench_orders (customer_id) VALUES (%s) RETURNING order_id
+        ), new_items AS (
+            INSERT INTO bench_order_item (order_id, product_id, quantity)
+            SELECT n.order_id, i.product_id, i.quantity
+            FROM new_order n CROSS JOIN unnest(%s::int[], %s::int[]) AS i(product_id, quantity)
+            RETURNING 1
+        )
+        SELECT order_id, (SELECT COUNT(*) FROM new_items) FROM new_order;
+    """, (1, [p for p, _ in items], [q for _, q in items]))
+    cur.fetchone()
+    return 1
+
+def execute_values(cur, items):
+    cur.execute("INSERT INTO bench_orders (customer_id) VALUES (%s) RETURNING order_id;", (1,))
+    order_id = cur.fetchone()[0]
+    psycopg2.extras.execute_values(
+        cur, "INSERT INTO bench_order_item (order_id, product_id, quantity) VALUES %s",
+        [(order_id, p, q) for p, q in items], page_size=max(1, len(items)))
+    return 2
+
+def main(sizes):
+    conn = psycopg2.connect(host=PGHOST, database=PGDATABASE, user=PGUSER, password=PGPASSWORD, sslmode=PGSSLMODE)
+    try:
+        print(f"{'Baris':>6} {'Metode':<24} {'Round-trip':>10} {'ms/order':>10} {'Speed-up':>9}")
+        for n in sizes:
+            items = [(i % 50 + 1, i % 7 + 1) for i in range(n)]
+            baseline = None
+            for name, fn in (('per baris (lama)', per_row), ('unnest 1 statement', unnest_single_statement),
+                             ('execute_values', execute_values)):
+                with conn.cursor() as cur:
+                    _setup(cur)
+                    fn(cur, items) # pemanasan
+                    start = time.perf_counter()
+                    for _ in range(REPEAT):
+                        round_trips = fn(cur, items)
+                    elapsed_ms = 1000.0 * (time.perf_counter() - start) / REPEAT
+                conn.rollback() # tabel TEMP ikut dibuang
+                baseline = baseline or elapsed_ms
+                print(f"{n:>6} {name:<24} {round_trips:>10} {elapsed_ms:>10.1f} {baseline / elapsed_ms:>8.1f}x")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500])
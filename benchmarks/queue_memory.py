@@ -0,0 +1,50 @@
+# benchmarks/queue_memory.py
+"""
+Mengukur memori per order yang antri di ProductionPriorityQueue.
+
+Jalankan dari root repo:
+    python -m benchmarks.queue_memory [jumlah_order]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.models.order import Order, OrderItem
+from src.controllers.priority_queue import ProductionPriorityQueue
+
+def make_orders(n: int, now: datetime):
+    return [Order(order_id=i, customer_id=1000 + i,
+                  order_timestamp=now + timedelta(seconds=i),
+                  deadline=now + timedelta(hours=1 + i % 300),
+                  total_price=12.5, status_id=2, total_quantity=5, status_name='Diproses',
+                  items=[OrderItem(order_item_id=i * 10, order_id=i, product_id=3, quantity=5)])
+            for i in range(n)]
+
+def main(n: int = 200_000):
+    now = datetime(2025, 1, 1)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    orders = make_orders(n, now)
+    after_orders = tracemalloc.get_traced_memory()[0]
+
+    queue = ProductionPriorityQueue(clock=lambda: now)
+    for order in orders:
+        queue.add_order(order)
+    after_queue = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"📦 {n:,} order di antrian")
+    print(f"   objek Order + item : {(after_orders - base) / n:8.1f} byte/order")
+    print(f"   overhead antrian   : {(after_queue - after_orders) / n:8.1f} byte/order")
+    print(f"   total              : {(after_queue - base) / n:8.1f} byte/order")
+
+    start = time.perf_counter()
+    queue.recalculate_all_priorities()
+    queue.pop_top_k(8)
+    print(f"⏱️ recalculate_all_priorities + pop_top_k(8): {time.perf_counter() - start:.3f} detik")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -34,6 +34,5 @@ except Exception as e:
     print(f"Koneksi/Eksekusi Error: {e}")
 
 finally:
-    if db_client and db_client.conn:
-        db_client.conn.close()
-        print("Koneksi ditutup")
\ No newline at end of file
+    if db_client:
+        db_client.close()
\ No newline at end of file
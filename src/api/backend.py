@@ -0,0 +1,212 @@
+# src/api/backend.py
+"""
+Interface backend data yang dipakai Scheduler, StockController, dan View.
+
+DatabaseClient (Postgres/Neon) dan InMemoryDatabaseClient (src/api/memory.py)
+sama-sama mengimplementasikan DatabaseBackend, sehingga pemanggil tidak perlu
+tahu backend mana yang dipakai. Bentuk tuple/dict hasil setiap method mengikuti
+query di DatabaseClient.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import Enum, auto
+from typing import Dict, List, Optional, Tuple
+
+from src.config import DB_BACKEND
+
+class FinishResult(Enum):
+    """Hasil finish_production_transaction. Hanya FINISHED yang bernilai True."""
+    FINISHED = auto()
+    ALREADY_CLOSED = auto() # batch sudah tidak IN_PROGRESS (ditutup proses/leader lain): jangan dicoba lagi
+    FAILED = auto()         # error DB sementara: boleh dicoba lagi
+
+    def __bool__(self) -> bool:
+        return self is FinishResult.FINISHED
+
+class DatabaseBackend(ABC):
+    # --- Siklus hidup, NOTIFY, dan leader election ---
+
+    @abstractmethod
+    def close(self): ...
+
+    @abstractmethod
+    def listen(self, channel: str) -> bool: ...
+
+    @abstractmethod
+    def wait_for_notifications(self, timeout: Optional[float]) -> Optional[List[str]]: ...
+
+    @abstractmethod
+    def try_acquire_leader_lock(self, lock_key: int) -> bool: ...
+
+    @abstractmethod
+    def check_leader_lock(self, lock_key: int) -> bool: ...
+
+    @abstractmethod
+    def release_leader_lock(self, lock_key: int): ...
+
+    @abstractmethod
+    def check_scheduler_schema(self) -> Dict[str, bool]: ...
+
+    # --- Intake & klaim order (Scheduler) ---
+
+    @abstractmethod
+    def fetch_new_orders(self, since: Optional[datetime] = None) -> List[Tuple]: ...
+
+    @abstractmethod
+    def claim_ready_orders(self, replica_id: str, limit: int, lease_seconds: float) -> List[Tuple]: ...
+
+    @abstractmethod
+    def renew_claims(self, replica_id: str, order_ids: List[int], lease_seconds: float) -> Optional[List[int]]: ...
+
+    @abstractmethod
+    def release_claims(self, replica_id: str, order_ids: List[int]) -> bool: ...
+
+    @abstractmethod
+    def fetch_orders_changed_since(self, since: datetime) -> Optional[List[int]]: ...
+
+    @abstractmethod
+    def fetch_order_items_for_orders(self, order_ids: List[int]) -> List[Tuple]: ...
+
+    # --- Produksi ---
+
+    @abstractmethod
+    def fetch_production_history(self, limit: int) -> List[Tuple]: ...
+
+    @abstractmethod
+    def fetch_open_production_batches(self, machine_ids: Optional[List[int]] = None) -> List[Tuple]: ...
+
+    @abstractmethod
+    def start_production_transaction(self, order_id: int, machine_id: int) -> Optional[int]: ...
+
+    @abstractmethod
+    def finish_production_transaction(self, order_id: int, production_batch_id: int) -> FinishResult: ...
+
+    @abstractmethod
+    def start_production_batch(self, assignments: List[Tuple[int, int]],
+                               replica_id: Optional[str] = None) -> Dict[int, int]: ...
+
+    @abstractmethod
+    def finish_production_batch(self, finished: List[Tuple[int, int]],
+                                deductions: Optional[Dict[int, Dict[int, float]]] = None) -> bool: ...
+
+    # --- Stok bahan baku ---
+
+    @abstractmethod
+    def fetch_low_stock_items(self, threshold: int) -> List[str]: ...
+
+    @abstractmethod
+    def fetch_low_stock_ingredient_ids(self) -> List[int]: ...
+
+    @abstractmethod
+    def fetch_ingredients_for_orders(self, order_ids: List[int]) -> List[Tuple]: ...
+
+    @abstractmethod
+    def deduct_ingredients_for_order(self, order_id: int, requirements: Optional[Dict[int, float]] = None) -> bool: ...
+
+    @abstractmethod
+    def fetch_recipes(self) -> Optional[List[Tuple]]: ...
+
+    @abstractmethod
+    def fetch_ingredient_stock(self) -> Optional[List[Tuple[int, float]]]: ...
+
+    @abstractmethod
+    def adjust_inventory_transaction(self, item_changes: List[tuple]): ...
+
+    # --- Pesanan (View pelanggan/admin) ---
+
+    @abstractmethod
+    def fetch_customer_orders(self, customer_id: int) -> List[Tuple]: ...
+
+    @abstractmethod
+    def fetch_pending_orders_by_customer(self, customer_id: int) -> List[Tuple]: ...
+
+    @abstractmethod
+    def fetch_order_details_by_id(self, order_id: int, customer_id: int) -> Optional[Tuple]: ...
+
+    @abstractmethod
+    def update_order_status(self, order_id: int, new_status_id: int) -> bool: ...
+
+    @abstractmethod
+    def force_order_status(self, order_id: int, new_status_id: int) -> bool: ...
+
+    @abstractmethod
+    def create_order_transaction(self, customer_id: int, total_price: float, total_quantity: int,
+                                 deadline: datetime, order_items: List[dict]) -> Optional[int]: ...
+
+    # --- Akun ---
+
+    @abstractmethod
+    def check_user_exists(self, username: str, email: str) -> bool: ...
+
+    @abstractmethod
+    def register_new_customer(self, username: str, fullname: str, phone: str, email: str,
+                              hashed_password: str) -> Optional[int]: ...
+
+    @abstractmethod
+    def authenticate_customer(self, username: str, hashed_password: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def authenticate_admin(self, username: str, hashed_password: str) -> Optional[dict]: ...
+
+    # --- Produk & resep ---
+
+    @abstractmethod
+    def fetch_all_products(self) -> List[Dict]: ...
+
+    @abstractmethod
+    def add_new_product_with_recipe(self, name: str, description: str, price: int,
+                                    recipe: List[Tuple[int, int]]) -> Optional[int]: ...
+
+    @abstractmethod
+    def get_product_by_id(self, product_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    def update_product(self, product_id: int, name: str, description: str, price: int) -> bool: ...
+
+    @abstractmethod
+    def delete_product_and_relations(self, product_id: int) -> bool: ...
+
+    @abstractmethod
+    def get_popular_products(self, limit: int = 10) -> list: ...
+
+    # --- Bahan baku ---
+
+    @abstractmethod
+    def fetch_all_ingredients(self) -> list: ...
+
+    @abstractmethod
+    def check_ingredient_exists(self, name: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def update_ingredient_stock(self, ingredient_id: int, added_stock: int) -> bool: ...
+
+    @abstractmethod
+    def add_new_ingredient(self, name: str, unit: str, stock: int, min_stock: int) -> Optional[int]: ...
+
+    @abstractmethod
+    def get_ingredient_by_id(self, ing_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    def update_ingredient_details(self, ing_id: int, name: str, unit: str, min_stock: int) -> bool: ...
+
+    @abstractmethod
+    def set_ingredient_stock(self, ing_id: int, new_stock: int) -> bool: ...
+
+    @abstractmethod
+    def delete_ingredient_and_relations(self, ing_id: int) -> bool: ...
+
+    @abstractmethod
+    def get_low_stock_ingredients(self) -> list: ...
+
+    @abstractmethod
+    def adjust_ingredient_stock(self, ingredient_id: int, change_amount: int) -> bool: ...
+
+def create_database_client(backend: str = DB_BACKEND) -> DatabaseBackend:
+    """Membuat backend sesuai konfigurasi: 'postgres' (default) atau 'memory'."""
+    if backend == 'memory':
+        from src.api.memory import InMemoryDatabaseClient
+        return InMemoryDatabaseClient()
+    if backend == 'postgres':
+        from src.api.client import DatabaseClient
+        return DatabaseClient()
+    raise ValueError(f"Backend DB tidak dikenal: '{backend}' (pilih 'postgres' atau 'memory')")
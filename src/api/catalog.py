@@ -0,0 +1,71 @@
+# src/api/catalog.py
+"""
+Cache katalog produk bersama (read-through).
+
+Katalog dibaca di setiap layar produk dan setiap pesanan, tetapi jarang berubah.
+ProductCatalog memuat seluruh tabel product sekali, meng-index-nya per product_id,
+lalu melayani pembacaan dari memori sampai di-invalidate: setelah mutasi produk
+di-commit, saat ada NOTIFY dari proses lain, atau saat TTL (jaring pengaman) habis.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.config import CATALOG_CACHE_TTL_SECONDS
+
+class ProductCatalog:
+    """
+    loader mengembalikan list dict produk, atau None jika gagal (hasil gagal tidak di-cache).
+    Pembaca mendapat salinan dict, sehingga isi cache tidak bisa ikut berubah oleh pemanggil.
+    """
+    def __init__(self, loader: Callable[[], Optional[List[dict]]],
+                 ttl_seconds: Optional[float] = CATALOG_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock() # hanya satu thread yang memuat ulang
+        self._products: Optional[Dict[int, dict]] = None
+        self._loaded_at = 0.0
+        self._generation = 0 # naik setiap invalidate; hasil load yang basi tidak disimpan
+        self.hits = 0
+        self.loads = 0
+
+    def _cached(self) -> Optional[Dict[int, dict]]:
+        products = self._products # dibaca sekali: invalidate() bisa terjadi di thread lain
+        if products is not None and \
+                (self.ttl_seconds is None or self._clock() - self._loaded_at < self.ttl_seconds):
+            return products
+        return None
+
+    def _index(self) -> Dict[int, dict]:
+        products = self._cached()
+        if products is not None:
+            self.hits += 1
+            return products
+
+        with self._lock:
+            products = self._cached() # mungkin sudah dimuat thread lain selama menunggu lock
+            if products is not None:
+                return products
+            generation = self._generation
+            rows = self._loader()
+            self.loads += 1
+            if rows is None:
+                return {}
+            products = {row['product_id']: row for row in sorted(rows, key=lambda r: r['product_id'])}
+            if generation == self._generation:
+                self._products = products
+                self._loaded_at = self._clock()
+            return products
+
+    def all(self) -> List[dict]:
+        return [dict(product) for product in self._index().values()]
+
+    def get(self, product_id: int) -> Optional[dict]:
+        product = self._index().get(product_id)
+        return dict(product) if product is not None else None
+
+    def invalidate(self):
+        self._generation += 1
+        self._products = None
@@ -1,41 +1,370 @@
 # src/api/client.py
 
+import functools
+import select
+import threading
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
 from typing import Optional, List, Tuple, Dict
 from datetime import datetime
-from src.config import PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE
+from src.config import (PGHOST, PGHOST_DIRECT, PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE, SCHEDULER_NOTIFY_CHANNEL,
+                        DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, DB_QUERY_INSTRUMENTATION, DB_SLOW_QUERY_MS,
+                        DB_PREPARED_STATEMENTS, CATALOG_NOTIFY_CHANNEL, CATALOG_CACHE_LISTEN)
+from src.api.backend import DatabaseBackend, FinishResult
+from src.api.catalog import ProductCatalog
+from src.api.schema import SCHEDULER_MIGRATIONS, migration_ddl, missing_objects
+from src.api.instrumentation import InstrumentedCursor, QueryStats, RoundTripCounter
+
+class _PreparedConnection(psycopg2.extensions.connection):
+    """
+    Koneksi pool yang mengingat statement yang sudah di-PREPARE di sesinya.
+    Koneksi baru (misal setelah reconnect) mulai dengan set kosong, jadi
+    statement otomatis di-PREPARE ulang saat pertama dipakai.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.round_trips: Optional[RoundTripCounter] = None # diisi DatabaseClient saat dipinjamkan
+
+    def _count_round_trip(self):
+        # commit/rollback tanpa transaksi terbuka tidak mengirim apa pun ke server
+        if self.round_trips is not None and \
+                self.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self.round_trips.add()
+
+    def commit(self):
+        self._count_round_trip()
+        super().commit()
+
+    def rollback(self):
+        self._count_round_trip()
+        super().rollback()
+
+def _is_transaction_pooler(host: str) -> bool:
+    # PgBouncer mode transaksi (mis. endpoint '-pooler' Neon): tiap transaksi bisa mendarat di
+    # backend berbeda, jadi state sesi (PREPARE, LISTEN, advisory lock) tidak bisa dipercaya.
+    return '-pooler' in host
+
+def _prepared_statements_enabled(mode: str, host: str) -> bool:
+    # Statement level SQL bisa hilang/duplikat di pooler mode transaksi
+    if mode == 'auto':
+        return not _is_transaction_pooler(host)
+    return mode == 'on'
+
+def _pooled(method):
+    """
+    Menjalankan method sebagai satu unit of work: meminjam koneksi dari pool
+    untuk thread pemanggil, lalu mengembalikannya setelah method selesai.
+    Query di dalamnya dicatat di QueryStats atas nama method ini.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._unit_of_work():
+            cursor = self.cursor
+            if cursor is None:
+                return method(self, *args, **kwargs)
+            caller = cursor.method_name
+            cursor.method_name = method.__name__
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                cursor.method_name = caller
+    return wrapper
+
+class DatabaseClient(DatabaseBackend):
+    """
+    Client DB thread-safe berbasis ThreadedConnectionPool. Setiap method publik
+    meminjam koneksi sendiri, sehingga thread Scheduler dan sesi interaktif (View)
+    bisa berjalan bersamaan tanpa berbagi transaksi atau kursor.
+    """
+    def __init__(self, min_conn: int = DB_POOL_MIN_CONN, max_conn: int = DB_POOL_MAX_CONN):
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._pool_slots = threading.BoundedSemaphore(max_conn)
+        self._local = threading.local() # koneksi & kursor milik thread yang sedang bekerja
+        self._scheduler_schema_ready = False
+        self.listen_conn = None # Koneksi khusus LISTEN (autocommit), terpisah dari transaksi
+        self.leader_conn = None # Sesi pemegang advisory lock leader (hot standby)
+        # LISTEN & advisory lock butuh sesi sungguhan: dibuka ke endpoint langsung, bukan pooler
+        self.session_features = not _is_transaction_pooler(PGHOST_DIRECT)
+        self._session_warned = False
+        # Round-trip DB: setiap execute kursor pool + commit/rollback transaksi yang terbuka
+        # (total & per thread; dibaca metrik Scheduler per siklus)
+        self.round_trip_counter = RoundTripCounter()
+        # Latensi/baris/error per method + slow-query log; bisa dinyalakan saat runtime
+        self.query_stats = QueryStats(DB_QUERY_INSTRUMENTATION, DB_SLOW_QUERY_MS)
+        # Query panas Scheduler dijalankan lewat PREPARE/EXECUTE (lihat _execute_prepared)
+        self._use_prepared = _prepared_statements_enabled(DB_PREPARED_STATEMENTS, PGHOST)
+        # Katalog produk dibaca dari cache bersama; thread LISTEN dibuka saat katalog pertama dimuat
+        self.catalog = ProductCatalog(self._load_product_catalog)
+        self._catalog_listener: Optional[threading.Thread] = None
+        self._catalog_stop = threading.Event()
+        self._connect(min_conn, max_conn)
+
+    def _connect_kwargs(self) -> dict:
+        return dict(
+            host=PGHOST,
+            database=PGDATABASE,
+            user=PGUSER,
+            password=PGPASSWORD,
+            sslmode=PGSSLMODE
+        )
+
+    def _session_connect_kwargs(self) -> dict:
+        """Koneksi langsung (non-pooler) untuk fitur level sesi."""
+        return dict(self._connect_kwargs(), host=PGHOST_DIRECT)
 
-class DatabaseClient:
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
-        self._connect()
+    def _session_features_available(self, feature: str) -> bool:
+        if self.session_features:
+            return True
+        if not self._session_warned: # dicetak sekali, listen() dicoba ulang tiap siklus
+            print(f"⚠️ PGHOST_DIRECT '{PGHOST_DIRECT}' adalah pooler mode transaksi: {feature} dinonaktifkan. "
+                  f"Set PGHOST_DIRECT ke endpoint langsung untuk mengaktifkannya.")
+            self._session_warned = True
+        return False
 
-    def _connect(self):
+    def _connect(self, min_conn: int = DB_POOL_MIN_CONN, max_conn: int = DB_POOL_MAX_CONN):
         try:
-            self.conn = psycopg2.connect (
-                host=PGHOST,
-                database=PGDATABASE,
-                user=PGUSER,
-                password=PGPASSWORD,
-                sslmode=PGSSLMODE
+            self._pool = psycopg2.pool.ThreadedConnectionPool(
+                min_conn, max_conn, connection_factory=_PreparedConnection, **self._connect_kwargs()
             )
-
-            self.conn.autocommit = False
-            self.cursor = self.conn.cursor()
             print("DB Connect!")
         
         except psycopg2.Error as e:
             print("Gagal connect DB, error: ", e)
+
+    @property
+    def round_trips(self) -> int:
+        return self.round_trip_counter.total
+
+    @property
+    def thread_round_trips(self) -> int:
+        """Round-trip milik thread pemanggil saja (thread Scheduler tidak ikut menghitung thread UI)."""
+        return self.round_trip_counter.in_thread()
+
+    @property
+    def conn(self):
+        return getattr(self._local, 'conn', None)
+
+    @property
+    def cursor(self):
+        return getattr(self._local, 'cursor', None)
+
+    @contextmanager
+    def _unit_of_work(self):
+        """
+        Meminjam satu koneksi dari pool untuk thread ini. Pemanggilan bersarang
+        di thread yang sama memakai koneksi yang sama.
+        """
+        if self._pool is None or getattr(self._local, 'depth', 0) > 0:
+            self._local.depth = getattr(self._local, 'depth', 0) + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        self._pool_slots.acquire() # blok (bukan error) jika pool sedang penuh
+        conn = None
+        try:
+            conn = self._pool.getconn()
+            conn.autocommit = False
+            self._local.conn = conn
+            conn.round_trips = self.round_trip_counter
+            cursor = conn.cursor(cursor_factory=InstrumentedCursor)
+            cursor.stats = self.query_stats
+            cursor.round_trips = self.round_trip_counter
+            self._local.cursor = cursor
+            self._local.depth = 1
+            yield
+        finally:
+            self._local.depth = 0
+            cursor = getattr(self._local, 'cursor', None)
+            self._local.conn = None
+            self._local.cursor = None
+            if conn is not None:
+                try:
+                    if cursor is not None:
+                        cursor.close()
+                    # SELECT tanpa commit meninggalkan transaksi terbuka; jangan kembalikan ke pool dalam kondisi itu
+                    if not conn.closed and \
+                            conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except psycopg2.Error:
+                    pass
+                self._pool.putconn(conn, close=bool(conn.closed))
+            self._pool_slots.release()
         
+    def set_query_instrumentation(self, enabled: bool = True, slow_query_ms: Optional[float] = None):
+        """Menyalakan/mematikan instrumentasi query saat runtime (berlaku untuk query berikutnya)."""
+        self.query_stats.enabled = enabled
+        if slow_query_ms is not None:
+            self.query_stats.slow_query_ms = slow_query_ms
+        print(f"📊 Instrumentasi query {'AKTIF' if enabled else 'NONAKTIF'}"
+              f" (ambang query lambat: {self.query_stats.slow_query_ms} ms)")
+
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        self._catalog_stop.set()
+        if self.query_stats.enabled:
+            print("📊 Statistik query DB:\n" + self.query_stats.report())
+        if self.listen_conn:
+            self.listen_conn.close()
+            self.listen_conn = None
+        if self.leader_conn:
+            self.leader_conn.close()
+            self.leader_conn = None
+        if self._pool is not None and not self._pool.closed:
+            self._pool.closeall()
         print("Koneksi ditutup")
 
-    
+    def listen(self, channel: str = SCHEDULER_NOTIFY_CHANNEL) -> bool:
+        """
+        Membuka koneksi autocommit terpisah (langsung, bukan lewat pooler) dan
+        menjalankan LISTEN pada channel. Notifikasi dibaca lewat wait_for_notifications().
+        Di pooler mode transaksi LISTEN tampak sukses tetapi NOTIFY tidak pernah sampai,
+        jadi dikembalikan False agar Scheduler memakai polling interval.
+        """
+        if not self._session_features_available("LISTEN/NOTIFY"):
+            return False
+        try:
+            self.listen_conn = psycopg2.connect(**self._session_connect_kwargs())
+            # NOTIFY hanya dikirim ke sesi yang tidak sedang dalam transaksi
+            self.listen_conn.autocommit = True
+            with self.listen_conn.cursor() as cur:
+                cur.execute(f"LISTEN {channel};")
+            return True
+        except psycopg2.Error as e:
+            print(f"⚠️ Gagal LISTEN channel '{channel}', fallback ke polling. Error: {e}")
+            if self.listen_conn:
+                self.listen_conn.close()
+            self.listen_conn = None
+            return False
+
+    def wait_for_notifications(self, timeout: Optional[float]) -> Optional[List[str]]:
+        """
+        Blok di socket koneksi LISTEN sampai ada NOTIFY atau timeout (detik) habis.
+        Mengembalikan list payload (kosong jika timeout), atau None jika koneksi LISTEN putus.
+        """
+        if self.listen_conn is None:
+            return None
+
+        try:
+            readable, _, _ = select.select([self.listen_conn], [], [], timeout)
+            if not readable:
+                return []
+
+            self.listen_conn.poll()
+            payloads = []
+            while self.listen_conn.notifies:
+                payloads.append(self.listen_conn.notifies.pop(0).payload)
+            return payloads
+        except (psycopg2.Error, OSError, ValueError) as e:
+            print(f"⚠️ Koneksi LISTEN terputus, fallback ke polling. Error: {e}")
+            try:
+                self.listen_conn.close()
+            except psycopg2.Error:
+                pass
+            self.listen_conn = None
+            return None
+
+    def _start_catalog_listener(self):
+        if not CATALOG_CACHE_LISTEN or self._catalog_listener is not None:
+            return
+        if not self._session_features_available("LISTEN katalog (cache memakai TTL)"):
+            return
+        self._catalog_listener = threading.Thread(target=self._listen_catalog_changes,
+                                                  name='matcha-catalog-listener', daemon=True)
+        self._catalog_listener.start()
+
+    def _listen_catalog_changes(self):
+        """
+        Thread LISTEN katalog: setiap NOTIFY dari trigger tabel product (proses mana pun)
+        meng-invalidate cache. Jika koneksi gagal/putus, cache tetap aman lewat TTL.
+        """
+        conn = None
+        try:
+            conn = psycopg2.connect(**self._session_connect_kwargs())
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CATALOG_NOTIFY_CHANNEL};")
+            while not self._catalog_stop.is_set():
+                readable, _, _ = select.select([conn], [], [], 1.0)
+                if not readable:
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    self.catalog.invalidate()
+        except (psycopg2.Error, OSError, ValueError) as e:
+            print(f"⚠️ LISTEN katalog produk berhenti, cache memakai TTL. Error: {e}")
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+
+    def _close_leader_conn(self):
+        try:
+            if self.leader_conn is not None:
+                self.leader_conn.close()
+        except psycopg2.Error:
+            pass
+        self.leader_conn = None
+
+    def try_acquire_leader_lock(self, lock_key: int) -> bool:
+        """
+        Mencoba menjadi leader Scheduler dengan pg_try_advisory_lock (non-blocking).
+        Lock level sesi dipegang koneksi khusus; jika proses/koneksi leader mati,
+        Postgres melepas lock dan standby berikutnya bisa mengambilnya.
+        Keepalive TCP memastikan sesi host yang hilang tanpa FIN tetap terdeteksi.
+        Lewat pooler mode transaksi lock tidak terikat ke sesi ini, jadi tidak pernah diambil.
+        """
+        if not self._session_features_available("leader election (advisory lock)"):
+            return False
+        try:
+            if self.leader_conn is None or self.leader_conn.closed:
+                self.leader_conn = psycopg2.connect(**self._session_connect_kwargs(), keepalives=1,
+                                                    keepalives_idle=5, keepalives_interval=1,
+                                                    keepalives_count=3)
+                self.leader_conn.autocommit = True
+            with self.leader_conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s);", (lock_key,))
+                return bool(cur.fetchone()[0])
+        except psycopg2.Error as e:
+            print(f"⚠️ Gagal mencoba advisory lock leader. Error: {e}")
+            self._close_leader_conn()
+            return False
+
+    def check_leader_lock(self, lock_key: int) -> bool:
+        """
+        Heartbeat leader: lock level sesi tetap dipegang selama sesi hidup,
+        jadi cukup memastikan koneksi pemegang lock masih merespons.
+        """
+        if self.leader_conn is None or self.leader_conn.closed:
+            return False
+        try:
+            with self.leader_conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+            return True
+        except psycopg2.Error as e:
+            print(f"⚠️ Sesi leader terputus, advisory lock {lock_key} hilang. Error: {e}")
+            self._close_leader_conn()
+            return False
+
+    def release_leader_lock(self, lock_key: int):
+        if self.leader_conn is None or self.leader_conn.closed:
+            return
+        try:
+            with self.leader_conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (lock_key,))
+        except psycopg2.Error as e:
+            print(f"⚠️ Gagal melepas advisory lock leader. Error: {e}")
+        self._close_leader_conn()
+
     def _execute_query(self, query: str, params=None):
         if self.cursor is None or self.conn is None:
             error_msg = "❌ Koneksi atau kursor DB belum diinisialisasi. Gagal eksekusi query."
@@ -49,6 +378,50 @@ class DatabaseClient:
             print(f"❌ Error saat menjalankan query: {e}")
             raise
 
+    @staticmethod
+    def _to_positional(query: str) -> str:
+        """Mengubah placeholder %s psycopg2 menjadi $1, $2, ... untuk PREPARE."""
+        parts = query.replace('%%', '\0').split('%s')
+        text = parts[0]
+        for i, part in enumerate(parts[1:], start=1):
+            text += f"${i}" + part
+        return text.replace('\0', '%')
+
+    def _execute_prepared(self, name: str, query: str, params: tuple = ()):
+        """
+        Menjalankan query lewat prepared statement bernama: PREPARE sekali per
+        koneksi, lalu EXECUTE dengan parameter, sehingga teks SQL tidak dikirim
+        dan direncanakan ulang setiap siklus. Jika prepared statement tidak
+        didukung (pooler mode transaksi), query dijalankan biasa.
+        """
+        conn = self.conn
+        if not self._use_prepared or not isinstance(conn, _PreparedConnection):
+            self.cursor.execute(query, params or None)
+            return self.cursor
+
+        statement = f"matcha_{name}"
+        was_idle = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            if statement not in conn.prepared:
+                self.cursor.execute(f"PREPARE {statement} AS {self._to_positional(query)}")
+                conn.prepared.add(statement)
+            if params:
+                self.cursor.execute(f"EXECUTE {statement} ({', '.join(['%s'] * len(params))});", params)
+            else:
+                self.cursor.execute(f"EXECUTE {statement};")
+            return self.cursor
+        except (psycopg2.errors.DuplicatePreparedStatement, psycopg2.errors.InvalidSqlStatementName) as e:
+            # Isi sesi server tidak sesuai catatan koneksi: tanda pooler mode transaksi
+            conn.prepared.clear()
+            self._use_prepared = False
+            print(f"⚠️ Prepared statement '{statement}' tidak konsisten dengan sesi server ({e.pgcode}). "
+                  f"Beralih ke query biasa.")
+            if not was_idle:
+                raise # statement sebelumnya di transaksi ini ikut batal; biarkan method pemanggil rollback
+            conn.rollback()
+            self.cursor.execute(query, params or None)
+            return self.cursor
+
     def _commit(self):
         if self.conn is None:
             error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal melakukan commit."
@@ -63,6 +436,11 @@ class DatabaseClient:
             raise
 
     def fetch_all_products(self) -> List[Dict]:
+        """Semua produk (urut product_id), dilayani dari cache katalog."""
+        return self.catalog.all()
+
+    @_pooled
+    def _load_product_catalog(self) -> Optional[List[Dict]]:
             query = "SELECT product_id, product_name, description, price FROM product;"
             
             if self.cursor is None or self.conn is None:
@@ -77,7 +455,7 @@ class DatabaseClient:
                 if self.cursor.description is None:
                     # Jika tidak ada description, ini bukan hasil SELECT yang valid atau kursor error
                     print("❌ Query berhasil, namun tidak ada deskripsi kolom yang ditemukan.")
-                    return []
+                    return None
                 
                 columns = [desc[0] for desc in self.cursor.description]
                 
@@ -85,12 +463,14 @@ class DatabaseClient:
                 for row in results:
                     products.append(dict(zip(columns, row))) 
                     
+                self._start_catalog_listener()
                 return products
                 
             except psycopg2.Error as e:
                 print(f"❌ Gagal mengambil produk: {e}")
-                return []
+                return None # jangan cache katalog kosong karena error
 
+    @_pooled
     def force_order_status(self, order_id: int, new_status_id: int) -> bool:
         """Mengubah status order secara paksa untuk keperluan testing/admin."""
         query = "UPDATE orders SET status_id = %s WHERE order_id = %s;"
@@ -110,12 +490,76 @@ class DatabaseClient:
             print(f"❌ DB Error (force_order_status): {e}")
             return False
 
-    def fetch_new_orders(self) -> List[Tuple]:
+    @_pooled
+    def apply_scheduler_schema(self) -> Dict[str, bool]:
+        """
+        Migrasi sekali jalan (python -m src.api.schema): kolom/index/trigger Scheduler.
+        Setiap fitur di transaksinya sendiri; mengembalikan {fitur: berhasil}.
+        """
+        if self.cursor is None or self.conn is None:
+            error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal menyiapkan skema Scheduler."
+            print(error_msg)
+            raise ConnectionError(error_msg)
+
+        results = {}
+        for feature in SCHEDULER_MIGRATIONS:
+            try:
+                self.cursor.execute(migration_ddl(feature))
+                self._commit()
+                results[feature] = True
+            except psycopg2.Error as e:
+                self.conn.rollback()
+                results[feature] = False
+                print(f"❌ Migrasi skema Scheduler '{feature}' GAGAL. Error: {e}")
+        return results
+
+    @_pooled
+    def check_scheduler_schema(self) -> Dict[str, bool]:
         """
-        Mengambil pesanan yang statusnya 'Diproses' (status_id=2) dan siap dijadwalkan.
-        Mengembalikan data yang dibutuhkan untuk inisialisasi objek Order.
+        Dipanggil saat startup Scheduler: hanya membaca katalog (tanpa DDL/lock tabel)
+        untuk memastikan objek tiap fitur sudah dibuat migrasi. Mengembalikan {fitur: siap};
+        fitur yang objeknya belum lengkap dilaporkan dan dinonaktifkan.
         """
+        if self.cursor is None or self.conn is None:
+            error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal memeriksa skema Scheduler."
+            print(error_msg)
+            raise ConnectionError(error_msg)
+
         query = """
+            SELECT 'column:' || table_name || '.' || column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'orders'
+            UNION ALL
+            SELECT 'trigger:' || tgname FROM pg_trigger WHERE NOT tgisinternal
+            UNION ALL
+            SELECT 'index:' || indexname FROM pg_indexes WHERE schemaname = current_schema();
+        """
+        try:
+            self.cursor.execute(query)
+            existing = {row[0] for row in self.cursor.fetchall()}
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"⚠️ DB Warning (check_scheduler_schema): skema tidak bisa diperiksa, fitur skema nonaktif. {e}")
+            existing = set()
+
+        missing = missing_objects(existing)
+        for feature, objects in sorted(missing.items()):
+            print(f"⚠️ Fitur Scheduler '{feature}' nonaktif, objek belum ada: {', '.join(sorted(objects))}. "
+                  f"Jalankan: python -m src.api.schema")
+        self._scheduler_schema_ready = 'delta_intake' not in missing
+        return {feature: feature not in missing for feature in SCHEDULER_MIGRATIONS}
+
+    @_pooled
+    def fetch_new_orders(self, since: Optional[datetime] = None) -> List[Tuple]:
+        """
+        Mengambil pesanan yang statusnya 'Diproses' (status_id=2) dan siap dijadwalkan,
+        yaitu yang belum pernah masuk production_batch.
+        Jika skema Scheduler siap, kolom ke-9 berisi status_updated_at (watermark)
+        dan 'since' membatasi hasil ke order yang berubah setelah watermark tersebut.
+        """
+        delta = self._scheduler_schema_ready
+
+        query = f"""
             SELECT 
             o.order_id, 
             o.customer_id,
@@ -124,16 +568,22 @@ class DatabaseClient:
             o.total_price, 
             o.status_id, 
             o.total_quantity, 
-            s.status_name  -- Kolom terakhir, tanpa koma
+            s.status_name{", o.status_updated_at" if delta else ""}
         FROM 
             orders o -- Ambil dari tabel orders dengan alias 'o'
         JOIN 
             status s ON o.status_id = s.status_id -- Gabungkan dengan tabel status (alias 's')
         WHERE 
             o.status_id = 2 -- Filter status
+            AND NOT EXISTS (
+                SELECT 1 FROM production_batch pb WHERE pb.order_id = o.order_id
+            ) -- Order yang sudah/ sedang di mesin tidak diambil lagi
+            {"AND o.status_updated_at > %s" if delta and since is not None else ""}
         ORDER BY 
-            o.order_timestamp ASC;
+            {"o.status_updated_at ASC, o.order_id ASC" if delta else "o.order_timestamp ASC"};
         """
+        params = (since,) if delta and since is not None else ()
+        statement = "fetch_new_orders" + ("_delta" if delta else "") + ("_since" if params else "")
         
         if self.cursor is None or self.conn is None:
                 error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal melakukan commit."
@@ -141,12 +591,151 @@ class DatabaseClient:
                 raise ConnectionError(error_msg)
         
         try:
-            self.cursor.execute(query)
+            self._execute_prepared(statement, query, params)
             return self.cursor.fetchall()
         except psycopg2.Error as e:
+            self.conn.rollback()
             print(f"❌ Gagal mengambil order baru untuk Scheduler: {e}")
             return []
 
+    @_pooled
+    def claim_ready_orders(self, replica_id: str, limit: int, lease_seconds: float) -> List[Tuple]:
+        """
+        Mengklaim order siap produksi untuk satu replica Scheduler secara atomik.
+        Baris yang sedang dikunci replica lain dilewati (FOR UPDATE SKIP LOCKED), jadi
+        dua replica tidak pernah mengklaim order yang sama. Klaim yang lease-nya habis
+        (replica mati) bisa diklaim ulang. Format baris sama dengan fetch_new_orders
+        (kolom ke-9 = status_updated_at).
+        """
+        if limit <= 0:
+            return []
+
+        query = """
+            WITH candidate AS (
+                SELECT o.order_id
+                FROM orders o
+                WHERE o.status_id = 2
+                    AND NOT EXISTS (
+                        SELECT 1 FROM production_batch pb WHERE pb.order_id = o.order_id
+                    )
+                    AND (o.claimed_by IS NULL OR o.claim_expires_at < NOW())
+                ORDER BY o.deadline ASC, o.order_id ASC
+                LIMIT %s
+                FOR UPDATE OF o SKIP LOCKED
+            ), claimed AS (
+                UPDATE orders o
+                SET claimed_by = %s, claim_expires_at = NOW() + make_interval(secs => %s)
+                FROM candidate c
+                WHERE o.order_id = c.order_id
+                RETURNING o.order_id, o.customer_id, o.order_timestamp, o.deadline, o.total_price,
+                          o.status_id, o.total_quantity, o.status_updated_at
+            )
+            SELECT c.order_id, c.customer_id, c.order_timestamp, c.deadline, c.total_price,
+                   c.status_id, c.total_quantity, s.status_name, c.status_updated_at
+            FROM claimed c
+            JOIN status s ON c.status_id = s.status_id
+            ORDER BY c.deadline ASC, c.order_id ASC;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengklaim order."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self.cursor.execute(query, (limit, replica_id, lease_seconds))
+            rows = self.cursor.fetchall()
+            self._commit()
+            return rows
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengklaim order untuk replica '{replica_id}': {e}")
+            return []
+
+    @_pooled
+    def renew_claims(self, replica_id: str, order_ids: List[int], lease_seconds: float) -> Optional[List[int]]:
+        """
+        Heartbeat lease: memperpanjang klaim order yang masih dimiliki replica ini.
+        Mengembalikan order_id yang klaimnya masih sah (order lain sudah diambil
+        replica lain dan harus dibuang dari antrian), atau None jika query gagal.
+        """
+        if not order_ids:
+            return []
+
+        query = """
+            UPDATE orders
+            SET claim_expires_at = NOW() + make_interval(secs => %s)
+            WHERE claimed_by = %s AND order_id = ANY(%s) AND status_id = 2
+            RETURNING order_id;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal memperpanjang klaim."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self.cursor.execute(query, (lease_seconds, replica_id, list(order_ids)))
+            still_owned = [row[0] for row in self.cursor.fetchall()]
+            self._commit()
+            return still_owned
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal memperpanjang klaim replica '{replica_id}': {e}")
+            return None
+
+    @_pooled
+    def release_claims(self, replica_id: str, order_ids: List[int]) -> bool:
+        """Melepas klaim (misal saat shutdown) agar replica lain bisa langsung mengambilnya."""
+        if not order_ids:
+            return True
+
+        query = """
+            UPDATE orders SET claimed_by = NULL, claim_expires_at = NULL
+            WHERE claimed_by = %s AND order_id = ANY(%s);
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal melepas klaim."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self.cursor.execute(query, (replica_id, list(order_ids)))
+            self._commit()
+            return True
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal melepas klaim replica '{replica_id}': {e}")
+            return False
+
+    @_pooled
+    def fetch_orders_changed_since(self, since: datetime) -> Optional[List[int]]:
+        """
+        order_id yang status-nya berubah atau mulai diproduksi setelah 'since'
+        (dipakai untuk rekonsiliasi snapshot antrian saat restart).
+        Mengembalikan None jika query gagal.
+        """
+        query = """
+            SELECT order_id FROM orders WHERE status_updated_at > %s
+            UNION
+            SELECT order_id FROM production_batch WHERE start_time > %s;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil order yang berubah."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self.cursor.execute(query, (since, since))
+            return [row[0] for row in self.cursor.fetchall()]
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil order yang berubah sejak snapshot: {e}")
+            return None
+
+    @_pooled
     def fetch_customer_orders(self, customer_id: int) -> List[Tuple]:
         """Mengambil daftar pesanan pelanggan, termasuk nama status."""
         query = """
@@ -177,6 +766,7 @@ class DatabaseClient:
             print(f"❌ Gagal mengambil pesanan pelanggan: {e}")
             return []
 
+    @_pooled
     def fetch_low_stock_items(self, threshold: int) -> List[str]:
         """Mengambil nama-nama item yang stoknya di bawah ambang batas."""
         query = """
@@ -190,13 +780,227 @@ class DatabaseClient:
                 raise ConnectionError(error_msg)
         
         try:
-            self.cursor.execute(query, (threshold,))
+            self._execute_prepared('fetch_low_stock_items', query, (threshold,))
             # Mengambil list item_name (flattened list)
             return [row[0] for row in self.cursor.fetchall()]
         except psycopg2.Error as e:
             print(f"❌ Gagal mengambil stok rendah: {e}")
             return []
     
+    @_pooled
+    def fetch_low_stock_ingredient_ids(self) -> List[int]:
+        """Mengambil ingredient_id yang stoknya <= minimum_stock masing-masing."""
+        query = """
+            SELECT ingredient_id FROM ingredient
+            WHERE stock <= minimum_stock;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil stok rendah."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+        
+        try:
+            self._execute_prepared('fetch_low_stock_ingredient_ids', query)
+            return [row[0] for row in self.cursor.fetchall()]
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil ingredient stok rendah: {e}")
+            return []
+
+    @_pooled
+    def fetch_ingredients_for_orders(self, order_ids: List[int]) -> List[Tuple]:
+        """
+        Mengambil kebutuhan bahan baku untuk sekumpulan order dalam satu query.
+        Mengembalikan list of (order_id, ingredient_id, total_quantity).
+        """
+        if not order_ids:
+            return []
+
+        query = """
+            SELECT
+                oi.order_id,
+                pi.ingredient_id,
+                SUM(oi.quantity * pi.quantity_per_unit) AS total_quantity
+            FROM
+                order_item oi
+            JOIN
+                product_ingredients pi ON oi.product_id = pi.product_id
+            WHERE
+                oi.order_id = ANY(%s)
+            GROUP BY
+                oi.order_id, pi.ingredient_id;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil resep order."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+        
+        try:
+            self.cursor.execute(query, (list(order_ids),))
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil kebutuhan bahan baku order: {e}")
+            return []
+    
+    @_pooled
+    def fetch_recipes(self) -> Optional[List[Tuple]]:
+        """
+        Mengambil seluruh resep untuk cache bill-of-materials Scheduler.
+        Mengembalikan list of (product_id, ingredient_id, quantity_per_unit), atau None jika gagal.
+        """
+        query = "SELECT product_id, ingredient_id, quantity_per_unit FROM product_ingredients;"
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil resep."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self.cursor.execute(query)
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil resep produk: {e}")
+            return None
+
+    @_pooled
+    def fetch_ingredient_stock(self) -> Optional[List[Tuple[int, float]]]:
+        """
+        Stok semua bahan baku dalam satu query (refresh ledger reservasi Scheduler per fase dispatch).
+        Mengembalikan list of (ingredient_id, stock), atau None jika gagal.
+        """
+        query = "SELECT ingredient_id, stock FROM ingredient;"
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil stok bahan baku."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+
+        try:
+            self._execute_prepared('fetch_ingredient_stock', query)
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil stok bahan baku: {e}")
+            return None
+
+    @_pooled
+    def fetch_order_items_for_orders(self, order_ids: List[int]) -> List[Tuple]:
+        """
+        Mengambil item untuk sekumpulan order dalam satu query.
+        Mengembalikan list of (order_item_id, order_id, product_id, quantity).
+        """
+        if not order_ids:
+            return []
+
+        query = """
+            SELECT order_item_id, order_id, product_id, quantity
+            FROM order_item
+            WHERE order_id = ANY(%s);
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil item order."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+        
+        try:
+            self.cursor.execute(query, (list(order_ids),))
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil item order: {e}")
+            return []
+
+    @_pooled
+    def fetch_production_history(self, limit: int) -> List[Tuple]:
+        """
+        Mengambil riwayat batch COMPLETED terbaru untuk melatih model durasi.
+        Mengembalikan list of (production_id, machine_id, start_time, finish_time, product_id, quantity),
+        urut dari batch paling lama.
+        """
+        query = """
+            WITH recent AS (
+                SELECT production_id, order_id, machine_id, start_time, finish_time
+                FROM production_batch
+                WHERE status = 'COMPLETED' AND finish_time IS NOT NULL
+                ORDER BY finish_time DESC
+                LIMIT %s
+            )
+            SELECT r.production_id, r.machine_id, r.start_time, r.finish_time, oi.product_id, oi.quantity
+            FROM recent r
+            JOIN order_item oi ON oi.order_id = r.order_id
+            ORDER BY r.finish_time ASC, r.production_id ASC;
+        """
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil riwayat produksi."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+        
+        try:
+            self.cursor.execute(query, (limit,))
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil riwayat produksi: {e}")
+            return []
+    
+    @_pooled
+    def fetch_open_production_batches(self, machine_ids: Optional[List[int]] = None) -> List[Tuple]:
+        """
+        Mengambil semua batch IN_PROGRESS (opsional: hanya untuk machine_ids tertentu)
+        beserta data order dan itemnya dalam satu query, untuk recovery setelah restart.
+        Mengembalikan list of (production_id, machine_id, start_time, order_id, customer_id,
+        order_timestamp, deadline, total_price, status_id, total_quantity, status_name,
+        items) dengan items = [[order_item_id, product_id, quantity], ...].
+        """
+        query = f"""
+            SELECT
+                pb.production_id,
+                pb.machine_id,
+                pb.start_time,
+                o.order_id,
+                o.customer_id,
+                o.order_timestamp,
+                o.deadline,
+                o.total_price,
+                o.status_id,
+                o.total_quantity,
+                s.status_name,
+                COALESCE(
+                    json_agg(json_build_array(oi.order_item_id, oi.product_id, oi.quantity))
+                        FILTER (WHERE oi.order_item_id IS NOT NULL),
+                    '[]'::json
+                ) AS items
+            FROM production_batch pb
+            JOIN orders o ON o.order_id = pb.order_id
+            JOIN status s ON s.status_id = o.status_id
+            LEFT JOIN order_item oi ON oi.order_id = o.order_id
+            WHERE pb.status = 'IN_PROGRESS'
+                {"AND pb.machine_id = ANY(%s)" if machine_ids is not None else ""}
+            GROUP BY pb.production_id, o.order_id, s.status_name
+            ORDER BY pb.start_time ASC, pb.production_id ASC;
+        """
+        params = (list(machine_ids),) if machine_ids is not None else None
+
+        if self.cursor is None or self.conn is None:
+                error_msg = "❌ Koneksi DB belum diinisialisasi. Gagal mengambil batch yang sedang berjalan."
+                print(error_msg)
+                raise ConnectionError(error_msg)
+        
+        try:
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Gagal mengambil batch IN_PROGRESS untuk recovery: {e}")
+            return []
+
+    @_pooled
     def fetch_pending_orders_by_customer(self, customer_id: int) -> List[Tuple]:
         """Mengambil pesanan yang masih 'Menunggu Konfirmasi' (status_id=1) oleh pelanggan."""
         query = """
@@ -227,6 +1031,7 @@ class DatabaseClient:
             print(f"❌ Gagal mengambil pending orders: {e}")
             return []
     
+    @_pooled
     def fetch_order_details_by_id(self, order_id: int, customer_id: int) -> Optional[Tuple]:
         """
         Mengambil detail pesanan lengkap: Header dan Items.
@@ -280,6 +1085,7 @@ class DatabaseClient:
             print(f"❌ Gagal mengambil detail pesanan {order_id}: {e}")
             return None
 
+    @_pooled
     def update_order_status(self, order_id: int, new_status_id: int) -> bool:
         """Mengupdate status_id pesanan berdasarkan order_id."""
         query = "UPDATE orders SET status_id = %s WHERE order_id = %s;"
@@ -298,6 +1104,7 @@ class DatabaseClient:
             print(f"❌ Gagal update status pesanan {order_id}: {e}")
             return False
     
+    @_pooled
     def create_order_transaction(self, customer_id: int, total_price: float, total_quantity: int, 
                                  deadline: datetime, order_items: List[dict]) -> Optional[int]:
         """Membuat pesanan baru dan item pesanan secara transaksional.
@@ -308,37 +1115,40 @@ class DatabaseClient:
                 print(error_msg)
                 raise ConnectionError(error_msg)
         
-        try:
-            # 1. INSERT ke tabel orders (Default status_id = 1 'Menunggu Konfirmasi')
-            order_insert_query = """
+        # INSERT orders + semua order_item dalam satu statement: jumlah round-trip
+        # tetap sama berapa pun banyaknya baris item (order B2B bisa ratusan baris).
+        query = """
+            WITH new_order AS (
+                -- Default status_id = 1 'Menunggu Konfirmasi'
                 INSERT INTO orders (customer_id, deadline, total_price, total_quantity, status_id)
-                VALUES (%s, %s, %s, %s, 1) RETURNING order_id;
-            """
-            
-            self.cursor.execute(order_insert_query, 
-                                (customer_id, deadline, total_price, total_quantity))
-            
+                VALUES (%s, %s, %s, %s, 1)
+                RETURNING order_id
+            ), new_items AS (
+                INSERT INTO order_item (order_id, product_id, quantity)
+                SELECT n.order_id, i.product_id, i.quantity
+                FROM new_order n
+                CROSS JOIN unnest(%s::int[], %s::int[]) AS i(product_id, quantity)
+                RETURNING 1
+            )
+            SELECT order_id, (SELECT COUNT(*) FROM new_items) FROM new_order;
+        """
+        product_ids = [item['product_id'] for item in order_items]
+        quantities = [item['quantity'] for item in order_items]
+
+        try:
+            self.cursor.execute(query, (customer_id, deadline, total_price, total_quantity,
+                                        product_ids, quantities))
             fetched_result = self.cursor.fetchone()
         
-            if fetched_result is None:
-                # Jika INSERT gagal mengembalikan ID, ini adalah kegagalan fatal.
-                print("❌ Transaction GAGAL: INSERT Order tidak mengembalikan Order ID.")
+            if fetched_result is None or fetched_result[1] != len(order_items):
+                # Jika INSERT gagal mengembalikan ID atau ada item yang tidak tersimpan, ini adalah kegagalan fatal.
+                print("❌ Transaction GAGAL: INSERT Order tidak mengembalikan Order ID atau item tidak lengkap.")
                 self.conn.rollback() 
                 return None
             
             new_order_id = fetched_result[0] # Ambil ID yang baru dibuat
 
-            # 2. INSERT massal ke tabel order_item
-            order_item_insert_query = """
-                INSERT INTO order_item (order_id, product_id, quantity)
-                VALUES (%s, %s, %s);
-            """
-            
-            for item in order_items:
-                self.cursor.execute(order_item_insert_query, 
-                                    (new_order_id, item['product_id'], item['quantity']))
-            
-            # 3. COMMIT Transaksi
+            # COMMIT Transaksi
             self._commit() 
             return new_order_id
             
@@ -348,6 +1158,7 @@ class DatabaseClient:
             print(f"❌ Transaction GAGAL saat membuat pesanan. Error: {e}")
             return None
 
+    @_pooled
     def start_production_transaction(self, order_id: int, machine_id: int) -> Optional[int]:
         """
         [TODO 1] Memulai transaksi produksi:
@@ -361,14 +1172,14 @@ class DatabaseClient:
         
         try:
             update_order_query = "UPDATE orders SET status_id = 2 WHERE order_id = %s;"
-            self.cursor.execute(update_order_query, (order_id,))
+            self._execute_prepared('start_production_order', update_order_query, (order_id,))
 
             insert_batch_query = """
                 INSERT INTO production_batch (order_id, machine_id, start_time, status)
                 VALUES (%s, %s, NOW(), 'IN_PROGRESS')
                 RETURNING production_id;
             """
-            self.cursor.execute(insert_batch_query, (order_id, machine_id))
+            self._execute_prepared('start_production_insert_batch', insert_batch_query, (order_id, machine_id))
             
             fetched_result = self.cursor.fetchone()
 
@@ -389,32 +1200,191 @@ class DatabaseClient:
             print(f"❌ Transaction GAGAL saat memulai produksi Order ID {order_id}. Error: {e}")
             return None
     
-    def finish_production_transaction(self, order_id: int, production_batch_id: int):
-        
+    @_pooled
+    def finish_production_transaction(self, order_id: int, production_batch_id: int) -> FinishResult:
+        """
+        Menutup satu batch produksi. ALREADY_CLOSED jika batch sudah tidak IN_PROGRESS
+        (ditutup proses lain), FAILED jika transaksi gagal dan boleh dicoba lagi.
+        """
         if self.cursor is None or self.conn is None:
             error_msg = "❌ Koneksi atau kursor DB belum diinisialisasi. Gagal menyelesaikan produksi."
             print(error_msg)
             raise ConnectionError(error_msg)
     
         try:
+            # Hanya batch yang masih IN_PROGRESS: batch yang sudah ditutup leader lain tidak ditutup ulang
             update_batch_query = """
                 UPDATE production_batch SET finish_time = NOW(), status = 'COMPLETED'
-                WHERE production_id = %s;
+                WHERE production_id = %s AND order_id = %s AND status = 'IN_PROGRESS';
             """
-            self.cursor.execute(update_batch_query, (production_batch_id,))
+            self._execute_prepared('finish_production_batch_row', update_batch_query,
+                                   (production_batch_id, order_id))
+            if self.cursor.rowcount != 1:
+                print(f"⚠️ Batch {production_batch_id} (Order ID {order_id}) sudah tidak IN_PROGRESS. Rollback.")
+                self.conn.rollback()
+                return FinishResult.ALREADY_CLOSED
 
             update_order_query = "UPDATE orders SET status_id = 4 WHERE order_id = %s;"
-            self.cursor.execute(update_order_query, (order_id,))
+            self._execute_prepared('finish_production_order', update_order_query, (order_id,))
             
             self._commit() 
             
-            return True
+            return FinishResult.FINISHED
             
         except psycopg2.Error as e:
             self.conn.rollback()
             print(f"❌ Transaction GAGAL saat menyelesaikan produksi Order ID {order_id}. Error: {e}")
+            return FinishResult.FAILED
+
+    @_pooled
+    def start_production_batch(self, assignments: List[Tuple[int, int]],
+                               replica_id: Optional[str] = None) -> Dict[int, int]:
+        """
+        Versi massal start_production_transaction untuk semua mesin yang mulai
+        di satu siklus: satu statement multi-row + satu commit.
+        assignments: list of (order_id, machine_id).
+        Order yang sudah punya production_batch tidak dimulai ulang; jika replica_id
+        diisi, hanya order yang masih diklaim replica tsb yang dimulai.
+        Mengembalikan {order_id: production_id}; dict kosong jika transaksi gagal.
+        """
+        if not assignments:
+            return {}
+
+        if self.cursor is None or self.conn is None:
+            error_msg = "❌ Koneksi atau kursor DB belum diinisialisasi. Gagal memulai produksi."
+            print(error_msg)
+            raise ConnectionError(error_msg)
+
+        query = f"""
+            WITH assign AS (
+                SELECT * FROM unnest(%s::int[], %s::int[]) AS a(order_id, machine_id)
+            ), order_upd AS (
+                UPDATE orders o SET status_id = 2
+                FROM assign a
+                WHERE o.order_id = a.order_id
+                    AND NOT EXISTS (
+                        SELECT 1 FROM production_batch pb WHERE pb.order_id = o.order_id
+                    )
+                    {"AND o.claimed_by = %s" if replica_id is not None else ""}
+                RETURNING o.order_id
+            )
+            INSERT INTO production_batch (order_id, machine_id, start_time, status)
+            SELECT a.order_id, a.machine_id, NOW(), 'IN_PROGRESS'
+            FROM assign a
+            JOIN order_upd u ON u.order_id = a.order_id
+            RETURNING order_id, production_id;
+        """
+        order_ids = [order_id for order_id, _ in assignments]
+        machine_ids = [machine_id for _, machine_id in assignments]
+        params = (order_ids, machine_ids) + ((replica_id,) if replica_id is not None else ())
+
+        statement = "start_production_batch" + ("_claimed" if replica_id is not None else "")
+
+        try:
+            self._execute_prepared(statement, query, params)
+            batch_ids = {order_id: production_id for order_id, production_id in self.cursor.fetchall()}
+            self._commit()
+            return batch_ids
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Transaction GAGAL saat memulai produksi massal ({len(assignments)} order). Error: {e}")
+            return {}
+
+    @_pooled
+    def finish_production_batch(self, finished: List[Tuple[int, int]],
+                                deductions: Optional[Dict[int, Dict[int, float]]] = None) -> bool:
+        """
+        Versi massal finish_production_transaction + deduct_ingredients_for_order:
+        menutup semua batch, menandai order selesai (status_id = 4), dan mengurangi
+        stok bahan baku untuk semua order tsb dalam satu statement + satu commit.
+        finished: list of (order_id, production_batch_id).
+        deductions: kebutuhan bahan per order {order_id: {ingredient_id: qty}} dari cache
+        bill-of-materials; None = dihitung di DB lewat JOIN order_item x product_ingredients.
+
+        Idempoten: hanya batch yang masih IN_PROGRESS yang ditutup, dan update order serta
+        pengurangan stok dihitung dari batch yang benar-benar ditutup (RETURNING batch_upd).
+        Jika ada batch yang sudah ditutup (misal oleh leader lain), seluruhnya di-rollback.
+        """
+        if not finished:
+            return True
+
+        if self.cursor is None or self.conn is None:
+            error_msg = "❌ Koneksi atau kursor DB belum diinisialisasi. Gagal menyelesaikan produksi."
+            print(error_msg)
+            raise ConnectionError(error_msg)
+
+        query = """
+            WITH done AS (
+                SELECT * FROM unnest(%s::int[], %s::int[]) AS d(order_id, production_id)
+            ), batch_upd AS (
+                UPDATE production_batch pb SET finish_time = NOW(), status = 'COMPLETED'
+                FROM done d
+                WHERE pb.production_id = d.production_id AND pb.order_id = d.order_id
+                  AND pb.status = 'IN_PROGRESS'
+                RETURNING pb.production_id, pb.order_id
+            ), order_upd AS (
+                UPDATE orders o SET status_id = 4
+                FROM batch_upd b
+                WHERE o.order_id = b.order_id
+                RETURNING o.order_id
+            ), ingredients_needed AS (
+                {ingredients_needed}
+            ), stock_upd AS (
+                UPDATE ingredient
+                SET stock = ingredient.stock - ineeded.total_deduction_amount
+                FROM ingredients_needed AS ineeded
+                WHERE ingredient.ingredient_id = ineeded.ingredient_id
+                RETURNING ingredient.ingredient_id
+            )
+            SELECT
+                (SELECT COUNT(*) FROM batch_upd),
+                (SELECT COUNT(*) FROM order_upd);
+        """
+        order_ids = [order_id for order_id, _ in finished]
+        batch_ids = [batch_id for _, batch_id in finished]
+        if deductions is None:
+            name, params = 'finish_production_batch', (order_ids, batch_ids)
+            query = query.replace('{ingredients_needed}', """
+                SELECT
+                    t2.ingredient_id,
+                    SUM(t1.quantity * t2.quantity_per_unit) AS total_deduction_amount
+                FROM
+                    order_item t1
+                JOIN
+                    product_ingredients t2 ON t1.product_id = t2.product_id
+                WHERE
+                    t1.order_id IN (SELECT order_id FROM batch_upd)
+                GROUP BY
+                    t2.ingredient_id""")
+        else:
+            name = 'finish_production_batch_bom'
+            rows = [(order_id, ingredient_id, quantity)
+                    for order_id, requirements in deductions.items() for ingredient_id, quantity in requirements.items()]
+            params = (order_ids, batch_ids, [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+            query = query.replace('{ingredients_needed}', """
+                SELECT n.ingredient_id, SUM(n.quantity) AS total_deduction_amount
+                FROM unnest(%s::int[], %s::int[], %s::numeric[]) AS n(order_id, ingredient_id, quantity)
+                JOIN batch_upd b ON b.order_id = n.order_id
+                GROUP BY n.ingredient_id""")
+
+        try:
+            self._execute_prepared(name, query, params)
+            result = self.cursor.fetchone()
+
+            if result is None or result[0] != len(finished):
+                print(f"❌ Transaction GAGAL: hanya {result[0] if result else 0}/{len(finished)} batch yang ditutup. Rollback.")
+                self.conn.rollback()
+                return False
+
+            self._commit()
+            return True
+
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"❌ Transaction GAGAL saat menyelesaikan produksi massal ({len(finished)} order). Error: {e}")
             return False
 
+    @_pooled
     def adjust_inventory_transaction(self, item_changes: List[tuple]):
         """Mengurangi atau menambah stok bahan baku secara transaksional."""
         
@@ -442,6 +1412,7 @@ class DatabaseClient:
             print(f"❌ Transaction GAGAL saat update inventory. Error: {e}")
             return False
 
+    @_pooled
     def check_user_exists(self, username: str, email: str) -> bool:
         """Memeriksa apakah username atau email sudah terdaftar."""
 
@@ -478,6 +1449,7 @@ class DatabaseClient:
             print(f"❌ DB Error (check_user_exists): {e}")
             return True  # Asumsikan True (sudah ada) untuk menghindari registrasi ganda jika ada error
 
+    @_pooled
     def register_new_customer(self, username: str, fullname: str, phone: str, email: str, hashed_password: str) -> int | None:
         """Menyimpan pengguna baru ke tabel customer."""
 
@@ -515,6 +1487,7 @@ class DatabaseClient:
             print(f"❌ DB Error (register_new_customer): {e}")
             return None
 
+    @_pooled
     def authenticate_customer(self, username: str, hashed_password: str) -> dict | None:
         """Mencari dan memverifikasi Customer."""
 
@@ -547,6 +1520,7 @@ class DatabaseClient:
             print(f"❌ DB Error (authenticate_customer): {e}")
             return None
 
+    @_pooled
     def authenticate_admin(self, username: str, hashed_password: str) -> dict | None:
         """Mencari dan memverifikasi Admin."""
         if self.cursor is None or self.conn is None:
@@ -578,6 +1552,7 @@ class DatabaseClient:
             return None
 
     # Ganti definisi fungsi: tambahkan parameter 'recipe'
+    @_pooled
     def add_new_product_with_recipe(self, name: str, description: str, price: int, recipe: List[Tuple[int, int]]) -> Optional[int]:
         """
         Menyimpan produk baru ke tabel product dan resepnya ke product_ingredients dalam satu transaksi.
@@ -588,80 +1563,53 @@ class DatabaseClient:
             print(error_msg)
             raise ConnectionError(error_msg)
     
-        # 1. Query untuk INSERT Produk
-        product_query = """
-            INSERT INTO product (product_name, description, price)
-            VALUES (%s, %s, %s)
-            RETURNING product_id;
-        """
-        
-        # 2. Query untuk INSERT Resep
-        recipe_query = """
-            INSERT INTO product_ingredients (product_id, ingredient_id, quantity_per_unit)
-            VALUES (%s, %s, %s);
+        # INSERT produk + seluruh resep dalam satu statement (satu round-trip berapa pun panjang resepnya)
+        query = """
+            WITH new_product AS (
+                INSERT INTO product (product_name, description, price)
+                VALUES (%s, %s, %s)
+                RETURNING product_id
+            ), new_recipe AS (
+                INSERT INTO product_ingredients (product_id, ingredient_id, quantity_per_unit)
+                SELECT p.product_id, r.ingredient_id, r.quantity
+                FROM new_product p
+                CROSS JOIN unnest(%s::int[], %s::numeric[]) AS r(ingredient_id, quantity)
+                RETURNING 1
+            )
+            SELECT product_id, (SELECT COUNT(*) FROM new_recipe) FROM new_product;
         """
+        ingredient_ids = [ing_id for ing_id, _ in recipe]
+        quantities = [quantity for _, quantity in recipe]
         
         try:
-            # --- Langkah 1: INSERT Produk dan Ambil ID ---
-            # Ini adalah tempat potensi kegagalan pertama (misal: koneksi putus)
-            self.cursor.execute(product_query, (name, description, price))
+            # Potensi kegagalan: koneksi putus atau Foreign Key Constraint violation pada resep
+            self.cursor.execute(query, (name, description, price, ingredient_ids, quantities))
             fetched_result = self.cursor.fetchone()
         
-            if fetched_result is None:
-                # Jika INSERT gagal mengembalikan ID, batalkan.
-                print("❌ DB Error: INSERT Product tidak mengembalikan Product ID.")
+            if fetched_result is None or fetched_result[1] != len(recipe):
+                # Jika INSERT gagal mengembalikan ID atau resep tidak lengkap, batalkan.
+                print("❌ DB Error: INSERT Product tidak mengembalikan Product ID atau resep tidak lengkap.")
                 self.conn.rollback() # Aman karena guardrail di atas
                 return None
 
             new_product_id = fetched_result[0]
             
-            # --- Langkah 2: LOOP dan INSERT Resep ---
-            # Ini adalah tempat potensi kegagalan kedua (misal: Foreign Key Constraint violation)
-            for ing_id, quantity in recipe:
-                self.cursor.execute(recipe_query, (new_product_id, ing_id, quantity))
-            
-            # --- Langkah 3: COMMIT Transaksi Penuh ---
+            # COMMIT Transaksi Penuh
             self.conn.commit()
+            self.catalog.invalidate()
             return new_product_id
             
         except psycopg2.Error as e:
-            # --- Langkah 4: ROLLBACK Jika Terjadi Error ---
-            # Jika terjadi error di Langkah 1 atau 2, ROLLBACK akan membatalkan semua perubahan.
+            # ROLLBACK Jika Terjadi Error: produk dan resep batal bersama
             self.conn.rollback()
             print(f"❌ DB Error (add_new_product_with_recipe): Transaksi GAGAL. Detail: {e}")
             return None
 
     def get_product_by_id(self, product_id: int) -> dict | None:
-        """Mengambil detail produk berdasarkan ID."""
-
-        if self.cursor is None or self.conn is None:
-            error_msg = "❌ Koneksi atau kursor DB belum diinisialisasi. Gagal mengambil produk."
-            print(error_msg)
-            raise ConnectionError(error_msg)
-    
-        query = """
-            SELECT product_id, product_name, description, price
-            FROM product
-            WHERE product_id = %s;
-        """
-        try:
-            self.cursor.execute(query, (product_id,))
-            result = self.cursor.fetchone()
-
-            if result:
-                if self.cursor.description is None:
-                    print("❌ SELECT berhasil, tetapi metadata kolom tidak tersedia.")
-                    return None
-            
-                # Mengkonversi hasil tuple menjadi dictionary
-                columns = [desc[0] for desc in self.cursor.description]
-                return dict(zip(columns, result))
-        
-            return None
-        except psycopg2.Error as e:
-            print(f"❌ DB Error (get_product_by_id): {e}")
-            return None
+        """Mengambil detail produk berdasarkan ID (lookup index cache katalog)."""
+        return self.catalog.get(product_id)
     
+    @_pooled
     def update_product(self, product_id: int, name: str, description: str, price: int) -> bool:
         """Memperbarui detail produk."""
         if self.cursor is None or self.conn is None:
@@ -678,6 +1626,7 @@ class DatabaseClient:
             # Perhatikan urutan argumen: name, description, price, product_id
             self.cursor.execute(query, (name, description, price, product_id))
             self.conn.commit()
+            self.catalog.invalidate()
             # Mengembalikan True jika ada baris yang berhasil diupdate
             return self.cursor.rowcount > 0 
         except psycopg2.Error as e:
@@ -685,6 +1634,7 @@ class DatabaseClient:
             print(f"❌ DB Error (update_product): Gagal update produk. {e}")
             return False
     
+    @_pooled
     def delete_product_and_relations(self, product_id: int) -> bool:
         """Menghapus produk dari tabel 'product'. Karena adanya FOREIGN KEY 
         dengan ON DELETE CASCADE di product_ingredients, relasi akan terhapus otomatis."""
@@ -700,6 +1650,7 @@ class DatabaseClient:
         try:
             self.cursor.execute(query, (product_id,))
             self.conn.commit()
+            self.catalog.invalidate()
             # Mengembalikan True jika ada baris yang dihapus
             return self.cursor.rowcount > 0 
         except psycopg2.Error as e:
@@ -707,6 +1658,7 @@ class DatabaseClient:
             print(f"❌ DB Error (delete_product_and_relations): {e}")
             return False
     
+    @_pooled
     def fetch_all_ingredients(self) -> list:
         """Mengambil semua bahan baku dari tabel ingredient."""
         query = """
@@ -739,6 +1691,7 @@ class DatabaseClient:
             print(f"❌ DB Error (fetch_all_ingredients): {e}")
             return []
 
+    @_pooled
     def check_ingredient_exists(self, name: str) -> dict | None:
         """Mencari bahan baku berdasarkan nama (case-insensitive). Mengembalikan data jika ditemukan."""
         if self.cursor is None or self.conn is None:
@@ -767,6 +1720,7 @@ class DatabaseClient:
             print(f"❌ DB Error (check_ingredient_exists): {e}")
             return None
 
+    @_pooled
     def update_ingredient_stock(self, ingredient_id: int, added_stock: int) -> bool:
         """Menambahkan stok ke bahan baku yang sudah ada."""
         query = """
@@ -788,6 +1742,7 @@ class DatabaseClient:
             print(f"❌ DB Error (update_ingredient_stock): {e}")
             return False
 
+    @_pooled
     def add_new_ingredient(self, name: str, unit: str, stock: int, min_stock: int) -> int | None:
         """Menyimpan bahan baku baru ke database."""
         if self.cursor is None or self.conn is None:
@@ -822,6 +1777,7 @@ class DatabaseClient:
             print(f"❌ DB Error (add_new_ingredient): {e}")
             return None
 
+    @_pooled
     def get_ingredient_by_id(self, ing_id: int) -> dict | None:
         """Mengambil detail bahan baku berdasarkan ID."""
         if self.cursor is None or self.conn is None:
@@ -851,6 +1807,7 @@ class DatabaseClient:
             print(f"❌ DB Error (get_ingredient_by_id): {e}")
             return None
 
+    @_pooled
     def update_ingredient_details(self, ing_id: int, name: str, unit: str, min_stock: int) -> bool:
         """Memperbarui nama, unit, dan minimum_stock bahan baku."""
         if self.cursor is None or self.conn is None:
@@ -874,6 +1831,7 @@ class DatabaseClient:
             print(f"❌ DB Error (update_ingredient_details): Gagal update bahan baku. {e}")
             return False
 
+    @_pooled
     def set_ingredient_stock(self, ing_id: int, new_stock: int) -> bool:
         """Mengatur nilai stok bahan baku ke nilai yang spesifik."""
         if self.cursor is None or self.conn is None:
@@ -897,6 +1855,7 @@ class DatabaseClient:
             print(f"❌ DB Error (set_ingredient_stock): Gagal update stok. {e}")
             return False
 
+    @_pooled
     def delete_ingredient_and_relations(self, ing_id: int) -> bool:
         """Menghapus bahan baku dari tabel 'ingredient'. Relasi di product_ingredients
         akan terhapus otomatis karena adanya ON DELETE CASCADE."""
@@ -919,6 +1878,7 @@ class DatabaseClient:
             print(f"❌ DB Error (delete_ingredient_and_relations): {e}")
             return False
         
+    @_pooled
     def get_popular_products(self, limit: int = 10) -> list:
         """Mengambil daftar produk yang paling banyak dipesan (diurutkan berdasarkan total kuantitas)."""
         if self.cursor is None or self.conn is None:
@@ -963,6 +1923,7 @@ class DatabaseClient:
             print(f"❌ DB Error (get_popular_products): {e}")
             return []
 
+    @_pooled
     def get_low_stock_ingredients(self) -> list:
         """Mengambil daftar bahan baku yang stoknya lebih rendah atau sama dengan minimum_stock."""
         if self.cursor is None or self.conn is None:
@@ -1000,6 +1961,7 @@ class DatabaseClient:
             print(f"❌ DB Error (get_low_stock_ingredients): {e}")
             return []
 
+    @_pooled
     def adjust_ingredient_stock(self, ingredient_id: int, change_amount: int) -> bool:
         """
         Mengupdate stok bahan baku dengan menambahkan/mengurangi 'change_amount' 
@@ -1027,10 +1989,12 @@ class DatabaseClient:
 
     # Di dalam class DatabaseClient di client.py:
 
-    def deduct_ingredients_for_order(self, order_id: int) -> bool:
+    @_pooled
+    def deduct_ingredients_for_order(self, order_id: int, requirements: Optional[Dict[int, float]] = None) -> bool:
         """
         Menghitung total bahan baku yang terpakai untuk Order tertentu 
         dan mengurangi stok yang sesuai secara transaksional.
+        requirements: kebutuhan bahan dari cache bill-of-materials (tanpa JOIN resep di DB).
         """
         
         if self.cursor is None or self.conn is None:
@@ -1061,9 +2025,22 @@ class DatabaseClient:
         RETURNING ingredient.ingredient_id;
         """
         
+        if requirements is not None:
+            deduction_query = """
+            UPDATE ingredient
+            SET stock = ingredient.stock - n.total_deduction_amount
+            FROM unnest(%s::int[], %s::numeric[]) AS n(ingredient_id, total_deduction_amount)
+            WHERE ingredient.ingredient_id = n.ingredient_id
+            RETURNING ingredient.ingredient_id;
+            """
+
         try:
             # 1. Jalankan query pengurangan stok
-            self.cursor.execute(deduction_query, (order_id,))
+            if requirements is None:
+                self._execute_prepared('deduct_ingredients_for_order', deduction_query, (order_id,))
+            else:
+                self._execute_prepared('deduct_ingredients_bom', deduction_query,
+                                       (list(requirements), list(requirements.values())))
             
             # 2. Cek apakah ada baris yang terupdate
             if self.cursor.rowcount == 0:
@@ -1085,4 +2062,5 @@ class DatabaseClient:
             return False
 
     def __del__(self):
-        self.close()
\ No newline at end of file
+        if self._pool is not None and not self._pool.closed:
+            self.close()
\ No newline at end of file
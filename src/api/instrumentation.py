@@ -0,0 +1,171 @@
+# src/api/instrumentation.py
+"""
+Instrumentasi query DatabaseClient.
+
+Semua kursor pool dibuat dengan InstrumentedCursor, sehingga setiap
+cursor.execute (termasuk helper psycopg2.extras yang memanggil execute)
+melewati satu jalur yang mencatat latensi, jumlah baris, dan error per method
+DatabaseClient. Query yang lebih lambat dari ambang dicetak bersama EXPLAIN-nya.
+Instrumentasi bisa dinyalakan/dimatikan saat runtime lewat QueryStats.enabled.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+# Hanya statement ini yang aman di-EXPLAIN (tanpa ANALYZE: query tidak dijalankan ulang)
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'EXECUTE')
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    slow: int = 0
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000.0 * self.total_seconds / self.calls if self.calls else 0.0
+
+class QueryStats:
+    """Statistik query per method DatabaseClient (thread-safe)."""
+    def __init__(self, enabled: bool = False, slow_query_ms: Optional[float] = None):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms # None = slow-query log nonaktif
+        self._lock = threading.Lock()
+        self._methods: Dict[str, MethodStats] = {}
+
+    def record(self, method: str, seconds: float, rows: int, error: bool, slow: bool):
+        with self._lock:
+            stats = self._methods.get(method)
+            if stats is None:
+                stats = self._methods[method] = MethodStats()
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            if rows > 0:
+                stats.rows += rows
+            if error:
+                stats.errors += 1
+            if slow:
+                stats.slow += 1
+
+    def snapshot(self) -> Dict[str, MethodStats]:
+        with self._lock:
+            return {name: MethodStats(**vars(stats)) for name, stats in self._methods.items()}
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+    def report(self, limit: int = 20) -> str:
+        """Tabel method yang paling banyak memakan waktu DB (total latensi)."""
+        rows = sorted(self.snapshot().items(), key=lambda item: item[1].total_seconds, reverse=True)[:limit]
+        lines = [f"{'Method':<36} {'Calls':>7} {'Total(s)':>9} {'Mean(ms)':>9} {'Max(ms)':>9} "
+                 f"{'Rows':>9} {'Error':>6} {'Slow':>5}"]
+        for name, s in rows:
+            lines.append(f"{name:<36} {s.calls:>7} {s.total_seconds:>9.3f} {s.mean_ms:>9.2f} "
+                         f"{1000.0 * s.max_seconds:>9.2f} {s.rows:>9} {s.errors:>6} {s.slow:>5}")
+        return "\n".join(lines)
+
+class RoundTripCounter:
+    """
+    Penghitung round-trip DB untuk banyak thread: total semua thread (dengan lock)
+    dan hitungan per thread (thread-local), sehingga Scheduler bisa mengukur
+    siklusnya sendiri tanpa ikut menghitung query thread UI.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._total = 0
+
+    def add(self, n: int = 1):
+        with self._lock:
+            self._total += n
+        self._local.count = getattr(self._local, 'count', 0) + n
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return self._total
+
+    def in_thread(self) -> int:
+        return getattr(self._local, 'count', 0)
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """
+    Kursor yang mengukur setiap execute. Atribut stats, round_trips, dan method_name
+    diisi oleh DatabaseClient saat kursor dipinjamkan ke satu unit of work.
+    """
+    stats: Optional[QueryStats] = None
+    round_trips: Optional[RoundTripCounter] = None
+    method_name: str = '<unknown>'
+
+    def execute(self, query, vars=None):
+        if self.round_trips is not None:
+            self.round_trips.add() # dihitung walau instrumentasi latensi nonaktif
+        stats = self.stats
+        if stats is None or not stats.enabled:
+            return super().execute(query, vars)
+
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except psycopg2.Error:
+            stats.record(self.method_name, time.perf_counter() - start, 0, error=True, slow=False)
+            raise
+        elapsed = time.perf_counter() - start
+
+        slow = stats.slow_query_ms is not None and elapsed * 1000.0 >= stats.slow_query_ms
+        stats.record(self.method_name, elapsed, self.rowcount, error=False, slow=slow)
+        if slow:
+            self._log_slow_query(query, vars, elapsed)
+        return result
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        if self.round_trips is not None:
+            self.round_trips.add(len(vars_list)) # psycopg2 mengirim satu statement per baris
+        stats = self.stats
+        if stats is None or not stats.enabled:
+            return super().executemany(query, vars_list)
+
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except psycopg2.Error:
+            stats.record(self.method_name, time.perf_counter() - start, 0, error=True, slow=False)
+            raise
+        elapsed = time.perf_counter() - start
+        slow = stats.slow_query_ms is not None and elapsed * 1000.0 >= stats.slow_query_ms
+        stats.record(self.method_name, elapsed, self.rowcount, error=False, slow=slow)
+        if slow:
+            print(f"🐢 Query lambat di {self.method_name}: {1000.0 * elapsed:.1f} ms (executemany)")
+        return result
+
+    def _log_slow_query(self, query, vars, elapsed: float):
+        sql = self.mogrify(query, vars).decode('utf-8', errors='replace')
+        print(f"🐢 Query lambat di {self.method_name}: {1000.0 * elapsed:.1f} ms, {self.rowcount} baris\n{sql.strip()}")
+        plan = self._explain(sql)
+        if plan:
+            print("   EXPLAIN:\n" + "\n".join(f"   {line}" for line in plan))
+
+    def _explain(self, sql: str) -> List[str]:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE) or self.connection.autocommit:
+            return []
+        # Savepoint: EXPLAIN yang gagal tidak boleh membatalkan transaksi method pemanggil
+        with self.connection.cursor() as cur:
+            try:
+                cur.execute("SAVEPOINT matcha_explain;")
+                cur.execute("EXPLAIN " + sql)
+                plan = [row[0] for row in cur.fetchall()]
+                cur.execute("RELEASE SAVEPOINT matcha_explain;")
+                return plan
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT matcha_explain;")
+                return [f"(EXPLAIN gagal: {e})"]
@@ -0,0 +1,544 @@
+# src/api/memory.py
+"""
+Backend DatabaseBackend in-memory (pure Python) untuk test dan benchmark offline.
+
+Setiap tabel (orders, order_item, product_ingredients, ingredient, production_batch,
+product, customer, admin, status) disimpan sebagai Table: dict primary key -> baris
+plus index sekunder, sehingga lookup per order/produk tidak memindai seluruh tabel.
+Perilaku trigger Postgres ikut ditiru: status_updated_at berubah saat status_id
+berubah, dan order yang menjadi 'Diproses' masuk index order siap produksi.
+"""
+import bisect
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.api.backend import DatabaseBackend, FinishResult
+from src.api.schema import SCHEDULER_MIGRATIONS
+
+ORDER_STATUSES = {1: 'Menunggu Konfirmasi', 2: 'Diproses', 3: 'Dikirim', 4: 'Selesai'}
+
+class Table:
+    """
+    Tabel in-memory: baris (dict) per primary key + index sekunder (nilai -> set pk).
+    Kolom yang di-index hanya boleh diubah lewat update() agar index tetap konsisten;
+    kolom lain boleh diubah langsung di dict barisnya.
+    """
+    def __init__(self, primary_key: str, indexes: Tuple[str, ...] = ()):
+        self.primary_key = primary_key
+        self.rows: Dict[int, dict] = {}
+        self._indexes: Dict[str, Dict[Any, Set[int]]] = {column: {} for column in indexes}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self.rows
+
+    def __getitem__(self, pk: int) -> dict:
+        return self.rows[pk]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.rows)
+
+    def get(self, pk: int) -> Optional[dict]:
+        return self.rows.get(pk)
+
+    def keys(self):
+        return self.rows.keys()
+
+    def values(self):
+        return self.rows.values()
+
+    def items(self):
+        return self.rows.items()
+
+    def insert(self, row: dict) -> int:
+        """Menyimpan baris baru; primary key diisi otomatis (SERIAL) jika kosong."""
+        row = dict(row)
+        pk = row.get(self.primary_key)
+        if pk is None:
+            pk = row[self.primary_key] = self._next_id
+        if pk in self.rows:
+            raise KeyError(f"Duplikat primary key {self.primary_key}={pk}")
+        self._next_id = max(self._next_id, pk + 1)
+        self.rows[pk] = row
+        for column, index in self._indexes.items():
+            index.setdefault(row.get(column), set()).add(pk)
+        return pk
+
+    def update(self, pk: int, **changes) -> bool:
+        row = self.rows.get(pk)
+        if row is None:
+            return False
+        for column, value in changes.items():
+            index = self._indexes.get(column)
+            if index is not None and row.get(column) != value:
+                self._unindex(index, row.get(column), pk)
+                index.setdefault(value, set()).add(pk)
+            row[column] = value
+        return True
+
+    def delete(self, pk: int) -> Optional[dict]:
+        row = self.rows.pop(pk, None)
+        if row is not None:
+            for column, index in self._indexes.items():
+                self._unindex(index, row.get(column), pk)
+        return row
+
+    def delete_where(self, column: str, value) -> int:
+        pks = list(self._indexes[column].get(value, ()))
+        for pk in pks:
+            self.delete(pk)
+        return len(pks)
+
+    def clear(self):
+        self.rows.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+    def lookup(self, column: str, value) -> List[dict]:
+        """Baris dengan column == value lewat index (urut primary key)."""
+        return [self.rows[pk] for pk in sorted(self._indexes[column].get(value, ()))]
+
+    def exists(self, column: str, value) -> bool:
+        return bool(self._indexes[column].get(value))
+
+    @staticmethod
+    def _unindex(index: Dict[Any, Set[int]], value, pk: int):
+        pks = index.get(value)
+        if pks is not None:
+            pks.discard(pk)
+            if not pks:
+                del index[value]
+
+class InMemoryDatabaseClient(DatabaseBackend):
+    """
+    Implementasi DatabaseBackend tanpa Postgres. NOW() memakai clock yang bisa
+    di-inject (misal jam virtual simulasi). Tidak ada transaksi: setiap method
+    memvalidasi dulu lalu menulis, sehingga kegagalan tidak meninggalkan data setengah jadi.
+    """
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None):
+        self.clock = clock or datetime.now
+
+        self.status = Table('status_id')
+        for status_id, status_name in ORDER_STATUSES.items():
+            self.status.insert({'status_id': status_id, 'status_name': status_name})
+        self.customer = Table('customer_id', ('username',))
+        self.admin = Table('admin_id', ('username',))
+        self.product = Table('product_id')
+        self.ingredient = Table('ingredient_id')
+        self.product_ingredients = Table('product_ingredient_id', ('product_id', 'ingredient_id'))
+        self.orders = Table('order_id', ('customer_id', 'status_id'))
+        self.order_item = Table('order_item_id', ('order_id', 'product_id'))
+        self.production_batch = Table('production_id', ('order_id', 'status'))
+
+        # Index order siap produksi, urut (status_updated_at, order_id); entry basi disaring saat dibaca
+        self._ready_index: List[Tuple[datetime, int]] = []
+        self._advisory_locks: Dict[int, object] = {} # lock_key -> pemegang
+
+    # --- Helper internal ---
+
+    def _status_name(self, status_id: int) -> Optional[str]:
+        row = self.status.get(status_id)
+        return row['status_name'] if row else None
+
+    def _set_order_status(self, order_id: int, status_id: int) -> bool:
+        """UPDATE orders SET status_id (+ efek trigger status_updated_at)."""
+        order = self.orders.get(order_id)
+        if order is None:
+            return False
+        if order['status_id'] != status_id:
+            now = self.clock()
+            self.orders.update(order_id, status_id=status_id, status_updated_at=now)
+            if status_id == 2:
+                bisect.insort(self._ready_index, (now, order_id))
+        return True
+
+    def _insert_order(self, row: dict) -> int:
+        now = self.clock()
+        row = {'order_timestamp': now, 'status_updated_at': now, 'claimed_by': None,
+               'claim_expires_at': None, **row}
+        order_id = self.orders.insert(row)
+        if row['status_id'] == 2:
+            bisect.insort(self._ready_index, (row['status_updated_at'], order_id))
+        return order_id
+
+    def _scheduler_row(self, o: dict) -> Tuple:
+        return (o['order_id'], o['customer_id'], o['order_timestamp'], o['deadline'], o['total_price'],
+                o['status_id'], o['total_quantity'], self._status_name(o['status_id']), o['status_updated_at'])
+
+    def _is_ready(self, order_id: int) -> bool:
+        order = self.orders.get(order_id)
+        return order is not None and order['status_id'] == 2 and \
+            not self.production_batch.exists('order_id', order_id)
+
+    def _requirements(self, order_id: int) -> Dict[int, float]:
+        needed: Dict[int, float] = {}
+        for item in self.order_item.lookup('order_id', order_id):
+            for recipe in self.product_ingredients.lookup('product_id', item['product_id']):
+                needed[recipe['ingredient_id']] = needed.get(recipe['ingredient_id'], 0.0) + \
+                                                  item['quantity'] * recipe['quantity_per_unit']
+        return needed
+
+    @staticmethod
+    def _ingredient_dict(row: dict) -> dict:
+        return {k: row[k] for k in ('ingredient_id', 'ingredient_name', 'unit', 'stock', 'minimum_stock')}
+
+    @staticmethod
+    def _product_dict(row: dict) -> dict:
+        return {k: row[k] for k in ('product_id', 'product_name', 'description', 'price')}
+
+    # --- Siklus hidup, NOTIFY, dan leader election ---
+
+    def close(self):
+        pass
+
+    def listen(self, channel: str = '') -> bool:
+        return False # tanpa NOTIFY: Scheduler memakai polling / event mesin
+
+    def wait_for_notifications(self, timeout: Optional[float]) -> Optional[List[str]]:
+        return None
+
+    def try_acquire_leader_lock(self, lock_key: int, holder: Optional[object] = None) -> bool:
+        holder = holder if holder is not None else self
+        return self._advisory_locks.setdefault(lock_key, holder) is holder
+
+    def check_leader_lock(self, lock_key: int, holder: Optional[object] = None) -> bool:
+        return self._advisory_locks.get(lock_key) is (holder if holder is not None else self)
+
+    def release_leader_lock(self, lock_key: int, holder: Optional[object] = None):
+        if self.check_leader_lock(lock_key, holder):
+            del self._advisory_locks[lock_key]
+
+    def check_scheduler_schema(self) -> Dict[str, bool]:
+        return {feature: True for feature in SCHEDULER_MIGRATIONS}
+
+    # --- Intake & klaim order ---
+
+    def fetch_new_orders(self, since: Optional[datetime] = None) -> List[Tuple]:
+        start = 0
+        if since is not None:
+            start = bisect.bisect_right(self._ready_index, (since, float('inf')))
+
+        rows = []
+        seen = set()
+        for updated_at, order_id in self._ready_index[start:]:
+            if order_id in seen or not self._is_ready(order_id):
+                continue
+            order = self.orders[order_id]
+            if order['status_updated_at'] != updated_at:
+                continue # entry lama; order ini sudah berpindah status lalu kembali
+            seen.add(order_id)
+            rows.append(self._scheduler_row(order))
+        return rows
+
+    def claim_ready_orders(self, replica_id: str, limit: int, lease_seconds: float) -> List[Tuple]:
+        if limit <= 0:
+            return []
+        now = self.clock()
+        candidates = heapq.nsmallest(
+            limit,
+            (o for o in self.orders.lookup('status_id', 2)
+             if not self.production_batch.exists('order_id', o['order_id'])
+             and (o['claimed_by'] is None or o['claim_expires_at'] < now)),
+            key=lambda o: (o['deadline'], o['order_id']))
+
+        for o in candidates:
+            o['claimed_by'] = replica_id
+            o['claim_expires_at'] = now + timedelta(seconds=lease_seconds)
+        return [self._scheduler_row(o) for o in candidates]
+
+    def renew_claims(self, replica_id: str, order_ids: List[int], lease_seconds: float) -> List[int]:
+        still_owned = []
+        for order_id in order_ids:
+            o = self.orders.get(order_id)
+            if o is not None and o['claimed_by'] == replica_id and o['status_id'] == 2:
+                o['claim_expires_at'] = self.clock() + timedelta(seconds=lease_seconds)
+                still_owned.append(order_id)
+        return still_owned
+
+    def release_claims(self, replica_id: str, order_ids: List[int]) -> bool:
+        for order_id in order_ids:
+            o = self.orders.get(order_id)
+            if o is not None and o['claimed_by'] == replica_id:
+                o['claimed_by'] = None
+                o['claim_expires_at'] = None
+        return True
+
+    def fetch_orders_changed_since(self, since: datetime) -> List[int]:
+        changed = {o['order_id'] for o in self.orders.values() if o['status_updated_at'] > since}
+        changed.update(b['order_id'] for b in self.production_batch.values() if b['start_time'] > since)
+        return list(changed)
+
+    def fetch_order_items_for_orders(self, order_ids: List[int]) -> List[Tuple]:
+        return [(item['order_item_id'], item['order_id'], item['product_id'], item['quantity'])
+                for order_id in order_ids for item in self.order_item.lookup('order_id', order_id)]
+
+    # --- Produksi ---
+
+    def fetch_production_history(self, limit: int) -> List[Tuple]:
+        completed = [b for b in self.production_batch.lookup('status', 'COMPLETED') if b['finish_time'] is not None]
+        recent = heapq.nlargest(limit, completed, key=lambda b: b['finish_time'])
+        rows = []
+        for batch in sorted(recent, key=lambda b: (b['finish_time'], b['production_id'])):
+            for item in self.order_item.lookup('order_id', batch['order_id']):
+                rows.append((batch['production_id'], batch['machine_id'], batch['start_time'],
+                             batch['finish_time'], item['product_id'], item['quantity']))
+        return rows
+
+    def fetch_open_production_batches(self, machine_ids: Optional[List[int]] = None) -> List[Tuple]:
+        rows = []
+        batches = sorted(self.production_batch.lookup('status', 'IN_PROGRESS'),
+                         key=lambda b: (b['start_time'], b['production_id']))
+        for batch in batches:
+            if machine_ids is not None and batch['machine_id'] not in machine_ids:
+                continue
+            o = self.orders[batch['order_id']]
+            items = [[item['order_item_id'], item['product_id'], item['quantity']]
+                     for item in self.order_item.lookup('order_id', o['order_id'])]
+            rows.append((batch['production_id'], batch['machine_id'], batch['start_time'], o['order_id'],
+                         o['customer_id'], o['order_timestamp'], o['deadline'], o['total_price'],
+                         o['status_id'], o['total_quantity'], self._status_name(o['status_id']), items))
+        return rows
+
+    def start_production_transaction(self, order_id: int, machine_id: int) -> Optional[int]:
+        if not self._set_order_status(order_id, 2):
+            return None
+        return self.production_batch.insert({
+            'order_id': order_id,
+            'machine_id': machine_id,
+            'start_time': self.clock(),
+            'finish_time': None,
+            'status': 'IN_PROGRESS',
+        })
+
+    def _is_open_batch(self, order_id: int, production_batch_id: int) -> bool:
+        batch = self.production_batch.get(production_batch_id)
+        return batch is not None and batch['order_id'] == order_id and batch['status'] == 'IN_PROGRESS' \
+            and order_id in self.orders
+
+    def finish_production_transaction(self, order_id: int, production_batch_id: int) -> FinishResult:
+        if not self._is_open_batch(order_id, production_batch_id):
+            return FinishResult.ALREADY_CLOSED # batch sudah ditutup (misal oleh leader lain) atau tidak ada
+        self.production_batch.update(production_batch_id, finish_time=self.clock(), status='COMPLETED')
+        self._set_order_status(order_id, 4)
+        return FinishResult.FINISHED
+
+    def start_production_batch(self, assignments: List[Tuple[int, int]],
+                               replica_id: Optional[str] = None) -> Dict[int, int]:
+        return {order_id: self.start_production_transaction(order_id, machine_id)
+                for order_id, machine_id in assignments
+                if order_id in self.orders
+                and not self.production_batch.exists('order_id', order_id)
+                and (replica_id is None or self.orders[order_id]['claimed_by'] == replica_id)}
+
+    def finish_production_batch(self, finished: List[Tuple[int, int]],
+                                deductions: Optional[Dict[int, Dict[int, float]]] = None) -> bool:
+        # Sama dengan versi SQL: semua batch harus masih IN_PROGRESS, jika tidak seluruhnya dibatalkan
+        if not all(self._is_open_batch(order_id, batch_id) for order_id, batch_id in finished):
+            return False
+        for order_id, batch_id in finished:
+            self.finish_production_transaction(order_id, batch_id)
+            requirements = deductions.get(order_id) if deductions is not None else None
+            self.deduct_ingredients_for_order(order_id, requirements)
+        return True
+
+    # --- Stok bahan baku ---
+
+    def fetch_low_stock_items(self, threshold: int) -> List[str]:
+        return [ing['ingredient_name'] for ing in self.ingredient.values() if ing['stock'] < threshold]
+
+    def fetch_low_stock_ingredient_ids(self) -> List[int]:
+        return [ing_id for ing_id, ing in self.ingredient.items() if ing['stock'] <= ing['minimum_stock']]
+
+    def fetch_ingredients_for_orders(self, order_ids: List[int]) -> List[Tuple]:
+        return [(order_id, ing_id, qty)
+                for order_id in order_ids for ing_id, qty in self._requirements(order_id).items()]
+
+    def deduct_ingredients_for_order(self, order_id: int, requirements: Optional[Dict[int, float]] = None) -> bool:
+        return self._deduct(requirements if requirements is not None else self._requirements(order_id))
+
+    def _deduct(self, requirements: Dict[int, float]) -> bool:
+        needed = {ing_id: qty for ing_id, qty in requirements.items() if ing_id in self.ingredient}
+        for ing_id, qty in needed.items():
+            self.ingredient[ing_id]['stock'] -= qty
+        return bool(needed)
+
+    def fetch_ingredient_stock(self) -> Optional[List[Tuple[int, float]]]:
+        return [(ing_id, ing['stock']) for ing_id, ing in self.ingredient.items()]
+
+    def fetch_recipes(self) -> Optional[List[Tuple]]:
+        return [(row['product_id'], row['ingredient_id'], row['quantity_per_unit'])
+                for row in self.product_ingredients.values()]
+
+    def adjust_inventory_transaction(self, item_changes: List[tuple]):
+        by_name = {ing['ingredient_name']: ing for ing in self.ingredient.values()}
+        for item_name, reduction_amount in item_changes:
+            if item_name in by_name:
+                by_name[item_name]['stock'] -= reduction_amount
+        return True
+
+    # --- Pesanan ---
+
+    def _customer_orders(self, customer_id: int, status_id: Optional[int] = None) -> List[Tuple]:
+        orders = [o for o in self.orders.lookup('customer_id', customer_id)
+                  if status_id is None or o['status_id'] == status_id]
+        orders.sort(key=lambda o: o['order_timestamp'], reverse=True)
+        return [(o['order_id'], o['order_timestamp'], o['total_price'], self._status_name(o['status_id']))
+                for o in orders]
+
+    def fetch_customer_orders(self, customer_id: int) -> List[Tuple]:
+        return self._customer_orders(customer_id)
+
+    def fetch_pending_orders_by_customer(self, customer_id: int) -> List[Tuple]:
+        return self._customer_orders(customer_id, status_id=1)
+
+    def fetch_order_details_by_id(self, order_id: int, customer_id: int) -> Optional[Tuple]:
+        o = self.orders.get(order_id)
+        if o is None or o['customer_id'] != customer_id:
+            return None # Pesanan tidak ditemukan atau bukan milik customer
+        header = (o['order_id'], o['order_timestamp'], o['total_price'], self._status_name(o['status_id']),
+                  o['deadline'])
+        items = [(item['product_id'], self.product[item['product_id']]['product_name'], item['quantity'],
+                  self.product[item['product_id']]['price'])
+                 for item in self.order_item.lookup('order_id', order_id) if item['product_id'] in self.product]
+        return (header, items)
+
+    def update_order_status(self, order_id: int, new_status_id: int) -> bool:
+        self._set_order_status(order_id, new_status_id)
+        return True
+
+    def force_order_status(self, order_id: int, new_status_id: int) -> bool:
+        return self._set_order_status(order_id, new_status_id)
+
+    def create_order_transaction(self, customer_id: int, total_price: float, total_quantity: int,
+                                 deadline: datetime, order_items: List[dict]) -> Optional[int]:
+        missing = [item['product_id'] for item in order_items if item['product_id'] not in self.product]
+        if missing:
+            print(f"❌ Transaction GAGAL saat membuat pesanan. Produk tidak ditemukan: {missing}")
+            return None
+
+        order_id = self._insert_order({
+            'customer_id': customer_id,
+            'deadline': deadline,
+            'total_price': total_price,
+            'total_quantity': total_quantity,
+            'status_id': 1, # 'Menunggu Konfirmasi'
+        })
+        for item in order_items:
+            self.order_item.insert({'order_id': order_id, 'product_id': item['product_id'],
+                                    'quantity': item['quantity']})
+        return order_id
+
+    # --- Akun ---
+
+    def check_user_exists(self, username: str, email: str) -> bool:
+        return any(row['username'] == username or row['email'] == email
+                   for table in (self.customer, self.admin) for row in table.values())
+
+    def register_new_customer(self, username: str, fullname: str, phone: str, email: str,
+                              hashed_password: str) -> Optional[int]:
+        if self.customer.exists('username', username):
+            print(f"❌ DB Error: username '{username}' sudah terdaftar.")
+            return None
+        return self.customer.insert({'username': username, 'fullname': fullname, 'phone': phone,
+                                     'email': email, 'password': hashed_password, 'role_id': 2})
+
+    def authenticate_customer(self, username: str, hashed_password: str) -> Optional[dict]:
+        for row in self.customer.lookup('username', username):
+            if row['password'] == hashed_password:
+                return {k: row[k] for k in ('customer_id', 'username', 'fullname', 'email')}
+        return None
+
+    def authenticate_admin(self, username: str, hashed_password: str) -> Optional[dict]:
+        for row in self.admin.lookup('username', username):
+            if row['password'] == hashed_password:
+                return {k: row[k] for k in ('admin_id', 'username', 'email')}
+        return None
+
+    # --- Produk & resep ---
+
+    def fetch_all_products(self) -> List[Dict]:
+        return [self._product_dict(row) for row in self.product.values()]
+
+    def add_new_product_with_recipe(self, name: str, description: str, price: int,
+                                    recipe: List[Tuple[int, int]]) -> Optional[int]:
+        missing = [ing_id for ing_id, _ in recipe if ing_id not in self.ingredient]
+        if missing:
+            print(f"❌ DB Error (add_new_product_with_recipe): Transaksi GAGAL. Bahan tidak ditemukan: {missing}")
+            return None
+        product_id = self.product.insert({'product_name': name, 'description': description, 'price': price})
+        for ing_id, quantity in recipe:
+            self.product_ingredients.insert({'product_id': product_id, 'ingredient_id': ing_id,
+                                             'quantity_per_unit': quantity})
+        return product_id
+
+    def get_product_by_id(self, product_id: int) -> Optional[dict]:
+        row = self.product.get(product_id)
+        return self._product_dict(row) if row else None
+
+    def update_product(self, product_id: int, name: str, description: str, price: int) -> bool:
+        return self.product.update(product_id, product_name=name, description=description, price=price)
+
+    def delete_product_and_relations(self, product_id: int) -> bool:
+        if self.product.delete(product_id) is None:
+            return False
+        self.product_ingredients.delete_where('product_id', product_id) # ON DELETE CASCADE
+        return True
+
+    def get_popular_products(self, limit: int = 10) -> list:
+        totals: Dict[str, int] = {}
+        for item in self.order_item.values():
+            product = self.product.get(item['product_id'])
+            if product is not None:
+                totals[product['product_name']] = totals.get(product['product_name'], 0) + item['quantity']
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [{'product_name': name, 'total_ordered': total} for name, total in ranked]
+
+    # --- Bahan baku ---
+
+    def fetch_all_ingredients(self) -> list:
+        return [self._ingredient_dict(self.ingredient[ing_id]) for ing_id in sorted(self.ingredient.keys())]
+
+    def check_ingredient_exists(self, name: str) -> Optional[dict]:
+        for row in self.ingredient.values():
+            if row['ingredient_name'].lower() == name.lower():
+                return self._ingredient_dict(row)
+        return None
+
+    def update_ingredient_stock(self, ingredient_id: int, added_stock: int) -> bool:
+        return self.adjust_ingredient_stock(ingredient_id, added_stock)
+
+    def add_new_ingredient(self, name: str, unit: str, stock: int, min_stock: int) -> Optional[int]:
+        return self.ingredient.insert({'ingredient_name': name, 'unit': unit, 'stock': stock,
+                                       'minimum_stock': min_stock})
+
+    def get_ingredient_by_id(self, ing_id: int) -> Optional[dict]:
+        row = self.ingredient.get(ing_id)
+        return self._ingredient_dict(row) if row else None
+
+    def update_ingredient_details(self, ing_id: int, name: str, unit: str, min_stock: int) -> bool:
+        return self.ingredient.update(ing_id, ingredient_name=name, unit=unit, minimum_stock=min_stock)
+
+    def set_ingredient_stock(self, ing_id: int, new_stock: int) -> bool:
+        return self.ingredient.update(ing_id, stock=new_stock)
+
+    def delete_ingredient_and_relations(self, ing_id: int) -> bool:
+        if self.ingredient.delete(ing_id) is None:
+            return False
+        self.product_ingredients.delete_where('ingredient_id', ing_id) # ON DELETE CASCADE
+        return True
+
+    def get_low_stock_ingredients(self) -> list:
+        rows = sorted((ing for ing in self.ingredient.values() if ing['stock'] <= ing['minimum_stock']),
+                      key=lambda ing: ing['stock'])
+        return [{k: ing[k] for k in ('ingredient_name', 'unit', 'stock', 'minimum_stock')} for ing in rows]
+
+    def adjust_ingredient_stock(self, ingredient_id: int, change_amount: int) -> bool:
+        ingredient = self.ingredient.get(ingredient_id)
+        if ingredient is None:
+            return False
+        ingredient['stock'] += change_amount
+        return True
@@ -0,0 +1,149 @@
+# src/api/schema.py
+"""
+Migrasi skema Scheduler (kolom, index, trigger NOTIFY).
+
+DDL ini mengambil lock ACCESS EXCLUSIVE di tabel yang ramai (orders, ingredient,
+product, product_ingredients), jadi dijalankan SEKALI saat deploy, bukan di setiap
+startup Scheduler:
+
+    python -m src.api.schema
+
+Saat startup Scheduler hanya memeriksa objek mana yang sudah ada
+(DatabaseClient.check_scheduler_schema) dan menonaktifkan fitur yang objeknya belum ada.
+Setiap fitur dimigrasi dalam transaksinya sendiri, jadi satu bagian yang gagal tidak
+mematikan fitur lain.
+"""
+from typing import Dict, Set
+
+from src.config import SCHEDULER_NOTIFY_CHANNEL, CATALOG_NOTIFY_CHANNEL
+
+# fitur -> DDL (idempotent)
+SCHEDULER_MIGRATIONS: Dict[str, str] = {
+    # Intake delta: status_updated_at selalu di-update saat status_id berubah (watermark intake)
+    'delta_intake': """
+        ALTER TABLE orders
+            ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+        CREATE OR REPLACE FUNCTION orders_touch_status_updated_at() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.status_id IS DISTINCT FROM OLD.status_id THEN
+                NEW.status_updated_at := NOW();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_orders_status_updated_at ON orders;
+        CREATE TRIGGER trg_orders_status_updated_at
+            BEFORE UPDATE OF status_id ON orders
+            FOR EACH ROW EXECUTE FUNCTION orders_touch_status_updated_at();
+
+        CREATE INDEX IF NOT EXISTS idx_orders_ready_status_updated_at
+            ON orders (status_updated_at) WHERE status_id = 2;
+    """,
+
+    # NOTIFY ke Scheduler: order siap produksi
+    'notify_orders': """
+        CREATE OR REPLACE FUNCTION notify_scheduler_order_ready() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.status_id = 2 AND (TG_OP = 'INSERT' OR OLD.status_id IS DISTINCT FROM 2) THEN
+                PERFORM pg_notify('{channel}', 'order:' || NEW.order_id);
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_orders_notify_scheduler ON orders;
+        CREATE TRIGGER trg_orders_notify_scheduler
+            AFTER INSERT OR UPDATE OF status_id ON orders
+            FOR EACH ROW EXECUTE FUNCTION notify_scheduler_order_ready();
+    """,
+
+    # NOTIFY ke Scheduler: perubahan stok bahan baku
+    'notify_stock': """
+        CREATE OR REPLACE FUNCTION notify_scheduler_stock_changed() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.stock IS DISTINCT FROM OLD.stock THEN
+                PERFORM pg_notify('{channel}', 'ingredient:' || NEW.ingredient_id);
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_ingredient_notify_scheduler ON ingredient;
+        CREATE TRIGGER trg_ingredient_notify_scheduler
+            AFTER UPDATE OF stock ON ingredient
+            FOR EACH ROW EXECUTE FUNCTION notify_scheduler_stock_changed();
+    """,
+
+    # NOTIFY invalidasi cache katalog produk di semua proses (dikirim saat COMMIT)
+    'notify_catalog': """
+        CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{catalog_channel}', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_product_notify_catalog ON product;
+        CREATE TRIGGER trg_product_notify_catalog
+            AFTER INSERT OR UPDATE OR DELETE ON product
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+    """,
+
+    # NOTIFY ke Scheduler: resep berubah, cache bill-of-materials perlu dimuat ulang
+    'notify_recipe': """
+        CREATE OR REPLACE FUNCTION notify_scheduler_recipe_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{channel}', 'recipe');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_recipe_notify_scheduler ON product_ingredients;
+        CREATE TRIGGER trg_recipe_notify_scheduler
+            AFTER INSERT OR UPDATE OR DELETE ON product_ingredients
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_recipe_changed();
+    """,
+
+    # Klaim order oleh replica Scheduler (multi-replica), berlaku sampai lease habis
+    'claims': """
+        ALTER TABLE orders
+            ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+            ADD COLUMN IF NOT EXISTS claim_expires_at TIMESTAMPTZ;
+    """,
+}
+
+# fitur -> objek yang harus ada ('column:orders.x', 'trigger:x', 'index:x')
+SCHEDULER_SCHEMA_OBJECTS: Dict[str, Set[str]] = {
+    'delta_intake': {'column:orders.status_updated_at', 'trigger:trg_orders_status_updated_at',
+                     'index:idx_orders_ready_status_updated_at'},
+    'notify_orders': {'trigger:trg_orders_notify_scheduler'},
+    'notify_stock': {'trigger:trg_ingredient_notify_scheduler'},
+    'notify_catalog': {'trigger:trg_product_notify_catalog'},
+    'notify_recipe': {'trigger:trg_recipe_notify_scheduler'},
+    'claims': {'column:orders.claimed_by', 'column:orders.claim_expires_at'},
+}
+
+def migration_ddl(feature: str) -> str:
+    return SCHEDULER_MIGRATIONS[feature].replace('{channel}', SCHEDULER_NOTIFY_CHANNEL) \
+                                        .replace('{catalog_channel}', CATALOG_NOTIFY_CHANNEL)
+
+def missing_objects(existing: Set[str]) -> Dict[str, Set[str]]:
+    """Fitur -> objek yang belum ada (fitur yang lengkap tidak disertakan)."""
+    return {feature: required - existing
+            for feature, required in SCHEDULER_SCHEMA_OBJECTS.items() if required - existing}
+
+def main():
+    from src.api.client import DatabaseClient
+
+    db_client = DatabaseClient()
+    try:
+        results = db_client.apply_scheduler_schema()
+        for feature, ok in results.items():
+            print(f"{'✅' if ok else '❌'} {feature}")
+    finally:
+        db_client.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,104 @@
-PGHOST='ep-little-dawn-ad2mqn43-pooler.c-2.us-east-1.aws.neon.tech'
-PGDATABASE='neondb'
-PGUSER='neondb_owner'
-PGPASSWORD='npg_9ezpykV7KnXZ'
-PGSSLMODE='require'
+import os
+
+# Koneksi Postgres; variabel environment standar libpq menimpa nilai default
+PGHOST=os.environ.get('PGHOST', 'ep-little-dawn-ad2mqn43-pooler.c-2.us-east-1.aws.neon.tech')
+PGDATABASE=os.environ.get('PGDATABASE', 'neondb')
+PGUSER=os.environ.get('PGUSER', 'neondb_owner')
+PGPASSWORD=os.environ.get('PGPASSWORD', 'npg_9ezpykV7KnXZ')
+PGSSLMODE=os.environ.get('PGSSLMODE', 'require')
 PGCHANNELBINDING='require'
+# Fitur level sesi (LISTEN/NOTIFY, advisory lock leader) tidak jalan lewat pooler mode transaksi:
+# koneksinya dibuka langsung ke endpoint non-pooler (default: PGHOST tanpa '-pooler', konvensi Neon).
+PGHOST_DIRECT = os.environ.get('PGHOST_DIRECT') or PGHOST.replace('-pooler', '', 1)
+
+# Backend data: 'postgres' (DatabaseClient) atau 'memory' (InMemoryDatabaseClient, untuk test/benchmark offline)
+DB_BACKEND = os.environ.get('MATCHA_DB_BACKEND', 'postgres')
+
+# Ukuran pool koneksi DatabaseClient (dipakai bersama thread Scheduler & UI)
+DB_POOL_MIN_CONN = 1
+DB_POOL_MAX_CONN = 5
+# Instrumentasi query per method DatabaseClient (bisa diubah saat runtime lewat set_query_instrumentation)
+DB_QUERY_INSTRUMENTATION = os.environ.get('MATCHA_DB_INSTRUMENTATION', '0') == '1'
+DB_SLOW_QUERY_MS = float(os.environ.get('MATCHA_DB_SLOW_QUERY_MS', '200')) or None # dicetak bersama EXPLAIN
+# Prepared statement untuk query panas Scheduler: 'on', 'off', atau 'auto'
+# (auto = nonaktif jika PGHOST adalah pooler mode transaksi, mis. endpoint '-pooler' Neon)
+DB_PREPARED_STATEMENTS = os.environ.get('MATCHA_DB_PREPARED_STATEMENTS', 'auto')
+
+# Cache katalog produk (src/api/catalog.py): di-invalidate saat produk diubah di proses ini,
+# lewat NOTIFY dari proses lain (jika LISTEN aktif), dan paling lambat setelah TTL habis.
+CATALOG_NOTIFY_CHANNEL = 'matcha_catalog'
+CATALOG_CACHE_LISTEN = os.environ.get('MATCHA_CATALOG_LISTEN', '1') == '1'
+CATALOG_CACHE_TTL_SECONDS = 300
 
 W_QUANTITY = 1.0
 W_DEADLINE = 500000.0 
 STOCK_BONUS = 500.0
 
+# Hitung ulang skor antrian secara vectorized (NumPy); False = jalur per-objek
+QUEUE_VECTORIZED_SCORING = True
+QUEUE_VECTORIZED_MIN_SIZE = 256 # di bawah ini jalur per-objek lebih cepat
+# Mode kinetic: urutan antrian hanya diperbaiki saat kurva skor dua order berpotongan
+# (event-driven), tanpa menghitung ulang semua skor tiap siklus. Menonaktifkan mode vectorized.
+QUEUE_KINETIC_ORDERING = False
+
 PRODUCTION_MACHINE_COUNT = 2
-SCHEDULER_POLLING_INTERVAL = 5
\ No newline at end of file
+SCHEDULER_POLLING_INTERVAL = 5
+# Reservasi bahan baku saat dispatch: order yang kebutuhannya melebihi stok bebas
+# (stok DB - reservasi order yang sedang berjalan) dilewati, tetap di antrian.
+SCHEDULER_STOCK_RESERVATION = True
+SCHEDULER_RESERVATION_MAX_SCAN = 256 # maksimal order yang diperiksa per fase dispatch
+
+# Mode event-driven: Scheduler bangun lewat LISTEN/NOTIFY atau saat mesin selesai.
+# Polling interval tetap dipakai sebagai fallback jika LISTEN gagal.
+SCHEDULER_EVENT_DRIVEN = True
+SCHEDULER_NOTIFY_CHANNEL = 'matcha_scheduler'
+SCHEDULER_EVENT_MAX_WAIT = 60 # detik, jaring pengaman jika ada notifikasi yang terlewat
+
+INTAKE_WATERMARK_OVERLAP_SECONDS = 30
+# Full fetch berkala di intake delta: transaksi yang commit lebih lambat dari overlap
+# (status_updated_at jauh di belakang watermark) tetap terbaca paling lambat setelah interval ini
+INTAKE_FULL_RESYNC_SECONDS = 300
+
+# Multi-replica: beberapa proses Scheduler berbagi DB. Setiap replica mengklaim order
+# (FOR UPDATE SKIP LOCKED) dan memegang subset mesin sendiri (machine_id offset+1..offset+N).
+# MATCHA_REPLICA_ID kosong = mode satu replica.
+SCHEDULER_REPLICA_ID = os.environ.get('MATCHA_REPLICA_ID') or None
+SCHEDULER_MACHINE_ID_OFFSET = int(os.environ.get('MATCHA_MACHINE_ID_OFFSET', '0'))
+SCHEDULER_CLAIM_LEASE_SECONDS = 30 # klaim replica yang mati kembali ke pool setelah lease habis
+SCHEDULER_CLAIM_BACKLOG_PER_MACHINE = 4 # maksimal order yang diklaim per mesin (antrian lokal)
+
+# Hot standby: beberapa proses Scheduler berebut pg_try_advisory_lock; hanya leader yang
+# menjalankan mesin, standby tetap menjalankan intake agar antriannya siap saat failover.
+SCHEDULER_LEADER_ELECTION = os.environ.get('MATCHA_LEADER_ELECTION', '0') == '1'
+SCHEDULER_LEADER_LOCK_KEY = 727_001
+SCHEDULER_LEADER_HEARTBEAT_SECONDS = 0.5
+SCHEDULER_STANDBY_RESYNC_SECONDS = 300 # full resync antrian standby (buang order yang sudah dimulai leader)
+
+# Checkpoint biner antrian + mesin untuk warm restart (kosongkan MATCHA_SNAPSHOT_PATH untuk menonaktifkan)
+SCHEDULER_SNAPSHOT_PATH = os.environ.get('MATCHA_SNAPSHOT_PATH', '.matcha_scheduler.snapshot') or None
+SCHEDULER_SNAPSHOT_INTERVAL_SECONDS = 60
+
+# Metrik siklus Scheduler (format OpenMetrics): ditulis ke file setiap siklus dan/atau
+# disajikan lewat HTTP lokal di /metrics. Kosongkan env untuk menonaktifkan.
+SCHEDULER_METRICS_PATH = os.environ.get('MATCHA_METRICS_PATH') or None
+SCHEDULER_METRICS_PORT = int(os.environ.get('MATCHA_METRICS_PORT', '0')) or None
+SCHEDULER_METRICS_HOST = '127.0.0.1'
+# Batas bucket histogram latensi (detik); anggaran satu siklus = SCHEDULER_POLLING_INTERVAL
+SCHEDULER_METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SCHEDULER_METRICS_COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# Model durasi produksi (menit). Rate per produk diperbarui dengan EWMA hanya dari sinyal selesai
+# di luar Scheduler; nilai default dipakai untuk produk yang belum punya observasi.
+PRODUCTION_SETUP_MINUTES = 0.05
+DEFAULT_MINUTES_PER_UNIT = 0.005
+DURATION_EWMA_ALPHA = 0.2
+DURATION_MAX_OBSERVED_RATIO = 2.0 # satu observasi dianggap paling lama 2x / paling cepat 1/2x estimasi
+
+# Cache bill-of-materials (resep -> kebutuhan bahan per order) di Scheduler. Dimuat ulang saat
+# ada NOTIFY 'recipe' dari trigger product_ingredients, atau paling lambat setelah interval ini.
+BOM_REFRESH_SECONDS = 300
+
+# Proyeksi stok bahan atas antrian: order dikelompokkan per bucket deadline (menit),
+# dan timeline stok diproyeksikan sampai horizon (jam) ke depan.
+FORECAST_HORIZON_HOURS = 24
+FORECAST_BUCKET_MINUTES = 15
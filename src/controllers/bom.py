@@ -0,0 +1,77 @@
+# src/controllers/bom.py
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from src.models.order import Order
+from src.config import BOM_REFRESH_SECONDS
+
+class BillOfMaterials:
+    """
+    Cache bill-of-materials. Resep tiap produk disimpan sebagai vektor sparse
+    {ingredient_id: qty per unit}, dan kebutuhan total tiap order dihitung sekali
+    dari item order lalu di-memo per order_id. Kebutuhan bahan untuk cek stok,
+    pengurangan stok, dan laporan dibaca dari sini tanpa query JOIN ke DB.
+
+    Resep dimuat ulang hanya jika di-invalidate (NOTIFY 'recipe' dari trigger
+    product_ingredients) atau refresh_seconds lewat (jaring pengaman mode polling).
+    """
+    def __init__(self, loader: Callable[[], Optional[List[Tuple]]],
+                 refresh_seconds: Optional[float] = BOM_REFRESH_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self._loader = loader # -> [(product_id, ingredient_id, quantity_per_unit)] atau None jika gagal
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self.recipes: Dict[int, Dict[int, float]] = {}
+        self._by_order: Dict[int, Dict[int, float]] = {}
+        self._loaded_at: Optional[float] = None
+        self.version = 0 # naik setiap resep dimuat ulang
+
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+
+    def refresh(self) -> bool:
+        rows = self._loader()
+        if rows is None:
+            return False # resep lama (jika ada) tetap dipakai
+        recipes: Dict[int, Dict[int, float]] = {}
+        for product_id, ingredient_id, per_unit in rows:
+            recipes.setdefault(product_id, {})[ingredient_id] = float(per_unit)
+        self.recipes = recipes
+        self._by_order.clear() # vektor order dihitung ulang dari resep baru saat dibutuhkan
+        self._loaded_at = self._clock()
+        self.version += 1
+        return True
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def ensure_fresh(self) -> bool:
+        if self._loaded_at is None or \
+                (self.refresh_seconds is not None and self._clock() - self._loaded_at >= self.refresh_seconds):
+            return self.refresh()
+        return True
+
+    def covers(self, order: Order) -> bool:
+        """True jika kebutuhan order bisa dihitung dari cache (resep termuat dan item order diketahui)."""
+        return self.loaded and bool(order.items)
+
+    def requirements(self, order: Order) -> Dict[int, float]:
+        """Kebutuhan total bahan order: {ingredient_id: qty}. Jangan diubah oleh pemanggil."""
+        needed = self._by_order.get(order.order_id)
+        if needed is None:
+            needed = {}
+            for item in order.items:
+                for ingredient_id, per_unit in self.recipes.get(item.product_id, {}).items():
+                    needed[ingredient_id] = needed.get(ingredient_id, 0.0) + item.quantity * per_unit
+            self._by_order[order.order_id] = needed
+        return needed
+
+    def total_requirements(self, orders: Iterable[Order]) -> Dict[int, float]:
+        total: Dict[int, float] = {}
+        for order in orders:
+            for ingredient_id, quantity in self.requirements(order).items():
+                total[ingredient_id] = total.get(ingredient_id, 0.0) + quantity
+        return total
+
+    def forget(self, order_id: int):
+        self._by_order.pop(order_id, None)
@@ -0,0 +1,86 @@
+# src/controllers/duration_model.py
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from src.models.order import OrderItem
+from src.config import (PRODUCTION_SETUP_MINUTES, DEFAULT_MINUTES_PER_UNIT, DURATION_EWMA_ALPHA,
+                        DURATION_MAX_OBSERVED_RATIO)
+
+class ProductionDurationModel:
+    """
+    Estimasi durasi produksi (menit) = setup + sum(quantity * rate_produk).
+    Rate (menit per unit) disimpan per produk dan per (produk, mesin), lalu
+    diperbarui online dengan EWMA dari durasi yang teramati. Estimasi hanya
+    membaca dict, jadi biayanya O(jumlah item).
+
+    Durasi yang di-observe harus berasal dari sinyal selesai di luar Scheduler
+    (ack mesin/operator). Waktu selesai yang dicatat Scheduler sendiri = estimasi
+    model + jeda polling, jadi melatih dari sana hanya menaikkan estimasi.
+    """
+    def __init__(self, setup_minutes: float = PRODUCTION_SETUP_MINUTES,
+                 default_minutes_per_unit: float = DEFAULT_MINUTES_PER_UNIT,
+                 alpha: float = DURATION_EWMA_ALPHA, max_observed_ratio: float = DURATION_MAX_OBSERVED_RATIO):
+        self.setup_minutes = setup_minutes
+        self.default_minutes_per_unit = default_minutes_per_unit
+        self.alpha = alpha
+        self.max_observed_ratio = max_observed_ratio
+        self._rate_by_product: Dict[int, float] = {}
+        self._rate_by_product_machine: Dict[Tuple[int, int], float] = {}
+
+    def rate(self, product_id: int, machine_id: Optional[int] = None) -> float:
+        if machine_id is not None:
+            rate = self._rate_by_product_machine.get((product_id, machine_id))
+            if rate is not None:
+                return rate
+        return self._rate_by_product.get(product_id, self.default_minutes_per_unit)
+
+    def estimate(self, items: List[OrderItem], machine_id: Optional[int] = None,
+                 total_quantity: int = 0) -> float:
+        if not items:
+            # Item belum diketahui: pakai total_quantity dengan rate default
+            return self.setup_minutes + total_quantity * self.default_minutes_per_unit
+        return self.setup_minutes + sum(item.quantity * self.rate(item.product_id, machine_id)
+                                        for item in items)
+
+    def observe(self, items: List[OrderItem], machine_id: int, observed_minutes: float):
+        """
+        Memperbarui rate dari satu batch yang selesai. Waktu kerja (di luar setup)
+        dibagi ke item sesuai porsi estimasinya, lalu rate tiap produk digeser
+        ke arah rate yang teramati dengan EWMA. Rasio teramati/estimasi dibatasi
+        max_observed_ratio, dan observasi pertama dicampur ke rate prior (default
+        atau rate level produk), jadi satu batch yang janggal tidak mengganti estimasi.
+        """
+        work_minutes = observed_minutes - self.setup_minutes
+        if not items or work_minutes <= 0:
+            return
+
+        estimated_work = sum(item.quantity * self.rate(item.product_id, machine_id) for item in items)
+        if estimated_work <= 0:
+            return
+        ratio = min(max(work_minutes / estimated_work, 1.0 / self.max_observed_ratio), self.max_observed_ratio)
+
+        for item in items:
+            if item.quantity <= 0:
+                continue
+            observed_rate = self.rate(item.product_id, machine_id) * ratio
+            # Prior dibaca sebelum update: rate (produk, mesin) baru mewarisi rate level produk
+            priors = ((self._rate_by_product, item.product_id, self.rate(item.product_id)),
+                      (self._rate_by_product_machine, (item.product_id, machine_id),
+                       self.rate(item.product_id, machine_id)))
+            for rates, key, prior in priors:
+                rates[key] = (1 - self.alpha) * prior + self.alpha * observed_rate
+
+    def load_history(self, rows: List[Tuple]):
+        """
+        Melatih model dari riwayat batch (urut kronologis) yang waktu selesainya
+        dicatat di luar Scheduler, bukan finish_time yang ditulis timer Scheduler.
+        rows: (production_id, machine_id, start_time, finish_time, product_id, quantity)
+        """
+        batches: Dict[int, Tuple[int, datetime, datetime, List[OrderItem]]] = {}
+        for production_id, machine_id, start_time, finish_time, product_id, quantity in rows:
+            if production_id not in batches:
+                batches[production_id] = (machine_id, start_time, finish_time, [])
+            batches[production_id][3].append(
+                OrderItem(order_item_id=0, order_id=0, product_id=product_id, quantity=quantity))
+
+        for machine_id, start_time, finish_time, items in batches.values():
+            self.observe(items, machine_id, (finish_time - start_time).total_seconds() / 60.0)
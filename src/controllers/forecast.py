@@ -0,0 +1,155 @@
+# src/controllers/forecast.py
+"""
+Proyeksi stok bahan baku atas beban kerja di antrian Scheduler.
+
+Order di antrian dikelompokkan per bucket deadline. Setiap bucket menyimpan total
+menit kerja (model durasi) dan total kebutuhan bahan (cache BOM) order di dalamnya,
+sehingga order yang masuk/keluar antrian hanya mengubah satu bucket.
+
+forecast() menelusuri bucket urut deadline (skor prioritas didominasi deadline) dengan
+model fluid: semua mesin bekerja paralel, jadi bucket selesai pada
+now + (sisa kerja mesin + kumulatif kerja antrian) / jumlah mesin. Pemakaian bahan
+dicatat di akhir bucket; order yang sedang di mesin dicatat pada estimasi selesainya.
+Biayanya bergantung pada jumlah bucket dan bahan, bukan panjang antrian.
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.models.order import Order
+from src.controllers.bom import BillOfMaterials
+from src.config import FORECAST_HORIZON_HOURS, FORECAST_BUCKET_MINUTES
+
+@dataclass
+class IngredientForecast:
+    ingredient_id: int
+    ingredient_name: str
+    unit: str
+    stock: float
+    minimum_stock: float
+    demand: float = 0.0 # total pemakaian terproyeksi di dalam horizon
+    below_minimum_at: Optional[datetime] = None
+    stockout_at: Optional[datetime] = None
+    timeline: List[Tuple[datetime, float]] = field(default_factory=list) # (waktu, stok terproyeksi)
+
+    @property
+    def projected_stock(self) -> float:
+        return self.stock - self.demand
+
+class _Bucket:
+    __slots__ = ('orders', 'work_minutes', 'requirements')
+
+    def __init__(self):
+        self.orders = 0
+        self.work_minutes = 0.0
+        self.requirements: Dict[int, float] = {}
+
+class StockForecaster:
+    def __init__(self, bom: BillOfMaterials, duration: Callable[[Order], float],
+                 bucket_minutes: float = FORECAST_BUCKET_MINUTES):
+        self.bom = bom
+        self._duration = duration # menit produksi per order (model durasi Scheduler)
+        self.bucket_seconds = bucket_minutes * 60.0
+        self._lock = threading.Lock() # add/remove di thread Scheduler, forecast dari thread View
+        self._buckets: Dict[int, _Bucket] = {}
+        # order_id -> (bucket, menit kerja, kebutuhan bahan, order)
+        self._orders: Dict[int, Tuple[int, float, Dict[int, float], Order]] = {}
+        self._bom_version = bom.version
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: Order):
+        with self._lock:
+            self._sync_bom()
+            self._remove(order.order_id)
+            self._add(order, self._duration(order))
+
+    def remove(self, order_id: int):
+        with self._lock:
+            self._remove(order_id)
+
+    def _add(self, order: Order, minutes: float):
+        key = int(order.deadline.timestamp() // self.bucket_seconds)
+        requirements = self.bom.requirements(order)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        bucket.orders += 1
+        bucket.work_minutes += minutes
+        for ingredient_id, quantity in requirements.items():
+            bucket.requirements[ingredient_id] = bucket.requirements.get(ingredient_id, 0.0) + quantity
+        self._orders[order.order_id] = (key, minutes, requirements, order)
+
+    def _remove(self, order_id: int):
+        entry = self._orders.pop(order_id, None)
+        if entry is None:
+            return
+        key, minutes, requirements, _ = entry
+        bucket = self._buckets[key]
+        bucket.orders -= 1
+        if bucket.orders == 0:
+            del self._buckets[key] # sekaligus membuang sisa pembulatan float
+            return
+        bucket.work_minutes -= minutes
+        for ingredient_id, quantity in requirements.items():
+            bucket.requirements[ingredient_id] -= quantity
+
+    def _sync_bom(self):
+        """Resep berubah (versi BOM naik): kebutuhan semua order dihitung ulang sekali."""
+        if self.bom.version == self._bom_version:
+            return
+        self._bom_version = self.bom.version
+        entries = list(self._orders.values())
+        self._buckets.clear()
+        self._orders.clear()
+        for _, minutes, _, order in entries:
+            self._add(order, minutes)
+
+    def forecast(self, now: datetime, ingredients: List[dict],
+                 running: List[Tuple[datetime, Dict[int, float]]], machines: int,
+                 horizon_hours: float = FORECAST_HORIZON_HOURS) -> List[IngredientForecast]:
+        """
+        ingredients: baris fetch_all_ingredients() (stok saat ini).
+        running: (estimasi selesai, kebutuhan bahan) untuk order yang sedang di mesin.
+        Hasil diurutkan dari bahan yang paling cepat habis.
+        """
+        horizon_end = now + timedelta(hours=horizon_hours)
+        machines = max(1, machines)
+
+        events: List[Tuple[datetime, Dict[int, float]]] = [(finish, req) for finish, req in running
+                                                           if finish <= horizon_end]
+        backlog_minutes = sum(max(0.0, (finish - now).total_seconds() / 60.0) for finish, _ in running)
+        with self._lock:
+            self._sync_bom()
+            buckets = [(key, bucket.work_minutes, dict(bucket.requirements))
+                       for key, bucket in self._buckets.items()]
+        for _, work_minutes, requirements in sorted(buckets, key=lambda b: b[0]):
+            backlog_minutes += work_minutes
+            finish = now + timedelta(minutes=backlog_minutes / machines)
+            if finish > horizon_end:
+                break
+            events.append((finish, requirements))
+        events.sort(key=lambda event: event[0])
+
+        forecasts = {ing['ingredient_id']: IngredientForecast(
+                         ingredient_id=ing['ingredient_id'], ingredient_name=ing['ingredient_name'],
+                         unit=ing['unit'], stock=float(ing['stock']), minimum_stock=float(ing['minimum_stock']))
+                     for ing in ingredients}
+        for at, requirements in events:
+            for ingredient_id, quantity in requirements.items():
+                f = forecasts.get(ingredient_id)
+                if f is None or quantity <= 0:
+                    continue
+                f.demand += quantity
+                level = f.projected_stock
+                f.timeline.append((at, level))
+                if f.below_minimum_at is None and level < f.minimum_stock:
+                    f.below_minimum_at = at
+                if f.stockout_at is None and level < 0:
+                    f.stockout_at = at
+
+        never = datetime.max
+        return sorted(forecasts.values(),
+                      key=lambda f: (f.stockout_at or never, f.below_minimum_at or never, f.ingredient_name))
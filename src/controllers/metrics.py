@@ -0,0 +1,227 @@
+# src/controllers/metrics.py
+"""
+Metrik siklus ProductionScheduler dalam format teks OpenMetrics.
+
+Isi:
+    - histogram latensi per fase (intake, stock, finish, dispatch) + durasi satu siklus
+    - histogram order yang di-dispatch dan round-trip DB per siklus
+    - gauge kedalaman antrian, mesin BUSY, dan utilisasi mesin
+    - counter siklus, order dispatch/selesai, dan order yang selesai melewati deadline
+    - statistik query per method DatabaseClient (jika instrumentasi query aktif)
+
+Metrik bisa ditulis ke file (atomik, cocok untuk node_exporter textfile collector)
+atau disajikan oleh server HTTP kecil di /metrics (thread daemon).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.config import SCHEDULER_METRICS_LATENCY_BUCKETS, SCHEDULER_METRICS_COUNT_BUCKETS, SCHEDULER_METRICS_HOST
+
+PREFIX = 'matcha_scheduler'
+DB_PREFIX = 'matcha_db'
+SCHEDULER_PHASES = ('intake', 'stock', 'finish', 'dispatch')
+
+class Histogram:
+    """Histogram kumulatif dengan batas bucket tetap (tanpa menyimpan sampel)."""
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, jumlah kumulatif) termasuk bucket +Inf."""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((_format_value(bound), running))
+        result.append(('+Inf', self.count))
+        return result
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+class SchedulerMetrics:
+    """
+    Kumpulan metrik satu proses Scheduler. Diperbarui dari thread Scheduler dan
+    dibaca (render) dari thread HTTP; akses dilindungi satu lock.
+    """
+    def __init__(self, latency_buckets: Sequence[float] = SCHEDULER_METRICS_LATENCY_BUCKETS,
+                 count_buckets: Sequence[float] = SCHEDULER_METRICS_COUNT_BUCKETS):
+        self._lock = threading.Lock()
+        self.phase_seconds: Dict[str, Histogram] = {phase: Histogram(latency_buckets) for phase in SCHEDULER_PHASES}
+        self.cycle_seconds = Histogram(latency_buckets)
+        self.dispatched_per_cycle = Histogram(count_buckets)
+        self.db_round_trips_per_cycle = Histogram(count_buckets)
+
+        self.queue_depth = 0
+        self.machines_busy = 0
+        self.machines_total = 0
+        self.cycles_total = 0
+        self.orders_ingested_total = 0
+        self.orders_dispatched_total = 0
+        self.orders_finished_total = 0
+        self.deadline_misses_total = 0
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        # Statistik query per method DatabaseClient (src.api.instrumentation.QueryStats), opsional
+        self.query_stats = None
+
+    @contextmanager
+    def time_phase(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phase_seconds[phase].observe(elapsed)
+
+    def record_cycle(self, seconds: float, ingested: int, dispatched: int, finished: int,
+                     deadline_misses: int, db_round_trips: Optional[int],
+                     queue_depth: int, machines_busy: int, machines_total: int):
+        with self._lock:
+            self.cycles_total += 1
+            self.cycle_seconds.observe(seconds)
+            self.dispatched_per_cycle.observe(dispatched)
+            if db_round_trips is not None:
+                self.db_round_trips_per_cycle.observe(db_round_trips)
+            self.orders_ingested_total += ingested
+            self.orders_dispatched_total += dispatched
+            self.orders_finished_total += finished
+            self.deadline_misses_total += deadline_misses
+            self.queue_depth = queue_depth
+            self.machines_busy = machines_busy
+            self.machines_total = machines_total
+
+    def render(self) -> str:
+        """Teks eksposisi OpenMetrics (diakhiri '# EOF')."""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, prefix: str = PREFIX):
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+
+        def sample(name: str, value, labels: Optional[Dict[str, str]] = None, prefix: str = PREFIX):
+            lines.append(f"{prefix}_{name}{_labels(labels or {})} {_format_value(value)}")
+
+        def histogram(name: str, hist: Histogram, labels: Optional[Dict[str, str]] = None):
+            labels = labels or {}
+            for le, count in hist.cumulative():
+                sample(f"{name}_bucket", count, {**labels, 'le': le})
+            sample(f"{name}_count", hist.count, labels)
+            sample(f"{name}_sum", hist.sum, labels)
+
+        with self._lock:
+            family('phase_seconds', 'histogram', 'Latensi tiap fase siklus scheduler.')
+            for phase, hist in self.phase_seconds.items():
+                histogram('phase_seconds', hist, {'phase': phase})
+            family('cycle_seconds', 'histogram', 'Durasi satu siklus scheduler.')
+            histogram('cycle_seconds', self.cycle_seconds)
+            family('dispatched_per_cycle', 'histogram', 'Order yang mulai diproduksi per siklus.')
+            histogram('dispatched_per_cycle', self.dispatched_per_cycle)
+            family('db_round_trips_per_cycle', 'histogram',
+                   'Round-trip DB per siklus (execute + commit/rollback di thread Scheduler).')
+            histogram('db_round_trips_per_cycle', self.db_round_trips_per_cycle)
+
+            family('queue_depth', 'gauge', 'Order yang menunggu di antrian.')
+            sample('queue_depth', self.queue_depth)
+            family('machines_busy', 'gauge', 'Mesin yang sedang BUSY.')
+            sample('machines_busy', self.machines_busy)
+            family('machine_utilisation', 'gauge', 'Rasio mesin BUSY terhadap semua mesin.')
+            sample('machine_utilisation', self.machines_busy / self.machines_total if self.machines_total else 0.0)
+
+            family('cycles', 'counter', 'Siklus scheduler yang sudah dijalankan.')
+            sample('cycles_total', self.cycles_total)
+            family('orders_ingested', 'counter', 'Order baru yang masuk antrian.')
+            sample('orders_ingested_total', self.orders_ingested_total)
+            family('orders_dispatched', 'counter', 'Order yang mulai diproduksi.')
+            sample('orders_dispatched_total', self.orders_dispatched_total)
+            family('orders_finished', 'counter', 'Order yang selesai diproduksi.')
+            sample('orders_finished_total', self.orders_finished_total)
+            family('deadline_misses', 'counter', 'Order yang selesai setelah deadline.')
+            sample('deadline_misses_total', self.deadline_misses_total)
+
+        if self.query_stats is not None and self.query_stats.enabled:
+            methods = self.query_stats.snapshot()
+            family('query_seconds', 'summary', 'Latensi query per method DatabaseClient.', DB_PREFIX)
+            for method, stats in methods.items():
+                sample('query_seconds_count', stats.calls, {'method': method}, DB_PREFIX)
+                sample('query_seconds_sum', stats.total_seconds, {'method': method}, DB_PREFIX)
+            for name, attr, help_text in (('query_rows', 'rows', 'Baris yang dikembalikan/diubah query.'),
+                                          ('query_errors', 'errors', 'Query yang gagal.'),
+                                          ('slow_queries', 'slow', 'Query di atas ambang slow-query.')):
+                family(name, 'counter', help_text, DB_PREFIX)
+                for method, stats in methods.items():
+                    sample(f"{name}_total", getattr(stats, attr), {'method': method}, DB_PREFIX)
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self, path: str) -> bool:
+        """Menulis metrik ke file secara atomik (file sementara + os.replace)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            print(f"⚠️ Gagal menulis metrik ke '{path}'. Error: {e}")
+            return False
+
+    def serve(self, port: int, host: str = SCHEDULER_METRICS_HOST) -> bool:
+        """Menjalankan endpoint HTTP /metrics di thread daemon."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # jangan banjiri stdout Scheduler dengan log akses
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"⚠️ Gagal membuka endpoint metrik di {host}:{port}. Error: {e}")
+            return False
+        threading.Thread(target=self._server.serve_forever, name='scheduler-metrics', daemon=True).start()
+        print(f"📈 Metrik Scheduler tersedia di http://{host}:{self._server.server_address[1]}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,156 +1,593 @@
 # src/controllers/priority_queue
 import heapq
-from typing import Optional
-from src.models.order import Order
-from src.config import W_DEADLINE, W_QUANTITY, STOCK_BONUS
+import math
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, Optional, List, Tuple
+import numpy as np
+from src.models.order import Order, OrderTable
+from src.config import W_DEADLINE, W_QUANTITY, STOCK_BONUS, QUEUE_VECTORIZED_SCORING, QUEUE_VECTORIZED_MIN_SIZE, \
+    QUEUE_KINETIC_ORDERING
 
 class ProductionPriorityQueue:
-    def __init__(self):
-        self.heap = []
-        self._order_map = {}
-    
-    def add_order(self, order: Order):
+    """
+    Indexed min-heap (addressable priority queue) di atas OrderTable.
+    Heap hanya menyimpan slot order (array int64); kunci urutan
+    (-priority_score, -timestamp, order_id) dibaca dari kolom OrderTable dan
+    posisi tiap slot di heap dicatat di kolom heap_pos, sehingga update skor,
+    remove, dan cancel cukup O(log n) tanpa membangun ulang heap.
+
+    Mode vectorized: recalculate_all_priorities menghitung semua skor langsung
+    di kolom NumPy dalam satu pass dengan satu timestamp, dan pop_top_k memilih
+    order teratas dengan argpartition tanpa membangun ulang heap.
+    Jalur per-objek (Order.calculate_priority_score) tetap menjadi referensi.
+
+    Mode kinetic: skor tiap order adalah kurva waktu yang diketahui,
+    f(t) = W_DEADLINE / max(1, deadline - t) + c, dengan c = W_QUANTITY * qty (+ bonus stok).
+    Urutan parent-child di heap hanya bisa berbalik pada titik potong kedua kurva,
+    jadi setiap edge heap punya "sertifikat" dengan waktu kadaluarsa. Antrian hanya
+    bekerja saat sertifikat kadaluarsa (swap + sertifikat ulang), bukan menghitung
+    ulang semua skor setiap siklus.
+    """
+    _KINETIC_EPSILON = 1e-3 # detik; event diproses sedikit setelah titik potong
+
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None,
+                 vectorized: Optional[bool] = None, kinetic: Optional[bool] = None):
+        self.heap = array('q') # slot order, urut sebagai binary heap
+        self._table = OrderTable()
+        self.clock = clock or datetime.now # bisa diganti jam virtual (simulasi)
+        self.kinetic = QUEUE_KINETIC_ORDERING if kinetic is None else kinetic
+        # Mode kinetic membandingkan kurva skor, bukan kolom skor
+        self.vectorized = False if self.kinetic else \
+                          (QUEUE_VECTORIZED_SCORING if vectorized is None else vectorized)
+        self._less = self._kinetic_less if self.kinetic else self._key_less
+        # True jika kolom skor lebih baru daripada urutan heap
+        self._heap_dirty = False
+
+        # State mode kinetic
+        self._kinetic_now = float('-inf') # waktu (timestamp) acuan urutan heap
+        self._cert_events: List[Tuple[float, int, int]] = [] # (waktu kadaluarsa, slot child, versi)
+        self._cert_version: Dict[int, int] = {} # slot -> versi sertifikat edge ke parent
+        self._cert_seq = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._table
+
+    def order_ids(self) -> List[int]:
+        return list(self._table.index)
+
+    def orders(self) -> List[Order]:
+        orders = self._table.orders
+        return [orders[slot] for slot in self._table.index.values()]
+
+    # --- Operasi internal heap ---
+
+    def _key_less(self, a: int, b: int) -> bool:
+        # Sama dengan membandingkan tuple (-score, -timestamp, order_id)
+        t = self._table
+        score_a, score_b = t.v_scores[a], t.v_scores[b]
+        if score_a != score_b:
+            return score_a > score_b
+        ts_a, ts_b = t.v_timestamps[a], t.v_timestamps[b]
+        if ts_a != ts_b:
+            return ts_a > ts_b
+        return t.v_ids[a] < t.v_ids[b]
+
+    def _swap(self, i: int, j: int):
+        heap = self.heap
+        a, b = heap[i], heap[j]
+        heap[i], heap[j] = b, a
+        pos = self._table.v_pos
+        pos[b] = i
+        pos[a] = j
+        if self.kinetic:
+            self._recertify_around(i)
+            self._recertify_around(j)
+
+    def _sift_up(self, i: int):
+        heap = self.heap
+        less = self._less
+        while i > 0:
+            parent = (i - 1) >> 1
+            if less(heap[i], heap[parent]):
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i: int):
+        heap = self.heap
+        less = self._less
+        n = len(heap)
+        while True:
+            left = 2 * i + 1
+            if left >= n:
+                break
+            smallest = left
+            right = left + 1
+            if right < n and less(heap[right], heap[left]):
+                smallest = right
+            if less(heap[smallest], heap[i]):
+                self._swap(i, smallest)
+                i = smallest
+            else:
+                break
+
+    def _fix(self, i: int):
+        """Memperbaiki posisi slot di index i setelah kuncinya berubah."""
+        slot = self.heap[i]
+        self._sift_up(i)
+        pos = self._table.v_pos
+        if pos[slot] == i:
+            self._sift_down(i)
+        if self.kinetic:
+            # Kurva order berubah walaupun posisinya tetap
+            self._recertify_around(pos[slot])
+
+    def _remove_at(self, i: int) -> Order:
+        heap = self.heap
+        table = self._table
+        slot = heap[i]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            table.v_pos[last] = i
+            # Elemen terakhir bisa lebih kecil atau lebih besar dari entry yang dihapus
+            self._sift_up(i)
+            self._sift_down(table.v_pos[last])
+            if self.kinetic:
+                self._recertify_around(table.v_pos[last])
+
+        if self.kinetic:
+            score = self._curve_value(slot, self._kinetic_now)
+            self._cert_version.pop(slot, None)
+        else:
+            score = table.v_scores[slot] # mode vectorized: kolom lebih baru dari objek
+        order = table.release(slot)
+        order.priority_score = score
+        return order
+
+    def _append(self, slot: int):
+        self._table.v_pos[slot] = len(self.heap)
+        self.heap.append(slot)
+
+    def _rebuild_heap(self, scores: Optional[np.ndarray] = None):
+        """
+        Menyusun ulang heap dari kolom: array yang terurut penuh juga heap yang sah,
+        dan lexsort NumPy jauh lebih cepat daripada heapify per elemen di Python.
+        """
+        table = self._table
+        slots = table.live_slots()
+        if scores is None:
+            scores = table.scores[slots]
+        order = np.lexsort((table.order_ids[slots], -table.timestamps[slots], -scores))
+        ordered = slots[order].astype(np.int64)
+        self.heap = array('q', ordered.tobytes())
+        table.heap_pos[ordered] = np.arange(len(ordered))
+
+    def _ensure_heap(self):
+        """Menyusun ulang heap dari kolom skor jika skor sudah dihitung ulang secara vectorized."""
+        if not self._heap_dirty:
+            return
+        table = self._table
+        for slot in table.index.values():
+            table.orders[slot].priority_score = table.v_scores[slot]
+        self._rebuild_heap()
+        self._heap_dirty = False
+
+    # --- Mode kinetic ---
+
+    def _curve_value(self, slot: int, t: float) -> float:
+        table = self._table
+        return W_DEADLINE / max(1.0, table.v_deadlines[slot] - t) + self._curve_constant(slot)
+
+    def _curve_constant(self, slot: int) -> float:
+        table = self._table
+        return W_QUANTITY * table.v_quantities[slot] + (STOCK_BONUS if table.v_stock[slot] else 0)
+
+    def _beats(self, a: int, b: int, t: float) -> bool:
+        """True jika slot a lebih prioritas daripada b pada waktu t (tie-break sama dengan heap)."""
+        score_a = self._curve_value(a, t)
+        score_b = self._curve_value(b, t)
+        if score_a != score_b:
+            return score_a > score_b
+        table = self._table
+        ts_a, ts_b = table.v_timestamps[a], table.v_timestamps[b]
+        if ts_a != ts_b:
+            return ts_a > ts_b
+        return table.v_ids[a] < table.v_ids[b]
+
+    def _kinetic_less(self, a: int, b: int) -> bool:
+        return self._beats(a, b, self._kinetic_now)
+
+    def _failure_time(self, parent: int, child: int) -> float:
+        """
+        Waktu paling awal (> kinetic_now) saat child menyalip parent.
+        Kedua kurva piecewise: hiperbola sebelum deadline - 1 detik, konstan sesudahnya,
+        jadi titik potong dicari analitik di tiap segmen.
+        """
+        now = self._kinetic_now
+        if self._beats(child, parent, now):
+            return now
+
+        # Koordinat relatif terhadap now agar presisi float terjaga
+        da = self._table.v_deadlines[parent] - now
+        db = self._table.v_deadlines[child] - now
+        gap = self._curve_constant(parent) - self._curve_constant(child)
+        W = W_DEADLINE
+        candidates = []
+
+        # Keduanya hiperbola (x < min(da, db) - 1): gap * (da - x) * (db - x) = W * (da - db)
+        if gap != 0 and da != db:
+            disc = (da - db) ** 2 + 4 * W * (da - db) / gap
+            if disc >= 0:
+                root = math.sqrt(disc)
+                for x in (((da + db) - root) / 2, ((da + db) + root) / 2):
+                    if x < min(da, db) - 1:
+                        candidates.append(x)
+        # Parent sudah konstan, child masih hiperbola: W / (db - x) = W + gap
+        if W + gap > 0:
+            x = db - W / (W + gap)
+            if da - 1 <= x < db - 1:
+                candidates.append(x)
+        # Parent masih hiperbola, child sudah konstan: W / (da - x) = W - gap
+        if W - gap > 0:
+            x = da - W / (W - gap)
+            if db - 1 <= x < da - 1:
+                candidates.append(x)
+
+        for x in sorted(candidates):
+            if x <= 0:
+                continue
+            t = now + x + self._KINETIC_EPSILON
+            if self._beats(child, parent, t):
+                return t
+
+        # Jaring pengaman presisi: setelah kedua deadline lewat selisih skor konstan
+        late = now + max(0.0, max(da, db) - 1) + self._KINETIC_EPSILON
+        if self._beats(child, parent, late):
+            return late
+        return math.inf
+
+    def _certify(self, i: int):
+        """Membuat sertifikat baru untuk edge (parent(i), i)."""
+        if i >= len(self.heap):
+            return
+        slot = self.heap[i]
+        self._cert_seq += 1
+        self._cert_version[slot] = self._cert_seq
+        if i == 0:
+            return
+        fail_at = self._failure_time(self.heap[(i - 1) >> 1], slot)
+        if fail_at != math.inf:
+            heapq.heappush(self._cert_events, (fail_at, slot, self._cert_seq))
+
+    def _recertify_around(self, i: int):
+        self._certify(i)
+        self._certify(2 * i + 1)
+        self._certify(2 * i + 2)
+        # Sertifikat lama tidak dihapus (lazy); bersihkan jika terlalu menumpuk
+        if len(self._cert_events) > 4 * len(self.heap) + 64:
+            self._cert_events = [e for e in self._cert_events if self._cert_version.get(e[1]) == e[2]]
+            heapq.heapify(self._cert_events)
+
+    def _kinetic_rebuild(self):
+        """Menyusun ulang heap dan semua sertifikat pada kinetic_now (misal bonus stok semua order berubah)."""
+        table = self._table
+        slots = table.live_slots()
+        values = W_DEADLINE / np.maximum(1.0, table.deadlines[slots] - self._kinetic_now) \
+                 + W_QUANTITY * table.quantities[slots] \
+                 + np.where(table.stock_alerts[slots], STOCK_BONUS, 0.0)
+        self._rebuild_heap(values)
+        self._cert_events = []
+        self._cert_version = {}
+        for i in range(len(self.heap)):
+            self._certify(i)
+
+    def advance(self, now: Optional[datetime] = None) -> int:
+        """
+        Memajukan waktu kinetic ke now dan memproses sertifikat yang kadaluarsa
+        secara kronologis. Mengembalikan jumlah swap yang terjadi.
+        """
+        if not self.kinetic:
+            return 0
+        target = (now if now is not None else self.clock()).timestamp()
+        events = self._cert_events
+        pos = self._table.v_pos
+        swaps = 0
+        while events and events[0][0] <= target:
+            fail_at, slot, version = heapq.heappop(events)
+            if self._cert_version.get(slot) != version:
+                continue # sertifikat basi
+            self._kinetic_now = max(self._kinetic_now, fail_at)
+            i = pos[slot]
+            parent = (i - 1) >> 1
+            if i > 0 and self._kinetic_less(self.heap[i], self.heap[parent]):
+                self._swap(i, parent) # _swap membuat sertifikat baru untuk edge sekitarnya
+                swaps += 1
+            else:
+                self._certify(i)
+            events = self._cert_events # bisa diganti saat pembersihan sertifikat basi
+        self._kinetic_now = max(self._kinetic_now, target)
+        return swaps
+
+    def _score(self, order: Order, now: Optional[datetime] = None):
+        if self.kinetic:
+            self.advance(now)
         order.calculate_priority_score(
             W_DEADLINE=W_DEADLINE,
             W_QUANTITY=W_QUANTITY,
             STOCK_BONUS=STOCK_BONUS,
-            current_stock_alert=False
+            current_stock_alert=order.stock_alert,
+            now=now if now is not None else self.clock()
         )
 
-        timestamp_float = order.order_timestamp.timestamp()
+    # --- API publik ---
+
+    def add_order(self, order: Order):
+        self._score(order)
+        table = self._table
+
+        slot = table.index.get(order.order_id)
+        if slot is not None:
+            # Order yang sama tidak boleh punya dua entry di heap
+            table.store(slot, order)
+            if not self._heap_dirty:
+                self._fix(table.v_pos[slot])
+            return
+
+        slot = table.add(order)
+        self._append(slot)
+        if not self._heap_dirty:
+            self._sift_up(len(self.heap) - 1)
+        if self.kinetic:
+            self._recertify_around(table.v_pos[slot])
 
-        self._order_map[order.order_id] = order
-        heapq.heappush(self.heap, 
-                        (-order.priority_score, 
-                         -timestamp_float, 
-                         order.order_id, 
-                         order))
-    
-    def get_highest_priority_order(self) -> Optional[Order]:
+    def add_orders(self, orders: List[Order], rescore: bool = True) -> int:
+        """
+        Bulk insert (misal restore snapshot): slot ditambahkan lalu heap dibangun
+        sekali dari kolom, bukan n kali sift. rescore=False memakai
+        priority_score yang sudah ada di order. Mengembalikan jumlah order baru.
+        """
+        added = 0
+        for order in orders:
+            if self.kinetic or order.order_id in self._table:
+                self.add_order(order)
+                continue
+            if rescore:
+                self._score(order)
+            self._append(self._table.add(order))
+            added += 1
+
+        if added and not self._heap_dirty:
+            self._rebuild_heap()
+        return added
+
+    def peek_highest_priority_order(self) -> Optional[Order]:
+        self._ensure_heap()
+        self.advance()
         if self.heap:
-            neg_score, timestamp, order_id, order = heapq.heappop(self.heap)
-            if order_id in self._order_map:
-                del self._order_map[order_id]
-            return order
+            return self._table.orders[self.heap[0]]
         return None
 
-    def recalculate_all_priorities(self, current_stock_alert: bool =False):
-        new_heap = []
-
-        for order in self._order_map.values():
-            order.calculate_priority_score(
-                W_DEADLINE=W_DEADLINE,
-                W_QUANTITY=W_QUANTITY,
-                STOCK_BONUS=STOCK_BONUS,
-                current_stock_alert=current_stock_alert
-            ) 
-
-            timestamp_float = order.order_timestamp.timestamp()
-
-            heapq.heappush(new_heap, 
-                            (-order.priority_score, 
-                             -timestamp_float, 
-                             order.order_id, 
-                             order))
-
-        self.heap = new_heap
-        heapq.heapify(self.heap)
-
-# # File: ProductionPriorityQueue.py
-# # ... (Semua kode class ProductionPriorityQueue di atas) ...
-
-# if __name__ == "__main__":
-#     from datetime import datetime, timedelta
-    
-#     # --- KONFIGURASI PENGUJIAN ---
-#     # Gunakan bobot yang sama agar hasil skor terprediksi
-#     W_DEADLINE_TEST = 500000.0
-#     W_QUANTITY_TEST = 1.0
-#     STOCK_BONUS_TEST = 100.0 
-    
-#     # Ganti import config dengan nilai test jika Anda ingin menguji di luar environment
-#     W_DEADLINE = W_DEADLINE_TEST
-#     W_QUANTITY = W_QUANTITY_TEST
-#     STOCK_BONUS = STOCK_BONUS_TEST
-    
-#     # --- 1. SETUP ANTRIAN (3 ORDER) ---
-#     print("==================================================")
-#     print("🧪 FASE 1: MENAMBAHKAN ORDER KE ANTRIAN PRIORITAS")
-    
-#     pq = ProductionPriorityQueue()
-#     current_time = datetime.now()
-    
-#     # Order A: Priority MENENGAH (Deadline 3 hari)
-#     # Kuantitas 10, Skor ~11.9
-#     order_a = Order(1, 101, current_time, current_time + timedelta(days=3), 100.0, 10 , 1, 'Waiting')
-#     pq.add_order(order_a)
-
-#     # Order B: Priority TERTINGGI (Deadline 1 jam)
-#     # Kuantitas 5, Skor ~143.8
-#     order_b = Order(2, 102, current_time, current_time + timedelta(hours=1), 50.0, 5,  1, 'Waiting')
-#     pq.add_order(order_b)
-
-#     # Order C: Priority TERENDAH (Deadline 5 hari)
-#     # Kuantitas 20, Skor ~5.8
-#     order_c = Order(3, 103, current_time, current_time + timedelta(days=5), 200.0, 20, 1, 'Waiting')
-#     pq.add_order(order_c)
-    
-#     print(f"Order A Score (3 Hari): {order_a.priority_score:.2f}")
-#     print(f"Order B Score (1 Jam): {order_b.priority_score:.2f}")
-#     print(f"Order C Score (5 Hari): {order_c.priority_score:.2f}")
-#     print(f"Jumlah Order di Map: {len(pq._order_map)}")
-#     print(f"Jumlah Order di Heap: {len(pq.heap)}\n")
-    
-#     # --- 2. UJI GET HIGHEST PRIORITY ORDER ---
-#     print("==================================================")
-#     print("🧪 FASE 2: MENGAMBIL ORDER PRIORITAS TERTINGGI")
-
-#     # Order yang diambil HARUS Order B (Skor ~143.8)
-#     highest_order = pq.get_highest_priority_order()
-
-#     if highest_order and highest_order.order_id == 2:
-#         print(f"✅ SUKSES: Order ID {highest_order.order_id} ditarik (Order B).")
-#     else:
-#         ditarik_id = highest_order.order_id if highest_order is not None else "NONE"
-#         print(f"❌ GAGAL: Order ID yang ditarik adalah {ditarik_id} (Seharusnya 2).")
-
-#     print(f"Jumlah Order di Map setelah pop: {len(pq._order_map)} (Harusnya 2)")
-#     print(f"Jumlah Order di Heap setelah pop: {len(pq.heap)} (Harusnya 2)\n")
-
-    
-#     # --- 3. UJI RECALCULATE ALL PRIORITIES (Dynamic Change) ---
-#     print("==================================================")
-#     print("🧪 FASE 3: RECALCULATE PRIORITIES (Stock Alert)")
-    
-#     # Sekarang, kita panggil recalculate_all_priorities dan AKTIFKAN STOCK ALERT.
-#     # Order yang tersisa (A dan C) akan mendapat +100 dari STOCK_BONUS.
-#     pq.recalculate_all_priorities(current_stock_alert=True) 
-
-#     # Skor yang Diharapkan (Perkiraan):
-#     # Order A (11.92 + 100) = ~111.92
-#     # Order C (5.8 + 100) = ~105.8
-    
-#     # Periksa Order A (ID 1) dan C (ID 3) di map (Skor seharusnya diperbarui)
-#     print(f"Order A Score (ID 1) setelah Recalc: {pq._order_map[1].priority_score:.2f}")
-#     print(f"Order C Score (ID 3) setelah Recalc: {pq._order_map[3].priority_score:.2f}")
-
-#     # Order yang diambil HARUS Order A (111.92 > 105.8)
-#     highest_after_recalc = pq.get_highest_priority_order()
-
-#     if highest_after_recalc and highest_after_recalc.order_id == 1:
-#         print(f"✅ SUKSES: Order ID {highest_after_recalc.order_id} ditarik (Order A). Prioritas berubah.")
-#     else:
-#         ditarik_id = highest_after_recalc.order_id if highest_after_recalc is not None else "NONE"
-#         print(f"❌ GAGAL: Order ID yang ditarik adalah {ditarik_id} (Seharusnya 1).")
-
-#     print(f"Jumlah Order di Map setelah pop: {len(pq._order_map)} (Harusnya 1)")
-#     print("==================================================")
-    
-#     # Uji return None
-#     pq.get_highest_priority_order() # Pop Order C
-#     no_order = pq.get_highest_priority_order()
-
-#     if no_order is None:
-#         print("✅ SUKSES: Antrian kosong, mengembalikan None.")
-#     else:
-#         print("❌ GAGAL: Antrian kosong, tapi masih mengembalikan Order.")
\ No newline at end of file
+    def get_highest_priority_order(self, predicate: Optional[Callable[[Order], bool]] = None) -> Optional[Order]:
+        """
+        Mengambil order prioritas tertinggi. Dengan predicate, order yang ditolak
+        dilewati tanpa di-pop (tetap di antrian) dan yang diambil adalah order
+        tertinggi pertama yang diterima predicate.
+        """
+        if predicate is not None:
+            top = self.pop_top_k(1, predicate)
+            return top[0] if top else None
+        self.advance()
+        if self._heap_dirty:
+            top = self.pop_top_k(1)
+            return top[0] if top else None
+        if self.heap:
+            return self._remove_at(0)
+        return None
+
+    def pop_top_k(self, k: int, predicate: Optional[Callable[[Order], bool]] = None,
+                  max_scan: Optional[int] = None) -> List[Order]:
+        """
+        Mengambil (dan menghapus) k order dengan prioritas tertinggi, urut dari
+        yang tertinggi. Jika kolom skor lebih baru dari heap, kandidat dipilih
+        dengan argpartition O(n) tanpa menyusun ulang heap.
+        predicate: hanya order yang diterima yang diambil (dipanggil urut prioritas,
+        paling banyak max_scan order); order yang ditolak tetap di antrian.
+        """
+        table = self._table
+        if k <= 0 or not len(table):
+            return []
+        self.advance()
+        if predicate is not None:
+            return self._pop_matching(k, predicate, max_scan)
+        if not self._heap_dirty:
+            return [self._remove_at(0) for _ in range(min(k, len(self.heap)))]
+        return [self._remove_at(table.v_pos[slot]) for slot in self._top_slots_from_columns(k)]
+
+    def _top_slots_from_columns(self, k: int) -> List[int]:
+        """k slot teratas menurut kolom skor (argpartition O(n)), urut prioritas."""
+        table = self._table
+        n = table.high_water
+        k = min(k, len(table))
+        scores = table.scores[:n]
+        kth = np.partition(scores, n - k)[n - k]
+        # Semua slot dengan skor >= skor ke-k ikut diurutkan agar tie-break sama dengan heap
+        candidates = np.nonzero(scores >= kth)[0]
+        order_idx = np.lexsort((table.order_ids[candidates], -table.timestamps[candidates],
+                                -scores[candidates]))
+        return candidates[order_idx[:k]].tolist()
+
+    def _pop_matching(self, k: int, predicate: Callable[[Order], bool], max_scan: Optional[int]) -> List[Order]:
+        """
+        Menelusuri heap best-first tanpa mengubahnya: frontier berisi index heap yang
+        parent-nya sudah diperiksa, jadi m order teratas diperiksa dalam O(m log m).
+        Jika heap tertinggal dari kolom skor, kandidat diurutkan dari kolom (tanpa rebuild heap).
+        Order yang diterima baru dihapus setelah penelusuran selesai.
+        """
+        table = self._table
+        accepted: List[int] = []
+        if self._heap_dirty:
+            for slot in self._top_slots_from_columns(len(table) if max_scan is None else max_scan):
+                if len(accepted) == k:
+                    break
+                if predicate(table.orders[slot]):
+                    accepted.append(slot)
+            return [self._remove_at(table.v_pos[slot]) for slot in accepted]
+
+        heap = self.heap
+        if self.kinetic:
+            now = self._kinetic_now
+            key = lambda slot: (-self._curve_value(slot, now), -table.v_timestamps[slot], table.v_ids[slot])
+        else:
+            key = lambda slot: (-table.v_scores[slot], -table.v_timestamps[slot], table.v_ids[slot])
+
+        frontier = [(key(heap[0]), 0)] if heap else []
+        scanned = 0
+        while frontier and len(accepted) < k and (max_scan is None or scanned < max_scan):
+            _, i = heapq.heappop(frontier)
+            slot = heap[i]
+            scanned += 1
+            if predicate(table.orders[slot]):
+                accepted.append(slot)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (key(heap[child]), child))
+
+        return [self._remove_at(table.v_pos[slot]) for slot in accepted]
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        slot = self._table.index.get(order_id)
+        return self._table.orders[slot] if slot is not None else None
+
+    def remove_order(self, order_id: int) -> Optional[Order]:
+        """Menghapus order (misal: dibatalkan) dari antrian dalam O(log n)."""
+        slot = self._table.index.get(order_id)
+        if slot is None:
+            return None
+        return self._remove_at(self._table.v_pos[slot])
+
+    def update_order_priority(self, order_id: int, current_stock_alert: Optional[bool] = None) -> bool:
+        """
+        Menghitung ulang skor satu order dan memperbaiki posisinya di heap.
+        current_stock_alert=None memakai flag stock_alert milik order itu sendiri.
+        Mengembalikan True jika skor berubah.
+        """
+        table = self._table
+        slot = table.index.get(order_id)
+        if slot is None:
+            return False
+
+        order = table.orders[slot]
+        old_score = table.v_scores[slot]
+        if current_stock_alert is not None:
+            order.stock_alert = current_stock_alert
+        self._score(order) # mode kinetic: advance() bisa memindahkan posisi slot
+        table.store(slot, order)
+        if order.priority_score == old_score:
+            return False
+
+        if not self._heap_dirty:
+            self._fix(table.v_pos[slot])
+        return True
+
+    def set_stock_alert(self, order_id: int, alert: bool) -> bool:
+        """Mengubah flag stok kritis satu order; hanya order itu yang di-sift ulang."""
+        order = self.get_order(order_id)
+        if order is None or order.stock_alert == alert:
+            return False
+        return self.update_order_priority(order_id, current_stock_alert=alert)
+
+    def recalculate_all_priorities(self, current_stock_alert: Optional[bool] = None) -> int:
+        """
+        Menghitung ulang skor semua order (misal karena deadline makin dekat).
+        current_stock_alert=None memakai flag stock_alert per order; nilai bool
+        menimpa flag semua order.
+        Mengembalikan jumlah order yang skornya berubah.
+        """
+        if current_stock_alert is not None:
+            for order in self.orders():
+                order.stock_alert = current_stock_alert
+
+        if self.kinetic:
+            return self._recalculate_kinetic(current_stock_alert)
+
+        # Untuk antrian kecil overhead NumPy lebih mahal dari loop Python
+        if self.vectorized and len(self._table) >= QUEUE_VECTORIZED_MIN_SIZE:
+            return self._recalculate_vectorized(current_stock_alert)
+        return self._recalculate_reference()
+
+    def _recalculate_vectorized(self, current_stock_alert: Optional[bool] = None) -> int:
+        table = self._table
+        n = table.high_water
+        if not len(table):
+            return 0
+
+        if current_stock_alert is not None:
+            table.stock_alerts[:n] = current_stock_alert
+
+        now_ts = self.clock().timestamp() # satu timestamp untuk seluruh siklus
+        new_scores = W_DEADLINE / np.maximum(1.0, table.deadlines[:n] - now_ts) \
+                     + W_QUANTITY * table.quantities[:n] \
+                     + np.where(table.stock_alerts[:n], STOCK_BONUS, 0.0)
+        new_scores[np.isneginf(table.scores[:n])] = -np.inf # slot kosong tetap kosong
+
+        changed = int(np.count_nonzero(new_scores != table.scores[:n]))
+        if changed:
+            table.scores[:n] = new_scores
+            self._heap_dirty = True
+        return changed
+
+    def _recalculate_kinetic(self, current_stock_alert: Optional[bool] = None) -> int:
+        """
+        Tanpa perubahan stok massal cukup memproses sertifikat yang kadaluarsa;
+        order lain tidak disentuh. Mengembalikan jumlah swap.
+        """
+        if current_stock_alert is None:
+            return self.advance()
+        now = self.clock()
+        self.advance(now)
+        table = self._table
+        for slot in table.index.values():
+            order = table.orders[slot]
+            self._score(order, now)
+            table.store(slot, order)
+        self._kinetic_rebuild()
+        return len(self.heap)
+
+    def _recalculate_reference(self) -> int:
+        """
+        Jalur per-objek (referensi). Hanya slot yang skornya berubah yang
+        disentuh; jika sebagian besar berubah, menyusun ulang heap dari kolom
+        lebih murah daripada k kali sift O(log n).
+        """
+        self._ensure_heap()
+        table = self._table
+        now = self.clock() # satu timestamp untuk seluruh siklus
+        changed: Dict[int, float] = {}
+
+        for slot in table.index.values():
+            order = table.orders[slot]
+            self._score(order, now)
+            if order.priority_score != table.v_scores[slot]:
+                changed[slot] = order.priority_score
+
+        if not changed:
+            return 0
+
+        n = len(self.heap)
+        if len(changed) > n // max(1, n.bit_length()):
+            for slot, score in changed.items():
+                table.v_scores[slot] = score
+            self._rebuild_heap()
+        else:
+            # Satu per satu: setiap sift berjalan di atas heap yang masih sah
+            for slot, score in changed.items():
+                table.v_scores[slot] = score
+                self._fix(table.v_pos[slot])
+
+        return len(changed)
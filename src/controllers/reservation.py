@@ -0,0 +1,96 @@
+# src/controllers/reservation.py
+from typing import Dict, Iterable, Optional, Tuple
+
+class ReservationLedger:
+    """
+    Buku reservasi bahan baku milik Scheduler. Stok di DB baru dikurangi saat
+    produksi selesai, jadi order yang sedang berjalan di mesin dicatat di sini
+    sebagai reservasi: stok bebas = stok DB - total reservasi.
+
+    Dispatch mereservasi kebutuhan order (try_reserve), finish yang sukses
+    meng-commit reservasi (stok lokal ikut dikurangi seperti di DB), dan dispatch
+    yang gagal melepasnya (release). Stok dibaca ulang dari DB sekali per fase
+    dispatch (refresh), bukan per order.
+
+    version naik setiap stok bebas bertambah (restock terbaca saat refresh, atau
+    reservasi dilepas), jadi order yang ditolak cukup diperiksa ulang setelah itu.
+    """
+    _EPSILON = 1e-9
+
+    def __init__(self):
+        self.stock: Dict[int, float] = {}    # ingredient_id -> stok DB pada refresh terakhir
+        self.reserved: Dict[int, float] = {} # ingredient_id -> total reservasi order yang berjalan
+        self._by_order: Dict[int, Dict[int, float]] = {}
+        self.loaded = False # False = stok belum/gagal dibaca: reservasi dicatat tanpa menolak order
+        self.version = 0
+
+    def refresh(self, stock_rows: Optional[Iterable[Tuple[int, float]]]) -> bool:
+        if stock_rows is None:
+            return False # stok lama tetap dipakai
+        stock = {ingredient_id: float(amount) for ingredient_id, amount in stock_rows}
+        # Stok lokal sudah dikurangi saat commit, jadi selisih positif = restock/koreksi di DB
+        if not self.loaded or any(amount > self.stock.get(ingredient_id, 0.0) + self._EPSILON
+                                  for ingredient_id, amount in stock.items()):
+            self.version += 1
+        self.stock = stock
+        self.loaded = True
+        return True
+
+    def available(self, ingredient_id: int) -> float:
+        return self.stock.get(ingredient_id, 0.0) - self.reserved.get(ingredient_id, 0.0)
+
+    def can_reserve(self, requirements: Dict[int, float]) -> bool:
+        if not self.loaded:
+            return True
+        # Bahan yang tidak ada di tabel ingredient juga tidak dikurangi DB, jadi tidak membatasi
+        return all(self.available(ingredient_id) + self._EPSILON >= quantity
+                   for ingredient_id, quantity in requirements.items() if ingredient_id in self.stock)
+
+    def try_reserve(self, order_id: int, requirements: Dict[int, float]) -> bool:
+        if order_id in self._by_order:
+            return True
+        if not self.can_reserve(requirements):
+            return False
+        self.reserve(order_id, requirements)
+        return True
+
+    def reserve(self, order_id: int, requirements: Dict[int, float]):
+        """Mencatat reservasi tanpa cek stok (misal batch IN_PROGRESS yang dipulihkan)."""
+        self._unreserve(order_id)
+        self._by_order[order_id] = dict(requirements)
+        for ingredient_id, quantity in requirements.items():
+            self.reserved[ingredient_id] = self.reserved.get(ingredient_id, 0.0) + quantity
+
+    def release(self, order_id: int) -> Optional[Dict[int, float]]:
+        """Order batal berjalan: reservasinya kembali menjadi stok bebas."""
+        requirements = self._unreserve(order_id)
+        if requirements:
+            self.version += 1
+        return requirements
+
+    def _unreserve(self, order_id: int) -> Optional[Dict[int, float]]:
+        requirements = self._by_order.pop(order_id, None)
+        if requirements is None:
+            return None
+        for ingredient_id, quantity in requirements.items():
+            remaining = self.reserved.get(ingredient_id, 0.0) - quantity
+            if remaining > self._EPSILON:
+                self.reserved[ingredient_id] = remaining
+            else:
+                self.reserved.pop(ingredient_id, None)
+        return requirements
+
+    def commit(self, order_id: int):
+        """Produksi selesai dan stok DB sudah dikurangi: reservasi menjadi pemakaian."""
+        requirements = self._unreserve(order_id) # stok bebas tidak berubah
+        for ingredient_id, quantity in (requirements or {}).items():
+            if ingredient_id in self.stock:
+                self.stock[ingredient_id] -= quantity
+
+    def clear(self):
+        self.reserved.clear()
+        self._by_order.clear()
+        self.version += 1
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._by_order
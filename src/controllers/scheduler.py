@@ -1,32 +1,71 @@
 # src/controllers/scheduler.py
+from collections import deque
 from enum import Enum, auto
-from typing import Optional
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 import datetime
+import heapq
 import time
-from src.models.order import Order
+import numpy as np
+from src.models.order import Order, OrderItem
 from src.controllers.priority_queue import ProductionPriorityQueue
-from src.api.client import DatabaseClient
-from src.config import PRODUCTION_MACHINE_COUNT, SCHEDULER_POLLING_INTERVAL
+from src.controllers.duration_model import ProductionDurationModel
+from src.controllers.bom import BillOfMaterials
+from src.controllers.reservation import ReservationLedger
+from src.controllers.forecast import StockForecaster, IngredientForecast
+from src.controllers.snapshot import read_snapshot, write_snapshot
+from src.controllers.metrics import SchedulerMetrics
+from src.api.backend import DatabaseBackend, FinishResult, create_database_client
+from src.config import (PRODUCTION_MACHINE_COUNT, SCHEDULER_POLLING_INTERVAL, INTAKE_WATERMARK_OVERLAP_SECONDS,
+                        INTAKE_FULL_RESYNC_SECONDS,
+                        SCHEDULER_EVENT_DRIVEN, SCHEDULER_NOTIFY_CHANNEL, SCHEDULER_EVENT_MAX_WAIT,
+                        SCHEDULER_REPLICA_ID, SCHEDULER_MACHINE_ID_OFFSET,
+                        SCHEDULER_CLAIM_LEASE_SECONDS, SCHEDULER_CLAIM_BACKLOG_PER_MACHINE,
+                        SCHEDULER_LEADER_ELECTION, SCHEDULER_LEADER_LOCK_KEY, SCHEDULER_LEADER_HEARTBEAT_SECONDS,
+                        SCHEDULER_STANDBY_RESYNC_SECONDS, SCHEDULER_SNAPSHOT_PATH, SCHEDULER_SNAPSHOT_INTERVAL_SECONDS,
+                        SCHEDULER_METRICS_PATH, SCHEDULER_METRICS_PORT, SCHEDULER_STOCK_RESERVATION,
+                        SCHEDULER_RESERVATION_MAX_SCAN, FORECAST_HORIZON_HOURS)
 
 class MachineStatus(Enum):
     IDLE = auto()
     BUSY = auto()
 
 class ProductionMachine:
-    def __init__(self, machine_id:int ,num_machines: int = PRODUCTION_MACHINE_COUNT):
+    def __init__(self, machine_id:int ,num_machines: int = PRODUCTION_MACHINE_COUNT,
+                 clock: Optional[Callable[[], datetime.datetime]] = None):
         self.machine_id = machine_id
         self.status = MachineStatus.IDLE
+        self.clock = clock or datetime.datetime.now
         
         self.current_order: Optional[Order] = None
+        self.start_time: Optional[datetime.datetime] = None
         self.estimated_finish_time: Optional[datetime.datetime] = None
         self.production_batch_id: Optional[int] = None
 
+    def begin(self, order: Order, duration_minutes: float):
+        """Transisi IDLE -> BUSY di memori saja (DB dicatat terpisah, bisa massal)."""
+        self.status = MachineStatus.BUSY
+        self.current_order = order
+        self.start_time = self.clock()
+        self.estimated_finish_time = self.start_time + \
+                                     datetime.timedelta(minutes=duration_minutes)
+
+    def reset(self):
+        self.status = MachineStatus.IDLE
+        self.current_order = None
+        self.start_time = None
+        self.estimated_finish_time = None
+        self.production_batch_id = None
+
+    def is_due(self) -> bool:
+        return self.status == MachineStatus.BUSY and \
+            self.estimated_finish_time is not None and \
+            self.current_order is not None and \
+            self.production_batch_id is not None and \
+            self.estimated_finish_time <= self.clock()
+
     def start_production(self, order: Order, duration_minutes: float, db_client):
         if self.status == MachineStatus.IDLE:
-            self.status = MachineStatus.BUSY
-            self.current_order = order
-            self.estimated_finish_time = datetime.datetime.now() + \
-                                         datetime.timedelta(minutes=duration_minutes)
+            self.begin(order, duration_minutes)
             
             new_id = db_client.start_production_transaction(
                 order_id=order.order_id, 
@@ -34,7 +73,7 @@ class ProductionMachine:
             )
             
             if new_id is None:
-                self.status = MachineStatus.IDLE 
+                self.reset()
                 return False
 
             self.production_batch_id = new_id
@@ -42,19 +81,15 @@ class ProductionMachine:
             return True
         return False
     
-    def check_finish(self, db_client: DatabaseClient) -> Optional[Order]:
+    def check_finish(self, db_client: DatabaseBackend) -> Optional[Order]:
         
-        if self.status == MachineStatus.BUSY and \
-            self.estimated_finish_time is not None and \
-            self.current_order is not None and \
-            self.production_batch_id is not None and \
-            self.estimated_finish_time <= datetime.datetime.now():
+        if self.is_due():
             
             finished_order = self.current_order
             batch_id = self.production_batch_id
             
             try:
-                success = db_client.finish_production_transaction(
+                result = db_client.finish_production_transaction(
                     order_id=finished_order.order_id, 
                     production_batch_id=batch_id
                 )
@@ -63,15 +98,15 @@ class ProductionMachine:
                 print(f"🚨 WARNING: Gagal menjalankan transaksi DB untuk Order ID {finished_order.order_id}. Error: {e}")
                 return None
             
-            if success:
+            if result == FinishResult.FINISHED:
                 print(f"✅ SUCCESS: Machine {self.machine_id} finished Order ID {finished_order.order_id}. Status DB updated.")
-                
-                self.status = MachineStatus.IDLE
-                self.current_order = None
-                self.estimated_finish_time = None
-                self.production_batch_id = None
-                
+                self.reset()
                 return finished_order 
+            elif result == FinishResult.ALREADY_CLOSED:
+                # Ditutup proses lain (misal leader lama): mesin dibebaskan, order tidak dihitung selesai di sini
+                print(f"⚠️ Batch Order ID {finished_order.order_id} sudah ditutup proses lain. Machine {self.machine_id} IDLE.")
+                self.reset()
+                return None
             else:
                 print(f"❌ ERROR: Transaksi DB finish_production GAGAL (return False) untuk Order ID {finished_order.order_id}. Mesin tetap BUSY.")
                 return None
@@ -79,19 +114,160 @@ class ProductionMachine:
         return None 
     
 class ProductionScheduler:
-    def __init__(self, num_machine: int = 2):
-        self.queue = ProductionPriorityQueue()
-        self.machine = [ProductionMachine(i + 1) for i in range(num_machine)]
-        self.db_client = DatabaseClient()
+    def __init__(self, num_machine: int = 2, db_client: Optional[DatabaseBackend] = None,
+                 clock: Optional[Callable[[], datetime.datetime]] = None,
+                 replica_id: Optional[str] = SCHEDULER_REPLICA_ID,
+                 machine_id_offset: int = SCHEDULER_MACHINE_ID_OFFSET):
+        # clock & db_client bisa di-inject (misal jam virtual + DB in-memory untuk simulasi)
+        self.clock = clock or datetime.datetime.now
+        self.queue = ProductionPriorityQueue(clock=self.clock)
+        # Multi-replica: setiap replica memegang machine_id yang tidak overlap
+        self.machine = [ProductionMachine(machine_id_offset + i + 1, clock=self.clock) for i in range(num_machine)]
+        self.db_client = db_client if db_client is not None else create_database_client()
+
+        # replica_id None = satu-satunya Scheduler; selain itu order harus diklaim dulu
+        self.replica_id = replica_id
+        self._claims_renewed_at: Optional[datetime.datetime] = None
+
+        # Hot standby: hanya leader (pemegang advisory lock) yang menjalankan mesin
+        self.is_leader = True
+        self._leader_election = False
+        self._leader_checked_at: Optional[float] = None
+        self._standby_resynced_at: Optional[float] = None
+
+        # Timer-heap waktu selesai mesin + free-list mesin IDLE:
+        # satu siklus hanya menyentuh mesin yang benar-benar berubah status.
+        self._machine_by_id: Dict[int, ProductionMachine] = {m.machine_id: m for m in self.machine}
+        self._finish_heap: List[Tuple[datetime.datetime, int]] = [] # (waktu jatuh tempo, machine_id)
+        self._timer_due: Dict[int, datetime.datetime] = {}            # entry heap yang masih berlaku
+        self._idle_machines: Deque[int] = deque(m.machine_id for m in self.machine)
+        self._order_on_machine: Dict[int, int] = {}                   # order_id -> machine_id
+
+        # Latensi per fase + gauge antrian/mesin (OpenMetrics)
+        self.metrics = SchedulerMetrics()
+        self.metrics.query_stats = getattr(self.db_client, 'query_stats', None)
         
+        # Bill-of-materials: kebutuhan bahan per order dihitung dari resep yang di-cache
+        self.bom = BillOfMaterials(self.db_client.fetch_recipes)
+        self.bom.refresh()
+
+        # Proyeksi stok per bucket deadline, diperbarui StockController saat order masuk/keluar antrian
+        self.forecaster = StockForecaster(self.bom, self.estimate_production_duration)
+
         from src.controllers.stock_controller import StockController 
-        self.stock_controller = StockController(self.db_client, self.queue)
+        self.stock_controller = StockController(self.db_client, self.queue, self.bom, self.forecaster)
+        # Reservasi bahan untuk order yang sedang di mesin (stok DB baru berkurang saat selesai)
+        self.ledger = ReservationLedger()
+        self.reserve_stock = SCHEDULER_STOCK_RESERVATION
+        # Order yang ditolak karena stok tidak diperiksa ulang sampai stok bebas/resep/antrian berubah
+        self._stock_blocked: Set[int] = set()
+        self._blocked_at: Optional[Tuple[int, int]] = None    # (ledger.version, bom.version) saat penolakan
+        self._intake_seq = 0                                  # naik setiap ada order baru masuk antrian
+        self._dispatch_stalled_at: Optional[Tuple[int, int, int]] = None
+
+        # Model durasi: rate per produk dari resep & nilai default. Tidak dilatih dari waktu selesai
+        # production_batch: waktu itu ditulis Scheduler sendiri saat estimasinya habis (estimasi + jeda
+        # polling), jadi melatih dari sana hanya mendorong estimasi naik tanpa konvergen. Model baru
+        # boleh di-observe dari sinyal selesai di luar Scheduler (ack mesin/operator).
+        self.duration_model = ProductionDurationModel()
+
+        # Skema dibuat migrasi (python -m src.api.schema); saat startup hanya diperiksa per fitur
+        self.schema = self.db_client.check_scheduler_schema()
+        if self.replica_id is not None and not self.schema.get('claims', False):
+            print(f"⚠️ Kolom klaim belum ada: replica '{self.replica_id}' tidak bisa mengklaim order.")
+        # Watermark intake: status_updated_at terbesar yang sudah pernah dibaca
+        self._delta_intake = self.schema.get('delta_intake', False)
+        self._intake_watermark: Optional[datetime.datetime] = None
+        self._intake_full_fetch_at: Optional[datetime.datetime] = None # full fetch (tanpa watermark) terakhir
+
+        # Recovery: batch IN_PROGRESS dari proses sebelumnya dipasang lagi ke mesinnya
+        self.recover_in_progress_batches()
+
+    def recover_in_progress_batches(self) -> int:
+        """
+        Memasang kembali batch IN_PROGRESS ke mesin milik Scheduler ini (satu query).
+        Waktu selesai diestimasi ulang dari start_time; batch yang seharusnya sudah
+        selesai langsung jatuh tempo dan ditutup (termasuk pengurangan stok) di siklus
+        berikutnya. Mengembalikan jumlah batch yang dipulihkan.
+        """
+        recovered = 0
+        for row in self.db_client.fetch_open_production_batches(list(self._machine_by_id)):
+            production_id, machine_id, start_time = row[0], row[1], row[2]
+            machine = self._machine_by_id[machine_id]
+            if machine.status == MachineStatus.BUSY:
+                if machine.production_batch_id != production_id:
+                    print(f"⚠️ Machine {machine_id} punya lebih dari satu batch IN_PROGRESS; "
+                          f"batch {production_id} dilewati.")
+                continue
+
+            order = Order(
+                order_id=row[3],
+                customer_id=row[4],
+                order_timestamp=row[5],
+                deadline=row[6],
+                total_price=row[7],
+                status_id=row[8],
+                total_quantity=row[9],
+                status_name=row[10],
+                items=[OrderItem(order_item_id=item_id, order_id=row[3], product_id=product_id, quantity=quantity)
+                       for item_id, product_id, quantity in row[11]]
+            )
+            if start_time.tzinfo is not None:
+                start_time = start_time.astimezone().replace(tzinfo=None) # jam Scheduler naive (lokal)
+
+            machine.status = MachineStatus.BUSY
+            machine.current_order = order
+            machine.start_time = start_time
+            machine.estimated_finish_time = start_time + datetime.timedelta(
+                minutes=self.estimate_production_duration(order, machine_id))
+            machine.production_batch_id = production_id
+
+            self._idle_machines.remove(machine_id)
+            self._order_on_machine[order.order_id] = machine_id
+            self.queue.remove_order(order.order_id)
+            self.stock_controller.unregister_order(order.order_id)
+            self.ledger.reserve(order.order_id, self.bom.requirements(order)) # sudah berjalan: tanpa cek stok
+            self._schedule_timer(machine_id, machine.estimated_finish_time)
+            recovered += 1
+
+        if recovered:
+            print(f"♻️ Recovery: {recovered} batch IN_PROGRESS dipasang kembali ke mesin.")
+        return recovered
     
-    def _fetch_new_orders_from_db(self):
-        new_orders_raw = self.db_client.fetch_new_orders()
-        
-        newly_added_count = 0
+    def _fetch_new_orders_from_db(self) -> int:
+        if self.replica_id is not None:
+            # Hanya ambil order sebanyak kapasitas backlog replica ini; sisanya untuk replica lain
+            limit = SCHEDULER_CLAIM_BACKLOG_PER_MACHINE * len(self.machine) - len(self.queue)
+            new_orders_raw = self.db_client.claim_ready_orders(self.replica_id, limit,
+                                                               SCHEDULER_CLAIM_LEASE_SECONDS)
+        else:
+            now = self.clock()
+            # Transaksi yang commit lebih lambat dari overlap tidak terbaca delta: sesekali full fetch
+            full_due = self._intake_full_fetch_at is not None and \
+                (now - self._intake_full_fetch_at).total_seconds() >= INTAKE_FULL_RESYNC_SECONDS
+            since = None
+            if self._delta_intake and self._intake_watermark is not None and not full_due:
+                # Mundur sedikit dari watermark: transaksi yang commit terlambat
+                # bisa punya NOW() lebih kecil dari watermark yang sudah terbaca.
+                since = self._intake_watermark - \
+                        datetime.timedelta(seconds=INTAKE_WATERMARK_OVERLAP_SECONDS)
+
+            new_orders_raw = self.db_client.fetch_new_orders(since=since)
+            if since is None or self._intake_full_fetch_at is None:
+                self._intake_full_fetch_at = now
+
+        return self._ingest_order_rows(new_orders_raw)
+
+    def _ingest_order_rows(self, new_orders_raw: List[Tuple]) -> int:
+        new_order_ids = []
         for row in new_orders_raw:
+            if self.replica_id is None and self._delta_intake and len(row) > 8:
+                if self._intake_watermark is None or row[8] > self._intake_watermark:
+                    self._intake_watermark = row[8]
+
+            # Order yang sudah ada di antrian atau sedang di mesin tidak di-push ulang
+            if row[0] in self.queue or row[0] in self._order_on_machine:
+                continue
 
             order = Order(
                 order_id=row[0],
@@ -105,43 +281,430 @@ class ProductionScheduler:
             )
             
             self.queue.add_order(order)
-            newly_added_count += 1
+            new_order_ids.append(order.order_id)
+
+        if new_order_ids:
+            self._intake_seq += 1
+            for order_item_id, order_id, product_id, quantity in \
+                    self.db_client.fetch_order_items_for_orders(new_order_ids):
+                order = self.queue.get_order(order_id)
+                if order is not None:
+                    order.items.append(OrderItem(order_item_id=order_item_id, order_id=order_id,
+                                                 product_id=product_id, quantity=quantity))
+            self.stock_controller.register_orders(new_order_ids)
             
-        if newly_added_count > 0:
-            pass
+        return len(new_order_ids)
+
+    def _resync_queue(self) -> int:
+        """
+        Full fetch tanpa watermark: order di antrian lokal yang sudah tidak siap
+        (misal sudah dimulai leader lama) dibuang, order yang terlewat ditambahkan.
+        Mengembalikan jumlah order yang dibuang.
+        """
+        rows = self.db_client.fetch_new_orders(since=None)
+        ready_ids = {row[0] for row in rows}
+        stale = [order_id for order_id in self.queue.order_ids() if order_id not in ready_ids]
+        for order_id in stale:
+            self.queue.remove_order(order_id)
+            self.stock_controller.unregister_order(order_id)
+            self.bom.forget(order_id)
+        self._intake_watermark = None
+        self._intake_full_fetch_at = self.clock()
+        self._ingest_order_rows(rows)
+        return len(stale)
+
+    def save_snapshot(self, path: str = SCHEDULER_SNAPSHOT_PATH) -> bool:
+        """Checkpoint antrian, watermark, dan state mesin ke file biner (lihat snapshot.py)."""
+        try:
+            write_snapshot(path, self._intake_watermark, self.queue.orders(),
+                           [(m.machine_id, m.production_batch_id, m.current_order, m.start_time,
+                             m.estimated_finish_time) for m in self.machine])
+            return True
+        except OSError as e:
+            print(f"⚠️ Gagal menulis snapshot Scheduler ke '{path}'. Error: {e}")
+            return False
+
+    def restore_snapshot(self, path: str = SCHEDULER_SNAPSHOT_PATH) -> int:
+        """
+        Warm restart dari snapshot: order antrian dimuat dengan skor tersimpan (satu
+        heapify), lalu hanya order yang berubah sejak watermark snapshot yang
+        dibaca ulang dari DB. State mesin tetap berasal dari recovery DB; estimasi
+        selesai dari snapshot dipakai jika batch-nya sama.
+        Mengembalikan jumlah order yang dimuat dari snapshot.
+        """
+        if self.replica_id is not None:
+            return 0 # klaim replica bisa sudah berpindah; mulai dari claim_ready_orders saja
+        snapshot = read_snapshot(path)
+        if snapshot is None:
+            return 0
+
+        for machine_id, (batch_id, finish_time) in snapshot.machine_assignments().items():
+            machine = self._machine_by_id.get(machine_id)
+            if machine is not None and machine.production_batch_id == batch_id:
+                machine.estimated_finish_time = finish_time
+                self._schedule_timer(machine_id, finish_time)
+
+        queued = snapshot.orders[snapshot.orders['machine_id'] == 0]
+        changed = None
+        if self._delta_intake and snapshot.watermark is not None:
+            since = snapshot.watermark - datetime.timedelta(seconds=INTAKE_WATERMARK_OVERLAP_SECONDS)
+            changed = self.db_client.fetch_orders_changed_since(since)
+        if changed is not None:
+            # Order yang berubah sejak snapshot tidak dipercaya; versi DB diambil lewat intake delta
+            stale = np.isin(queued['order_id'], list(set(changed) | set(self._order_on_machine)))
+            queued = queued[~stale]
+
+        orders = snapshot.to_orders(queued)
+        for order in orders:
+            order.stock_alert = False # dihitung ulang StockController dari stok saat ini
+        self.queue.add_orders(orders, rescore=False)
+        self.stock_controller.register_orders([order.order_id for order in orders])
+
+        if changed is None:
+            self._resync_queue() # tanpa watermark: rekonsiliasi penuh
+        else:
+            self._intake_watermark = snapshot.watermark
+            self._fetch_new_orders_from_db()
+        print(f"💾 Snapshot dimuat: {len(orders)} order dari '{path}', antrian sekarang {len(self.queue)} order.")
+        return len(orders)
+
+    def _renew_claims(self):
+        """
+        Heartbeat lease klaim (mode multi-replica), dijalankan tiap sepertiga lease.
+        Order yang klaimnya sudah diambil replica lain dibuang dari antrian lokal.
+        """
+        if self.replica_id is None:
+            return
+        now = self.clock()
+        if self._claims_renewed_at is not None and \
+                (now - self._claims_renewed_at).total_seconds() < SCHEDULER_CLAIM_LEASE_SECONDS / 3:
+            return
 
-    def estimate_production_duration(self, order: Order) -> float:
-        return 0.1
+        queued = self.queue.order_ids()
+        still_owned = self.db_client.renew_claims(self.replica_id, queued, SCHEDULER_CLAIM_LEASE_SECONDS)
+        if still_owned is None:
+            return # DB error: coba lagi siklus berikutnya, klaim lama masih berlaku sampai lease habis
+        self._claims_renewed_at = now
+
+        for order_id in set(queued) - set(still_owned):
+            print(f"⚠️ Klaim Order ID {order_id} sudah lepas dari replica '{self.replica_id}', dibuang dari antrian.")
+            self.queue.remove_order(order_id)
+            self.stock_controller.unregister_order(order_id)
+            self.bom.forget(order_id)
+
+    def release_claims(self):
+        """Melepas klaim semua order di antrian lokal (shutdown bersih)."""
+        if self.replica_id is not None:
+            self.db_client.release_claims(self.replica_id, self.queue.order_ids())
+
+    def estimate_production_duration(self, order: Order, machine_id: Optional[int] = None) -> float:
+        """Estimasi durasi (menit) dari item order dan rate per produk/mesin."""
+        return self.duration_model.estimate(order.items, machine_id, order.total_quantity)
+
+    def queued_ingredient_demand(self) -> Dict[int, float]:
+        """Total kebutuhan bahan {ingredient_id: qty} semua order di antrian (dari cache BOM, tanpa query)."""
+        return self.bom.total_requirements(self.queue.orders())
+
+    def forecast_stock(self, horizon_hours: float = FORECAST_HORIZON_HOURS) -> List[IngredientForecast]:
+        """
+        Proyeksi stok tiap bahan selama horizon_hours ke depan dari antrian + order di mesin,
+        termasuk kapan pertama kali stok di bawah minimum / habis. Aman dipanggil dari thread View.
+        """
+        ingredients = self.db_client.fetch_all_ingredients()
+        running = []
+        for machine in list(self.machine):
+            order, finish = machine.current_order, machine.estimated_finish_time # dibaca sekali (thread lain)
+            if order is not None and finish is not None:
+                running.append((finish, self.bom.requirements(order)))
+        return self.forecaster.forecast(self.clock(), ingredients, running, len(self.machine), horizon_hours)
     
-    def run_scheduling_cycle(self):
-        self._fetch_new_orders_from_db()
-        self.stock_controller.check_and_update_all_priorities()
+    def _schedule_timer(self, machine_id: int, due: datetime.datetime):
+        self._timer_due[machine_id] = due
+        heapq.heappush(self._finish_heap, (due, machine_id))
+
+    def _pop_due_machines(self, now: datetime.datetime) -> List[ProductionMachine]:
+        due_machines = []
+        while self._finish_heap and self._finish_heap[0][0] <= now:
+            due, machine_id = heapq.heappop(self._finish_heap)
+            if self._timer_due.get(machine_id) != due:
+                continue # entry basi
+            del self._timer_due[machine_id]
+            due_machines.append(self._machine_by_id[machine_id])
+        return due_machines
+
+    def _complete_machine(self, machine_id: int, finished_order: Order):
+        self._order_on_machine.pop(finished_order.order_id, None)
+        self._idle_machines.append(machine_id)
+        self.ledger.commit(finished_order.order_id)
+        self.bom.forget(finished_order.order_id)
 
+    def _finish_due_machines(self) -> List[Order]:
+        now = self.clock()
+        due = [m for m in self._pop_due_machines(now) if m.is_due()]
+        if not due:
+            return []
+
+        # Semua mesin yang selesai di siklus ini ditutup dalam satu transaksi,
+        # termasuk pengurangan stok bahan baku (jumlahnya dari cache BOM jika semua order tercakup).
         finished_orders = []
-        for machine in self.machine:
-            finished_order = machine.check_finish(self.db_client) 
+        due_orders = [m.current_order for m in due]
+        deductions = {order.order_id: self.bom.requirements(order) for order in due_orders} \
+            if all(self.bom.covers(order) for order in due_orders) else None
+        if self.db_client.finish_production_batch(
+                [(m.current_order.order_id, m.production_batch_id) for m in due], deductions):
+            for machine in due:
+                finished_order = machine.current_order
+                print(f"✅ SUCCESS: Machine {machine.machine_id} finished Order ID {finished_order.order_id}. Status DB updated.")
+                self._complete_machine(machine.machine_id, finished_order)
+                machine.reset()
+                finished_orders.append(finished_order)
+            return finished_orders
+
+        # Fallback per mesin agar satu baris bermasalah tidak menahan mesin lain
+        for machine in due:
+            order = machine.current_order
+            finished_order = machine.check_finish(self.db_client)
             if finished_order:
+                self._complete_machine(machine.machine_id, finished_order)
                 finished_orders.append(finished_order)
                 self.stock_controller.adjust_stock_after_production(finished_order)
-        
+            elif machine.status == MachineStatus.BUSY:
+                # Transaksi finish gagal sementara: mesin tetap BUSY, coba lagi setelah jeda
+                self._schedule_timer(machine.machine_id,
+                                     now + datetime.timedelta(seconds=SCHEDULER_POLLING_INTERVAL))
+            else:
+                # Batch sudah ditutup proses lain: mesin kembali IDLE, reservasi dilepas dari ledger
+                self._complete_machine(machine.machine_id, order)
+        return finished_orders
+
+    def _dispatch_to_idle_machines(self) -> int:
+        if len(self.queue) == 0 or not self._idle_machines:
+            return 0
+
+        # Skor deadline hanya perlu segar saat akan ada order yang diambil
+        self.queue.recalculate_all_priorities()
+
+        # Order yang kebutuhan bahannya melebihi stok bebas dilewati (tetap di antrian);
+        # stok dibaca sekali untuk seluruh fase dispatch
+        predicate = None
+        if self.reserve_stock:
+            self.ledger.refresh(self.db_client.fetch_ingredient_stock())
+            stock_state = (self.ledger.version, self.bom.version)
+            if stock_state != self._blocked_at:
+                self._stock_blocked.clear() # stok bebas bertambah atau resep berubah: periksa ulang
+                self._blocked_at = stock_state
+            if self._dispatch_stalled_at == stock_state + (self._intake_seq,):
+                return 0 # tidak ada order baru dan stok bebas tidak bertambah sejak scan terakhir gagal
+            predicate = self._try_reserve
+
+        planned: List[ProductionMachine] = []
+        for next_order in self.queue.pop_top_k(len(self._idle_machines), predicate, SCHEDULER_RESERVATION_MAX_SCAN):
+            machine = self._machine_by_id[self._idle_machines.popleft()]
+            machine.begin(next_order, self.estimate_production_duration(next_order, machine.machine_id))
+            planned.append(machine)
+        if predicate is not None and len(self._idle_machines) > 0:
+            self._dispatch_stalled_at = self._blocked_at + (self._intake_seq,)
+
+        # Satu round-trip untuk semua mesin yang mulai di siklus ini
+        batch_ids = self.db_client.start_production_batch(
+            [(m.current_order.order_id, m.machine_id) for m in planned], replica_id=self.replica_id)
+
+        dispatched = 0
+        for machine in reversed(planned):
+            order = machine.current_order
+            batch_id = batch_ids.get(order.order_id)
+            if batch_id is None:
+                # Gagal mulai di DB: order dikembalikan ke antrian, dicoba siklus berikutnya
+                self.ledger.release(order.order_id)
+                machine.reset()
+                self.queue.add_order(order)
+                self._idle_machines.appendleft(machine.machine_id)
+                continue
+
+            machine.production_batch_id = batch_id
+            self.stock_controller.unregister_order(order.order_id)
+            self._order_on_machine[order.order_id] = machine.machine_id
+            self._schedule_timer(machine.machine_id, machine.estimated_finish_time)
+            dispatched += 1
+        return dispatched
+
+    def _try_reserve(self, order: Order) -> bool:
+        if order.order_id in self._stock_blocked:
+            return False
+        if self.ledger.try_reserve(order.order_id, self.bom.requirements(order)):
+            return True
+        self._stock_blocked.add(order.order_id)
+        return False
+    
+    def run_scheduling_cycle(self):
+        metrics = self.metrics
+        cycle_start = time.perf_counter()
+        round_trips_before = getattr(self.db_client, 'thread_round_trips', None)
+
+        with metrics.time_phase('intake'):
+            self.bom.ensure_fresh()
+            self._renew_claims()
+            ingested = self._fetch_new_orders_from_db()
+        with metrics.time_phase('stock'):
+            self.stock_controller.check_and_update_all_priorities()
+        with metrics.time_phase('finish'):
+            finished = self._finish_due_machines()
+        with metrics.time_phase('dispatch'):
+            dispatched = self._dispatch_to_idle_machines()
+
+        round_trips_after = getattr(self.db_client, 'thread_round_trips', None)
+        now_ts = self.clock().timestamp()
+        metrics.record_cycle(
+            seconds=time.perf_counter() - cycle_start,
+            ingested=ingested,
+            dispatched=dispatched,
+            finished=len(finished),
+            deadline_misses=sum(1 for order in finished if now_ts > order.deadline.timestamp()),
+            db_round_trips=round_trips_after - round_trips_before if round_trips_before is not None else None,
+            queue_depth=len(self.queue),
+            machines_busy=len(self.machine) - len(self._idle_machines),
+            machines_total=len(self.machine),
+        )
+
+    def run_standby_cycle(self):
+        """Siklus standby: hanya intake + cek stok agar antrian tetap hangat, tanpa menyentuh mesin."""
+        self.bom.ensure_fresh()
+        if self.replica_id is None: # di mode multi-replica standby tidak boleh mengklaim order
+            now = time.monotonic()
+            if self._standby_resynced_at is None or \
+                    now - self._standby_resynced_at >= SCHEDULER_STANDBY_RESYNC_SECONDS:
+                # Sesekali full resync agar order yang sudah dimulai leader tidak menumpuk di antrian
+                self._resync_queue()
+                self._standby_resynced_at = now
+            else:
+                self._fetch_new_orders_from_db()
+        self.stock_controller.check_and_update_all_priorities()
+
+    def _take_over(self):
+        """Standby menjadi leader: antrian hangat cukup disinkronkan ulang, bukan dibangun dari nol."""
+        # State mesin lokal (hasil recovery saat startup) bisa sudah basi: pulihkan ulang dari DB
+        self._reset_machines()
+        self.recover_in_progress_batches()
+        dropped = self._resync_queue()
+        print(f"👑 Scheduler menjadi LEADER. Antrian siap: {len(self.queue)} order ({dropped} order basi dibuang).")
+
+    def _reset_machines(self):
         for machine in self.machine:
-            if machine.status == MachineStatus.IDLE:
-                
-                next_order = self.queue.get_highest_priority_order()
-                
-                if next_order:
-                    duration = self.estimate_production_duration(next_order)
-                    machine.start_production(next_order, duration, self.db_client)
+            if machine.current_order is not None:
+                self.bom.forget(machine.current_order.order_id)
+            machine.reset()
+        self._finish_heap.clear()
+        self._timer_due.clear()
+        self._order_on_machine.clear()
+        self._idle_machines = deque(m.machine_id for m in self.machine)
+        self.ledger.clear()
+
+    def _step_down(self):
+        """
+        Sesi lock hilang: leader lain mungkin sudah mengambil alih, jadi state mesin
+        lokal tidak lagi sah. Mesin dikosongkan tanpa menulis ke DB; batch yang
+        sedang berjalan diurus leader baru.
+        """
+        self.is_leader = False
+        self._reset_machines()
+        print("⚠️ Advisory lock leader hilang, Scheduler kembali menjadi STANDBY.")
+
+    def _update_leadership(self):
+        now = time.monotonic()
+        if self._leader_checked_at is not None and \
+                now - self._leader_checked_at < SCHEDULER_LEADER_HEARTBEAT_SECONDS:
+            return
+        self._leader_checked_at = now
+
+        if self.is_leader:
+            if not self.db_client.check_leader_lock(SCHEDULER_LEADER_LOCK_KEY):
+                self._step_down()
+        elif self.db_client.try_acquire_leader_lock(SCHEDULER_LEADER_LOCK_KEY):
+            self.is_leader = True
+            self._take_over()
+
+    def next_finish_time(self) -> Optional[datetime.datetime]:
+        # Buang entry basi di puncak heap agar peek tetap O(1) amortized
+        while self._finish_heap and \
+                self._timer_due.get(self._finish_heap[0][1]) != self._finish_heap[0][0]:
+            heapq.heappop(self._finish_heap)
+        if not self._finish_heap:
+            return None
+        return self._finish_heap[0][0]
+
+    def _seconds_until_next_finish(self) -> Optional[float]:
+        next_finish = self.next_finish_time()
+        if next_finish is None:
+            return None
+        return max(0.0, (next_finish - self.clock()).total_seconds())
+
+    def _wait_for_next_event(self, interval_seconds: int, listening: bool) -> bool:
+        """
+        Menunggu sampai ada NOTIFY atau mesin berikutnya selesai (mana yang lebih dulu).
+        Jika tidak sedang LISTEN, fallback ke sleep interval tetap.
+        Mengembalikan status listening terbaru.
+        """
+        if not listening:
+            if self._leader_election:
+                interval_seconds = min(interval_seconds, SCHEDULER_LEADER_HEARTBEAT_SECONDS)
+            time.sleep(interval_seconds)
+            return False
+
+        timeout = SCHEDULER_EVENT_MAX_WAIT
+        if self._leader_election:
+            timeout = min(timeout, SCHEDULER_LEADER_HEARTBEAT_SECONDS) # heartbeat / kampanye leader
+        if self.replica_id is not None:
+            timeout = min(timeout, SCHEDULER_CLAIM_LEASE_SECONDS / 3) # heartbeat lease
+        next_finish = self._seconds_until_next_finish()
+        if next_finish is not None:
+            timeout = min(timeout, next_finish)
+
+        events = self.db_client.wait_for_notifications(timeout)
+        if events and 'recipe' in events:
+            self.bom.invalidate() # dimuat ulang di awal siklus berikutnya
+        return events is not None
 
-    def start_polling(self, interval_seconds: int = SCHEDULER_POLLING_INTERVAL):
-        print(f"--- Scheduler STARTED: Mengelola {len(self.machine)} Mesin. Interval: {interval_seconds}s ---")
+    def start_polling(self, interval_seconds: int = SCHEDULER_POLLING_INTERVAL,
+                      event_driven: bool = SCHEDULER_EVENT_DRIVEN,
+                      leader_election: bool = SCHEDULER_LEADER_ELECTION):
+        listening = event_driven and self.db_client.listen(SCHEDULER_NOTIFY_CHANNEL)
+        mode = "event-driven (LISTEN/NOTIFY)" if listening else f"polling {interval_seconds}s"
+        if leader_election:
+            mode += ", hot standby (advisory lock)"
+        print(f"--- Scheduler STARTED: Mengelola {len(self.machine)} Mesin. Mode: {mode} ---")
+        self._leader_election = leader_election
+        self.is_leader = not leader_election
+        snapshot_enabled = SCHEDULER_SNAPSHOT_PATH is not None and self.replica_id is None
+        if snapshot_enabled:
+            self.restore_snapshot(SCHEDULER_SNAPSHOT_PATH)
+        snapshot_at = time.monotonic()
+        if SCHEDULER_METRICS_PORT is not None:
+            self.metrics.serve(SCHEDULER_METRICS_PORT)
         try:
             while True:
-                self.run_scheduling_cycle()
-                time.sleep(interval_seconds)
+                if leader_election:
+                    self._update_leadership()
+                if self.is_leader:
+                    self.run_scheduling_cycle()
+                    if SCHEDULER_METRICS_PATH is not None:
+                        self.metrics.write_file(SCHEDULER_METRICS_PATH)
+                else:
+                    self.run_standby_cycle()
+                listening = self._wait_for_next_event(interval_seconds, listening)
+                if event_driven and not listening:
+                    # Coba pasang LISTEN lagi setelah fallback (misal koneksi sempat putus)
+                    listening = self.db_client.listen(SCHEDULER_NOTIFY_CHANNEL)
+                if snapshot_enabled and time.monotonic() - snapshot_at >= SCHEDULER_SNAPSHOT_INTERVAL_SECONDS:
+                    self.save_snapshot(SCHEDULER_SNAPSHOT_PATH)
+                    snapshot_at = time.monotonic()
         except KeyboardInterrupt:
             print("\nScheduler dihentikan.")
+            if snapshot_enabled:
+                self.save_snapshot(SCHEDULER_SNAPSHOT_PATH)
+            self.release_claims()
+            self.metrics.stop()
+            if leader_election and self.is_leader:
+                self.db_client.release_leader_lock(SCHEDULER_LEADER_LOCK_KEY)
             if self.db_client:
                 self.db_client.close()
             print("Koneksi DB ditutup dengan aman.")
-            
\ No newline at end of file
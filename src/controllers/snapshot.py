@@ -0,0 +1,223 @@
+# src/controllers/snapshot.py
+"""
+Checkpoint biner antrian Scheduler untuk warm restart.
+
+Satu file berisi header + tiga array record (struct) berurutan:
+    header   : magic, versi, watermark intake, jumlah baris tiap array
+    orders   : order yang antri / sedang di mesin (machine_id = 0 berarti antri)
+    items    : order_item semua order di atas (order menunjuk ke rentang item_start..+item_count)
+    machines : state mesin (batch, order, waktu mulai & estimasi selesai)
+
+File dibaca dengan numpy.memmap tanpa unpickle objek; penulisan lewat file
+sementara + os.replace agar snapshot lama tetap utuh jika proses mati di tengah jalan.
+Waktu disimpan sebagai mikrodetik epoch (int64) supaya round-trip datetime persis.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.order import Order, OrderItem
+
+SNAPSHOT_MAGIC = b'MTCHSNAP'
+SNAPSHOT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('watermark_aware', '<u1'),
+    ('has_watermark', '<u1'),
+    ('created_at_us', '<i8'),
+    ('watermark_us', '<i8'),
+    ('n_orders', '<u8'),
+    ('n_items', '<u8'),
+    ('n_machines', '<u8'),
+])
+
+ORDER_DTYPE = np.dtype([
+    ('order_id', '<i8'),
+    ('customer_id', '<i8'),
+    ('order_timestamp_us', '<i8'),
+    ('deadline_us', '<i8'),
+    ('total_price', '<f8'),
+    ('status_id', '<i4'),
+    ('stock_alert', '<u1'),
+    ('total_quantity', '<i8'),
+    ('priority_score', '<f8'),
+    ('machine_id', '<i8'),
+    ('item_start', '<u8'),
+    ('item_count', '<u4'),
+    ('status_name', 'S32'),
+])
+
+ITEM_DTYPE = np.dtype([
+    ('order_item_id', '<i8'),
+    ('product_id', '<i8'),
+    ('quantity', '<i8'),
+])
+
+MACHINE_DTYPE = np.dtype([
+    ('machine_id', '<i8'),
+    ('production_batch_id', '<i8'),   # -1 = IDLE
+    ('order_id', '<i8'),
+    ('start_time_us', '<i8'),
+    ('estimated_finish_us', '<i8'),
+])
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _to_us(dt: datetime) -> int:
+    if dt.tzinfo is not None:
+        return (dt - _EPOCH_UTC) // _MICROSECOND
+    return (dt - _EPOCH) // _MICROSECOND
+
+def _from_us(us: int, aware: bool = False) -> datetime:
+    return (_EPOCH_UTC if aware else _EPOCH) + timedelta(microseconds=int(us))
+
+@dataclass
+class SchedulerSnapshot:
+    created_at: datetime
+    watermark: Optional[datetime]
+    orders: np.ndarray   # ORDER_DTYPE (view memmap)
+    items: np.ndarray    # ITEM_DTYPE
+    machines: np.ndarray # MACHINE_DTYPE
+
+    def to_orders(self, rows: Optional[np.ndarray] = None) -> List[Order]:
+        """Membangun objek Order (beserta item) dari baris array order."""
+        rows = self.orders if rows is None else rows
+        # Konversi per kolom (tolist) jauh lebih cepat daripada akses per record numpy
+        order_ids = rows['order_id'].tolist()
+        order_ts = rows['order_timestamp_us'].astype('datetime64[us]').tolist()
+        deadlines = rows['deadline_us'].astype('datetime64[us]').tolist()
+        columns = zip(order_ids, rows['customer_id'].tolist(), order_ts, deadlines,
+                      rows['total_price'].tolist(), rows['status_id'].tolist(),
+                      rows['total_quantity'].tolist(), rows['status_name'].tolist(),
+                      rows['priority_score'].tolist(), rows['stock_alert'].tolist(),
+                      rows['item_start'].tolist(), rows['item_count'].tolist())
+        item_ids = self.items['order_item_id'].tolist()
+        item_products = self.items['product_id'].tolist()
+        item_quantities = self.items['quantity'].tolist()
+
+        orders = []
+        for (order_id, customer_id, ordered_at, deadline, price, status_id, quantity,
+             status_name, score, stock_alert, start, count) in columns:
+            orders.append(Order(
+                order_id=order_id,
+                customer_id=customer_id,
+                order_timestamp=ordered_at,
+                deadline=deadline,
+                total_price=price,
+                status_id=status_id,
+                total_quantity=quantity,
+                status_name=status_name.decode('utf-8'),
+                priority_score=score,
+                stock_alert=bool(stock_alert),
+                items=[OrderItem(order_item_id=item_ids[i], order_id=order_id,
+                                 product_id=item_products[i], quantity=item_quantities[i])
+                       for i in range(start, start + count)]
+            ))
+        return orders
+
+    def machine_assignments(self) -> Dict[int, Tuple[int, datetime]]:
+        """machine_id -> (production_batch_id, estimated_finish_time) untuk mesin yang BUSY."""
+        return {int(row['machine_id']): (int(row['production_batch_id']), _from_us(row['estimated_finish_us']))
+                for row in self.machines if row['production_batch_id'] >= 0}
+
+def _layout(n_orders: int, n_items: int, n_machines: int) -> Tuple[int, int, int, int]:
+    orders_at = HEADER_DTYPE.itemsize
+    items_at = orders_at + n_orders * ORDER_DTYPE.itemsize
+    machines_at = items_at + n_items * ITEM_DTYPE.itemsize
+    total = machines_at + n_machines * MACHINE_DTYPE.itemsize
+    return orders_at, items_at, machines_at, total
+
+def write_snapshot(path: str, watermark: Optional[datetime],
+                   queued: List[Order], machines: List[Tuple[int, Optional[int], Optional[Order],
+                                                             Optional[datetime], Optional[datetime]]]):
+    """
+    Menulis snapshot secara atomik.
+    machines: list of (machine_id, production_batch_id, order, start_time, estimated_finish_time).
+    """
+    on_machine = [(machine_id, order) for machine_id, _, order, _, _ in machines if order is not None]
+    all_orders = [(0, order) for order in queued] + on_machine
+    n_items = sum(len(order.items) for _, order in all_orders)
+    orders_at, items_at, machines_at, total = _layout(len(all_orders), n_items, len(machines))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp" # beberapa proses boleh menulis ke path yang sama
+    mm = np.memmap(tmp_path, dtype=np.uint8, mode='w+', shape=(total,))
+    try:
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=mm, offset=0)
+        header['magic'] = SNAPSHOT_MAGIC
+        header['version'] = SNAPSHOT_VERSION
+        header['created_at_us'] = _to_us(datetime.now())
+        header['has_watermark'] = watermark is not None
+        header['watermark_aware'] = watermark is not None and watermark.tzinfo is not None
+        header['watermark_us'] = _to_us(watermark) if watermark is not None else 0
+        header['n_orders'] = len(all_orders)
+        header['n_items'] = n_items
+        header['n_machines'] = len(machines)
+
+        order_rows = np.ndarray((len(all_orders),), dtype=ORDER_DTYPE, buffer=mm, offset=orders_at)
+        item_rows = np.ndarray((n_items,), dtype=ITEM_DTYPE, buffer=mm, offset=items_at)
+        machine_rows = np.ndarray((len(machines),), dtype=MACHINE_DTYPE, buffer=mm, offset=machines_at)
+
+        # Kolom diisi sekaligus per array (bukan per record) agar tetap cepat untuk jutaan order
+        if all_orders:
+            order_rows['order_id'] = [o.order_id for _, o in all_orders]
+            order_rows['customer_id'] = [o.customer_id for _, o in all_orders]
+            order_rows['order_timestamp_us'] = [_to_us(o.order_timestamp) for _, o in all_orders]
+            order_rows['deadline_us'] = [_to_us(o.deadline) for _, o in all_orders]
+            order_rows['total_price'] = [float(o.total_price) for _, o in all_orders]
+            order_rows['status_id'] = [o.status_id for _, o in all_orders]
+            order_rows['stock_alert'] = [o.stock_alert for _, o in all_orders]
+            order_rows['total_quantity'] = [o.total_quantity for _, o in all_orders]
+            order_rows['priority_score'] = [o.priority_score for _, o in all_orders]
+            order_rows['machine_id'] = [machine_id for machine_id, _ in all_orders]
+            order_rows['status_name'] = [(o.status_name or '').encode('utf-8')[:32] for _, o in all_orders]
+            counts = np.array([len(o.items) for _, o in all_orders], dtype=np.uint64)
+            order_rows['item_count'] = counts
+            order_rows['item_start'] = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.uint64)
+        if n_items:
+            items = [item for _, o in all_orders for item in o.items]
+            item_rows['order_item_id'] = [item.order_item_id for item in items]
+            item_rows['product_id'] = [item.product_id for item in items]
+            item_rows['quantity'] = [item.quantity for item in items]
+        for row, (machine_id, batch_id, order, start_time, finish_time) in zip(machine_rows, machines):
+            row['machine_id'] = machine_id
+            row['production_batch_id'] = batch_id if batch_id is not None else -1
+            row['order_id'] = order.order_id if order is not None else -1
+            row['start_time_us'] = _to_us(start_time) if start_time is not None else 0
+            row['estimated_finish_us'] = _to_us(finish_time) if finish_time is not None else 0
+
+        mm.flush()
+    finally:
+        del mm
+    os.replace(tmp_path, path)
+
+def read_snapshot(path: str) -> Optional[SchedulerSnapshot]:
+    """Memetakan snapshot (read-only). Mengembalikan None jika file tidak ada atau tidak valid."""
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER_DTYPE.itemsize:
+        return None
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=mm, offset=0)[0]
+    if header['magic'] != SNAPSHOT_MAGIC or header['version'] != SNAPSHOT_VERSION:
+        print(f"⚠️ Snapshot '{path}' tidak dikenali (magic/versi berbeda), diabaikan.")
+        return None
+
+    n_orders, n_items, n_machines = int(header['n_orders']), int(header['n_items']), int(header['n_machines'])
+    orders_at, items_at, machines_at, total = _layout(n_orders, n_items, n_machines)
+    if len(mm) != total:
+        print(f"⚠️ Snapshot '{path}' terpotong ({len(mm)} dari {total} byte), diabaikan.")
+        return None
+
+    return SchedulerSnapshot(
+        created_at=_from_us(header['created_at_us']),
+        watermark=_from_us(header['watermark_us'], bool(header['watermark_aware']))
+                  if header['has_watermark'] else None,
+        orders=np.ndarray((n_orders,), dtype=ORDER_DTYPE, buffer=mm, offset=orders_at),
+        items=np.ndarray((n_items,), dtype=ITEM_DTYPE, buffer=mm, offset=items_at),
+        machines=np.ndarray((n_machines,), dtype=MACHINE_DTYPE, buffer=mm, offset=machines_at),
+    )
@@ -1,40 +1,122 @@
 # src/controllers/stock_controller.py
 
-from src.api.client import DatabaseClient
+from src.api.backend import DatabaseBackend
+from src.controllers.bom import BillOfMaterials
+from src.controllers.forecast import StockForecaster
 from src.controllers.priority_queue import ProductionPriorityQueue 
 from src.models.order import Order # Diperlukan untuk pengurangan stok
-from typing import List
+from typing import Dict, List, Optional, Set
 
 class StockController:
-    def __init__(self, db_client: DatabaseClient, queue: ProductionPriorityQueue):
+    def __init__(self, db_client: DatabaseBackend, queue: ProductionPriorityQueue,
+                 bom: Optional[BillOfMaterials] = None, forecaster: Optional[StockForecaster] = None):
         self.db_client = db_client
         self.queue = queue
+        self.bom = bom # kebutuhan bahan per order dari cache; None = selalu query DB
+        self.forecaster = forecaster # proyeksi stok ikut diperbarui saat order masuk/keluar antrian
         
-        # Konstanta ambang batas (Threshold)
-        self.LOW_STOCK_THRESHOLD = 1000 # Contoh: Stok dianggap rendah jika kurang dari 1000 unit
-        self.PRIORITY_BOOST_SCORE = 10  # Contoh: Skor yang ditambahkan ke order saat stok rendah
+        # Inverted index: ingredient_id -> order_id yang sedang antri dan memakai bahan tsb.
+        # Dibangun dari resep versi _indexed_bom_version; dibangun ulang saat resep dimuat ulang.
+        self._orders_by_ingredient: Dict[int, Set[int]] = {}
+        self._ingredients_by_order: Dict[int, Set[int]] = {}
+        self._indexed_bom_version = bom.version if bom is not None else None
+        # Ingredient yang pada cek terakhir stoknya <= minimum_stock
+        self._low_stock_ingredients: Set[int] = set()
+
+    def register_orders(self, order_ids: List[int]):
+        """
+        Memasukkan order baru ke inverted index, lalu langsung memberi boost jika
+        order memakai bahan yang sudah kritis. Kebutuhan bahan dibaca dari cache
+        bill-of-materials; hanya order yang tidak tercakup cache yang di-query (sekali untuk semuanya).
+        """
+        self._reindex_if_recipes_changed()
+        if self.forecaster is not None:
+            for order_id in order_ids:
+                order = self.queue.get_order(order_id)
+                if order is not None:
+                    self.forecaster.add(order)
+        self._index_orders(order_ids)
+
+        for order_id in order_ids:
+            if self._ingredients_by_order.get(order_id, set()) & self._low_stock_ingredients:
+                self.queue.set_stock_alert(order_id, True)
+
+    def _index_orders(self, order_ids: List[int]):
+        uncached = []
+        for order_id in order_ids:
+            self._ingredients_by_order.setdefault(order_id, set()) # order tanpa bahan tetap terdaftar
+            order = self.queue.get_order(order_id)
+            if self.bom is None or order is None or not self.bom.covers(order):
+                uncached.append(order_id)
+                continue
+            for ingredient_id in self.bom.requirements(order):
+                self._index(order_id, ingredient_id)
+
+        if uncached:
+            for order_id, ingredient_id, _quantity in self.db_client.fetch_ingredients_for_orders(uncached):
+                self._index(order_id, ingredient_id)
+
+    def _reindex_if_recipes_changed(self) -> Set[int]:
+        """
+        Membangun ulang inverted index jika cache BOM memuat resep versi baru.
+        Mengembalikan order yang di-index ulang (alert-nya perlu dievaluasi ulang).
+        """
+        if self.bom is None or self.bom.version == self._indexed_bom_version:
+            return set()
+        self._indexed_bom_version = self.bom.version
+        order_ids = list(self._ingredients_by_order)
+        self._orders_by_ingredient.clear()
+        self._ingredients_by_order.clear()
+        self._index_orders(order_ids)
+        return set(order_ids)
+
+    def _index(self, order_id: int, ingredient_id: int):
+        self._orders_by_ingredient.setdefault(ingredient_id, set()).add(order_id)
+        self._ingredients_by_order.setdefault(order_id, set()).add(ingredient_id)
+
+    def unregister_order(self, order_id: int):
+        """Menghapus order dari inverted index (dipanggil saat order keluar antrian)."""
+        if self.forecaster is not None:
+            self.forecaster.remove(order_id)
+        for ingredient_id in self._ingredients_by_order.pop(order_id, ()):
+            orders = self._orders_by_ingredient.get(ingredient_id)
+            if orders is not None:
+                orders.discard(order_id)
+                if not orders:
+                    del self._orders_by_ingredient[ingredient_id]
 
     # --- TODO 5: Logika Prioritas Dinamis ---
     
-    def check_and_update_all_priorities(self):
+    def check_and_update_all_priorities(self) -> int:
         """
-        [TODO 5] Memeriksa semua stok bahan baku dan meningkatkan prioritas order 
-        yang membutuhkan bahan yang kritis (stok rendah).
+        [TODO 5] Memeriksa stok bahan baku terhadap minimum_stock masing-masing dan
+        meningkatkan prioritas HANYA order yang memakai bahan yang kritis.
+        Hanya ingredient yang status kritisnya berubah sejak cek terakhir yang diproses,
+        kecuali resep berubah: semua order di-index ulang dan diperiksa.
+        Mengembalikan jumlah order yang skornya berubah.
         """
-        # 1. Ambil status stok dari DB
-        # ASUMSI: Ada tabel 'inventory' dengan kolom: item_name, current_stock
-        low_stock_items = self.db_client.fetch_low_stock_items(self.LOW_STOCK_THRESHOLD)
-        
-        if not low_stock_items:
-            self.queue.recalculate_all_priorities(current_stock_alert=False) # Pastikan semua order di-reset ke base score
-            # print("Semua stok di atas ambang batas. Tidak ada perubahan prioritas.")
-            return
+        reindexed = self._reindex_if_recipes_changed()
+        low_stock = set(self.db_client.fetch_low_stock_ingredient_ids())
+        changed_ingredients = low_stock ^ self._low_stock_ingredients
+        self._low_stock_ingredients = low_stock
+
+        if not changed_ingredients and not reindexed:
+            return 0
+
+        affected_orders: Set[int] = reindexed
+        for ingredient_id in changed_ingredients:
+            affected_orders |= self._orders_by_ingredient.get(ingredient_id, set())
+
+        boost_count = 0
+        for order_id in affected_orders:
+            alert = bool(self._ingredients_by_order.get(order_id, set()) & low_stock)
+            if self.queue.set_stock_alert(order_id, alert):
+                boost_count += 1
 
-        self.queue.recalculate_all_priorities(current_stock_alert=True) # <-- PANGGILAN YANG BENAR
-        boost_count = len(self.queue._order_map) # Asumsi semua order di-recalculate dengan alert        
         if boost_count > 0:
-            # print(f"⬆️ Prioritas {boost_count} order telah ditingkatkan karena kekurangan stok.")
+            # print(f"⬆️ Prioritas {boost_count} order telah diperbarui karena perubahan stok.")
             pass
+        return boost_count
             
     def adjust_stock_after_production(self, finished_order: Order):
         """
@@ -42,12 +124,14 @@ class StockController:
         berdasarkan resep nyata (product_ingredients).
         """
         
-        # 1. AMBIL DETAIL RESEP DARI DATABASE
-        # Kita butuh fungsi baru di client.py: fetch_ingredients_for_order(order_id)
-        # Fungsi ini akan mengembalikan list of tuples: [(ing_id, quantity_used), ...]
+        # Kebutuhan bahan diambil dari cache bill-of-materials jika tersedia;
+        # jika tidak, DB menghitungnya sendiri lewat JOIN resep.
         
         try:
-            is_deducted = self.db_client.deduct_ingredients_for_order(finished_order.order_id)
+            requirements = None
+            if self.bom is not None and self.bom.covers(finished_order):
+                requirements = self.bom.requirements(finished_order)
+            is_deducted = self.db_client.deduct_ingredients_for_order(finished_order.order_id, requirements)
             
             if is_deducted:
                 #  print(f"✅ STOCK: Stok berhasil dikurangi untuk Order ID {finished_order.order_id}.")
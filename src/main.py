@@ -46,7 +46,7 @@ def main():
             if role == 'exit':
                 break
             elif role == 'admin' and user_data:
-                admin_view = AdminView(scheduler.db_client, user_data) # <-- Ganti data_store
+                admin_view = AdminView(scheduler.db_client, user_data, scheduler.forecast_stock) # <-- Ganti data_store
                 admin_view.run()
             elif role == 'customer' and user_data:
                 customer_view = CustomerView(scheduler.db_client, user_data) # <-- Ganti data_store
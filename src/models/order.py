@@ -1,9 +1,11 @@
 # src/models/order.py
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
+import numpy as np
 
-@dataclass
+# slots=True: tanpa __dict__ per instance, penting saat antrian berisi jutaan order
+@dataclass(slots=True)
 class OrderItem:
     order_item_id: int 
     order_id: int
@@ -12,7 +14,7 @@ class OrderItem:
 
     product_name: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     order_id: int
     customer_id: int
@@ -25,11 +27,15 @@ class Order:
     status_name: str 
 
     priority_score: float = 0.0
+    stock_alert: bool = False # True jika order memakai bahan baku yang stoknya kritis
     items: List[OrderItem] = field(default_factory=list) 
 
-    def calculate_priority_score(self, W_DEADLINE: float, W_QUANTITY: float, STOCK_BONUS: float, current_stock_alert: bool = False):
+    def calculate_priority_score(self, W_DEADLINE: float, W_QUANTITY: float, STOCK_BONUS: float, current_stock_alert: bool = False,
+                                 now: Optional[datetime] = None):
         
-        time_remaining_seconds = (self.deadline - datetime.now()).total_seconds()
+        if now is None:
+            now = datetime.now()
+        time_remaining_seconds = (self.deadline - now).total_seconds()
         
         time_factor = 1.0 / max(1.0, time_remaining_seconds)
         
@@ -41,6 +47,100 @@ class Order:
 
     def __lt__(self, other):
         return self.priority_score < other.priority_score
+
+class OrderTable:
+    """
+    Penyimpanan struct-of-arrays untuk order yang sedang antri: satu slot per order,
+    kolom numerik disimpan di array NumPy (bisa dihitung vectorized) dan objek
+    Order hanya direferensikan per slot. Slot yang dilepas dipakai ulang lewat free-list.
+    Memoryview (v_*) dipakai untuk akses skalar cepat dari Python (mis. perbandingan di heap).
+    """
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.index: Dict[int, int] = {}            # order_id -> slot
+        self.orders: List[Optional[Order]] = []     # slot -> Order (None = kosong)
+        self.free: List[int] = []
+        self.order_ids = np.zeros(capacity, dtype=np.int64)
+        self.deadlines = np.zeros(capacity)         # epoch detik
+        self.timestamps = np.zeros(capacity)        # epoch detik order_timestamp
+        self.quantities = np.zeros(capacity)
+        self.stock_alerts = np.zeros(capacity, dtype=bool)
+        self.scores = np.full(capacity, -np.inf)   # slot kosong = -inf
+        self.heap_pos = np.full(capacity, -1, dtype=np.int64)
+        self._bind_views()
+
+    _COLUMNS = ('order_ids', 'deadlines', 'timestamps', 'quantities', 'stock_alerts', 'scores', 'heap_pos')
+
+    def _bind_views(self):
+        self.v_ids = memoryview(self.order_ids)
+        self.v_deadlines = memoryview(self.deadlines)
+        self.v_timestamps = memoryview(self.timestamps)
+        self.v_quantities = memoryview(self.quantities)
+        self.v_stock = memoryview(self.stock_alerts)
+        self.v_scores = memoryview(self.scores)
+        self.v_pos = memoryview(self.heap_pos)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.scores)
+
+    @property
+    def high_water(self) -> int:
+        """Jumlah slot yang pernah dipakai; slot >= high_water pasti kosong."""
+        return len(self.orders)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self.index
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            fill = -np.inf if name == 'scores' else (-1 if name == 'heap_pos' else 0)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._bind_views()
+
+    def add(self, order: Order) -> int:
+        """Mengalokasikan slot untuk order baru dan mengisi kolomnya."""
+        if self.free:
+            slot = self.free.pop()
+            self.orders[slot] = order
+        else:
+            slot = len(self.orders)
+            if slot == self.capacity:
+                self._grow()
+            self.orders.append(order)
+        self.index[order.order_id] = slot
+        self.store(slot, order)
+        return slot
+
+    def store(self, slot: int, order: Order):
+        self.orders[slot] = order
+        self.v_ids[slot] = order.order_id
+        self.v_deadlines[slot] = order.deadline.timestamp()
+        self.v_timestamps[slot] = order.order_timestamp.timestamp()
+        self.v_quantities[slot] = order.total_quantity
+        self.v_stock[slot] = order.stock_alert
+        self.v_scores[slot] = order.priority_score
+
+    def release(self, slot: int) -> Order:
+        order = self.orders[slot]
+        del self.index[order.order_id]
+        self.orders[slot] = None
+        self.v_scores[slot] = -np.inf
+        self.v_pos[slot] = -1
+        self.free.append(slot)
+        return order
+
+    def live_slots(self) -> np.ndarray:
+        n = self.high_water
+        return np.flatnonzero(~np.isneginf(self.scores[:n]))
     
 # if __name__ == "__main__":
 #     from datetime import datetime, timedelta
@@ -1,10 +1,14 @@
 import os
-from ..api.client import DatabaseClient
+from typing import Callable, List, Optional
+from ..api.backend import DatabaseBackend
+from ..controllers.forecast import IngredientForecast
 
 class AdminView:
-    def __init__(self, db_client: DatabaseClient, admin_data):
+    def __init__(self, db_client: DatabaseBackend, admin_data,
+                 stock_forecast: Optional[Callable[[], List[IngredientForecast]]] = None):
         self.db_client = db_client
         self.admin = admin_data
+        self.stock_forecast = stock_forecast # proyeksi stok dari Scheduler; None = tidak ditampilkan
         
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -364,6 +368,8 @@ class AdminView:
                     print("{:<5} {:<25} {:<10} {}{:<14} {:<15}".format(
                         ing['ingredient_id'], ing['ingredient_name'][:23], 
                         ing['unit'], status, ing['stock'], ing['minimum_stock']))
+
+            self._print_stock_forecast()
             
             input("\nTekan Enter untuk kembali")
             
@@ -710,6 +716,26 @@ class AdminView:
             print(f"Error: {e}")
             input("Tekan Enter untuk kembali")
     
+    def _print_stock_forecast(self):
+        """Bahan yang diproyeksikan menipis/habis oleh antrian produksi saat ini."""
+        if self.stock_forecast is None:
+            return
+        shortages = [f for f in self.stock_forecast() if f.below_minimum_at is not None]
+        print("\n" + "=" * 50)
+        print("PROYEKSI KEKURANGAN (antrian produksi):")
+        if not shortages:
+            print("Stok cukup untuk seluruh antrian dalam horizon proyeksi.")
+            return
+        print("-" * 90)
+        print("{:<25} {:<8} {:<12} {:<12} {:<14} {:<14}".format(
+            "Nama Bahan", "Unit", "Stok", "Proyeksi", "< Min", "Habis"))
+        print("-" * 90)
+        for f in shortages:
+            print("{:<25} {:<8} {:<12} {:<12.2f} {:<14} {:<14}".format(
+                f.ingredient_name[:23], f.unit, f.stock, f.projected_stock,
+                f.below_minimum_at.strftime('%d/%m %H:%M'),
+                f.stockout_at.strftime('%d/%m %H:%M') if f.stockout_at else '-'))
+
     # ==================== LAPORAN ====================
     def view_reports(self):
         while True:
@@ -800,6 +826,8 @@ class AdminView:
                     print("{:<30} {:<10} {:<15} {:<15}".format(
                         ing['ingredient_name'][:28], ing['unit'], 
                         ing['stock'], ing['minimum_stock']))
+
+            self._print_stock_forecast()
             
             input("\nTekan Enter untuk kembali")
             
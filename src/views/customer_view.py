@@ -1,9 +1,9 @@
 import os
 from datetime import datetime
-from ..api.client import DatabaseClient
+from ..api.backend import DatabaseBackend
 
 class CustomerView:
-    def __init__(self, db_client: DatabaseClient, customer_data):
+    def __init__(self, db_client: DatabaseBackend, customer_data):
         self.db_client = db_client
         self.customer = customer_data
         
@@ -89,13 +89,9 @@ class CustomerView:
                     print("ID harus berupa angka!")
                     continue
                 
-                # Find product
-                product = None
-                for p in products:
-                    if p['product_id'] == product_id:
-                        product = p
-                        break
-                
+                # Find product (lookup index katalog, bukan scan list)
+                product = self.db_client.get_product_by_id(product_id)
+
                 if not product:
                     print("Produk tidak ditemukan!")
                     continue
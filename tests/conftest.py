@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+# Prefix nama data uji: dipakai untuk membersihkan baris yang dibuat test di Postgres sungguhan
+TEST_PREFIX = f"matcha_test_{os.getpid()}"
+
+requires_postgres = pytest.mark.skipif(os.environ.get('MATCHA_PG_TESTS') != '1',
+                                       reason="butuh Postgres (PGHOST/PGDATABASE/...); set MATCHA_PG_TESTS=1")
+
+
+def _cleanup_postgres(client):
+    like = TEST_PREFIX + '%'
+    with client._unit_of_work():
+        cursor = client.cursor
+        cursor.execute("""
+            DELETE FROM order_item WHERE order_id IN (
+                SELECT o.order_id FROM orders o JOIN customer c ON c.customer_id = o.customer_id
+                WHERE c.username LIKE %s);
+        """, (like,))
+        cursor.execute("""
+            DELETE FROM orders WHERE customer_id IN (SELECT customer_id FROM customer WHERE username LIKE %s);
+        """, (like,))
+        cursor.execute("DELETE FROM customer WHERE username LIKE %s;", (like,))
+        cursor.execute("""
+            DELETE FROM product_ingredients WHERE product_id IN (
+                SELECT product_id FROM product WHERE product_name LIKE %s);
+        """, (like,))
+        cursor.execute("DELETE FROM product WHERE product_name LIKE %s;", (like,))
+        cursor.execute("DELETE FROM ingredient WHERE ingredient_name LIKE %s;", (like,))
+        client.conn.commit()
+
+
+@pytest.fixture
+def data_prefix():
+    return TEST_PREFIX
+
+
+@pytest.fixture(params=['memory', pytest.param('postgres', marks=requires_postgres)])
+def db(request):
+    """Backend yang dipakai View: InMemoryDatabaseClient, atau DatabaseClient jika MATCHA_PG_TESTS=1."""
+    if request.param == 'memory':
+        from src.api.memory import InMemoryDatabaseClient
+        yield InMemoryDatabaseClient()
+        return
+
+    from src.api.client import DatabaseClient
+    client = DatabaseClient(max_conn=1)
+    try:
+        yield client
+    finally:
+        _cleanup_postgres(client)
+        client.close()
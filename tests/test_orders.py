@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+
+def _stored_order(db, order_id):
+    """(total_price, total_quantity, {product_id: quantity}) langsung dari tabel orders/order_item."""
+    from src.api.memory import InMemoryDatabaseClient
+
+    if isinstance(db, InMemoryDatabaseClient):
+        row = db.orders[order_id]
+        items = {item['product_id']: item['quantity'] for item in db.order_item.lookup('order_id', order_id)}
+        return float(row['total_price']), row['total_quantity'], items
+
+    with db._unit_of_work():
+        db.cursor.execute("SELECT total_price, total_quantity FROM orders WHERE order_id = %s;", (order_id,))
+        total_price, total_quantity = db.cursor.fetchone()
+        db.cursor.execute("SELECT product_id, quantity FROM order_item WHERE order_id = %s;", (order_id,))
+        items = dict(db.cursor.fetchall())
+        db.conn.rollback()
+    return float(total_price), total_quantity, items
+
+
+def _order_item_count(db):
+    from src.api.memory import InMemoryDatabaseClient
+
+    if isinstance(db, InMemoryDatabaseClient):
+        return len(db.order_item)
+    with db._unit_of_work():
+        db.cursor.execute("SELECT COUNT(*) FROM order_item;")
+        count = db.cursor.fetchone()[0]
+        db.conn.rollback()
+    return count
+
+
+def _customer_with_products(db, data_prefix, count):
+    customer_id = db.register_new_customer(f"{data_prefix}_budi", 'Budi', '0812',
+                                           f"{data_prefix}@example.com", 'hash')
+    ingredient_id = db.add_new_ingredient(f"{data_prefix}_matcha", 'gram', 1000, 100)
+    products = {}
+    for i in range(count):
+        price = 10000 + 500 * i
+        products[db.add_new_product_with_recipe(f"{data_prefix}_produk_{i}", '-', price,
+                                                [(ingredient_id, 1)])] = price
+    return customer_id, products
+
+
+def test_create_order_writes_every_item_and_totals_in_one_transaction(db, data_prefix):
+    customer_id, products = _customer_with_products(db, data_prefix, 40)
+    order_items = [{'product_id': product_id, 'quantity': i + 1}
+                   for i, product_id in enumerate(products)]
+    total_quantity = sum(item['quantity'] for item in order_items)
+    total_price = sum(products[item['product_id']] * item['quantity'] for item in order_items)
+
+    order_id = db.create_order_transaction(customer_id, total_price, total_quantity,
+                                           datetime.now() + timedelta(days=1), order_items)
+
+    assert order_id is not None
+    stored_price, stored_quantity, stored_items = _stored_order(db, order_id)
+    assert stored_price == total_price and stored_quantity == total_quantity
+    assert stored_items == {item['product_id']: item['quantity'] for item in order_items}
+    assert [row[3] for row in db.fetch_pending_orders_by_customer(customer_id)] == ['Menunggu Konfirmasi']
+
+
+def test_create_order_failing_part_way_leaves_nothing_behind(db, data_prefix):
+    customer_id, products = _customer_with_products(db, data_prefix, 3)
+    items_before = _order_item_count(db)
+    missing_product = max(products) + 10_000
+    order_items = [{'product_id': product_id, 'quantity': 1} for product_id in products]
+    order_items.insert(2, {'product_id': missing_product, 'quantity': 1}) # gagal di tengah daftar item
+
+    assert db.create_order_transaction(customer_id, 30000, len(order_items),
+                                       datetime.now() + timedelta(days=1), order_items) is None
+
+    assert db.fetch_customer_orders(customer_id) == []
+    assert _order_item_count(db) == items_before
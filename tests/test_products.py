@@ -0,0 +1,27 @@
+def _recipe_rows(db, product_id=None):
+    return sorted((ingredient_id, float(quantity)) for pid, ingredient_id, quantity in db.fetch_recipes()
+                  if product_id is None or pid == product_id)
+
+
+def test_add_product_writes_every_recipe_row(db, data_prefix):
+    ingredients = [db.add_new_ingredient(f"{data_prefix}_bahan_{i}", 'gram', 1000, 10) for i in range(25)]
+    recipe = [(ingredient_id, i + 1) for i, ingredient_id in enumerate(ingredients)]
+
+    product_id = db.add_new_product_with_recipe(f"{data_prefix}_matcha_latte", 'Segar', 25000, recipe)
+
+    assert product_id is not None
+    assert _recipe_rows(db, product_id) == sorted((ingredient_id, float(qty)) for ingredient_id, qty in recipe)
+    product = db.get_product_by_id(product_id)
+    assert product['product_name'] == f"{data_prefix}_matcha_latte" and product['price'] == 25000
+
+
+def test_add_product_failing_part_way_leaves_nothing_behind(db, data_prefix):
+    ingredients = [db.add_new_ingredient(f"{data_prefix}_bahan_{i}", 'gram', 1000, 10) for i in range(4)]
+    recipe = [(ingredient_id, 1) for ingredient_id in ingredients]
+    recipe.insert(2, (max(ingredients) + 10_000, 1)) # bahan tidak ada, di tengah resep
+    recipes_before = _recipe_rows(db)
+
+    assert db.add_new_product_with_recipe(f"{data_prefix}_gagal", '-', 1000, recipe) is None
+
+    assert not [p for p in db.fetch_all_products() if p['product_name'] == f"{data_prefix}_gagal"]
+    assert _recipe_rows(db) == recipes_before